@@ -0,0 +1,92 @@
+"""
+Micro-benchmark for docstring cleaning and markdown rendering.
+
+Generates tutorial-style docstrings of increasing length, mixing prose, tables, code blocks and admonitions, and
+times `parser.clean_markdown` on its own and followed by markdown rendering. Per-line timings should stay flat as the inputs grow.
+
+Run from the repository root:
+
+    python benchmarks/bench_markdown.py
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# the repository root, so that the benchmarks run against the working tree without installing yapper
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from yapper import parser  # pylint: disable=wrong-import-position
+
+PARAGRAPH = [
+    "This is a line of prose describing how the function should be used,",
+    "which continues onto a second line that should be welded onto the first.",
+    "",
+]
+TABLE = [
+    "| parameter | description |",
+    "|-----------|-------------|",
+    "| a | the first parameter |",
+    "| b | the second parameter |",
+    "",
+]
+CODE_BLOCK = [
+    "    ```python",
+    "    from yapper import parser",
+    "    parser.clean_markdown(text)",
+    "    ```",
+    "",
+]
+ADMONITION = [
+    ":::note",
+    "An admonition spanning",
+    "several lines.",
+    ":::",
+    "",
+]
+BLOCKS = [PARAGRAPH, TABLE, CODE_BLOCK, ADMONITION]
+
+
+def generate_docstring(n_lines: int) -> str:
+    """Generate a docstring of approximately n_lines lines."""
+    lines: list[str] = []
+    idx = 0
+    while len(lines) < n_lines:
+        lines.extend(BLOCKS[idx % len(BLOCKS)])
+        idx += 1
+    return "\n".join(lines)
+
+
+def time_func(func, repeats: int) -> float:  # type: ignore
+    """Return the best time from a number of repeats."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes: list[int], repeats: int) -> None:
+    """Time docstring cleaning and rendering for each docstring size."""
+    print(f"{'lines':>10} {'clean (ms)':>12} {'clean (us/line)':>16} {'render (ms)':>12} {'render (us/line)':>17}")
+    for size in sizes:
+        text = generate_docstring(size)
+        clean_time = time_func(lambda: parser.clean_markdown(text), repeats)  # pylint: disable=cell-var-from-loop
+        # bypass the render cache so that each repeat renders from scratch
+        render_time = time_func(
+            lambda: parser.md.render(parser.clean_markdown(text)), repeats  # pylint: disable=cell-var-from-loop
+        )
+        print(
+            f"{size:>10} {clean_time * 1000:>12.3f} {clean_time / size * 1e6:>16.3f} "
+            f"{render_time * 1000:>12.3f} {render_time / size * 1e6:>17.3f}"
+        )
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark docstring cleaning and markdown rendering.")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    arg_parser.add_argument("--repeats", type=int, default=5)
+    args = arg_parser.parse_args()
+    run(args.sizes, args.repeats)
@@ -0,0 +1,213 @@
+"""
+Benchmark the full yapper pipeline, and each of its stages, on a synthetic package.
+
+The stages are config loading, griffe loading with and without the module cache, building function docstring
+fragments with and without the docstring cache, markdown cleaning and rendering, module rendering, and file writing,
+followed by the full pipeline, both pipelined and with its stages run in turn. Results are written as JSON so that they
+can be compared between yapper versions.
+
+Run from the repository root:
+
+    python benchmarks/bench_pipeline.py --modules 50 --members 30 --output results.json
+    python benchmarks/bench_pipeline.py --modules 50 --members 30 --compare results.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import toml
+from griffe.dataclasses import Class, Function, Module
+from griffe.loader import GriffeLoader
+
+# the repository root, so that the benchmarks run against the working tree without installing yapper
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+from synthetic import SyntheticSpec, generate_package  # pylint: disable=wrong-import-position
+
+from yapper import cache, diagnostics, handler, parser  # pylint: disable=wrong-import-position
+
+
+def time_stage(func: Callable[[], Any], repeats: int) -> tuple[float, Any]:
+    """Return the best time from a number of repeats, together with the result of the last repeat."""
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def iter_functions(module_content: Module) -> list[Function]:
+    """Return the functions and methods in a module."""
+    functions: list[Function] = []
+    for member in module_content.members.values():
+        if isinstance(member, Function):
+            functions.append(member)
+        elif isinstance(member, Class):
+            functions.extend(member.functions.values())
+    return functions
+
+
+def iter_docstrings(module_content: Module) -> list[str]:
+    """Return the docstrings in a module."""
+    objects = [module_content] + list(module_content.classes.values()) + iter_functions(module_content)
+    return [obj.docstring.value for obj in objects if obj.docstring is not None]
+
+
+def run(spec: SyntheticSpec, render_backend: str, jobs: int, repeats: int) -> dict[str, Any]:
+    """Benchmark each stage for a synthetic package."""
+    timings: dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        module_names = generate_package(root / "src", spec)
+        sys.path.append(str(root / "src"))
+        config_path = root / "pyproject.toml"
+        config = {
+            "tool": {
+                "yapper": {
+                    "package_root_relative_path": str(root / "src"),
+                    "module_map": [
+                        {"module": name, "astro": str(root / "out" / f"{name}.astro")} for name in module_names
+                    ],
+                    "cache_dir": str(root / "cache"),
+                    "render_backend": render_backend,
+                    "jobs": jobs,
+                }
+            }
+        }
+        config_path.write_text(toml.dumps(config))
+
+        def load_config():
+            return handler.process_config(handler.load_config(argparse.Namespace(config=str(config_path))))
+
+        timings["config"], yapper_config = time_stage(load_config, repeats)
+
+        def load_modules():
+            griffe_loader = GriffeLoader()
+            return [handler.load_module(griffe_loader, name) for name in module_names]
+
+        timings["griffe_load"], module_contents = time_stage(load_modules, repeats)
+
+        def load_cached_modules():
+            # as per a build, modules of a package which is already restored are retrieved from the loader
+            griffe_loader = GriffeLoader()
+            return [handler.load_module(griffe_loader, name) for name in module_names]
+
+        # the first load populates the module cache, after which packages are restored from the cache
+        cache.module_cache.configure(root / "cache" / "modules", 256 * 1024 * 1024)
+        load_cached_modules()
+        timings["griffe_load_cached"], _ = time_stage(load_cached_modules, repeats)
+        cache.module_cache.configure(None, 256 * 1024 * 1024)
+
+        functions = [function for module_content in module_contents for function in iter_functions(module_content)]
+
+        def build_docstrings():
+            # yapper's docstring path: griffe's parsed sections, diagnostics, and markdown rendered into fragments
+            parser.markdown_cache.clear()
+            diagnostics.diagnostics.clear()
+            return [parser.build_func_docstring(function) for function in functions]
+
+        timings["docstring_build"], _ = time_stage(build_docstrings, repeats)
+
+        def process_docstrings():
+            # as per rendering, where fragments for identical docstrings and signatures are reused
+            parser.markdown_cache.clear()
+            parser.docstring_cache.clear()
+            diagnostics.diagnostics.clear()
+            return [parser.process_func_docstring(function) for function in functions]
+
+        timings["docstring_process"], _ = time_stage(process_docstrings, repeats)
+        docstrings = [text for module_content in module_contents for text in iter_docstrings(module_content)]
+        timings["markdown_clean"], cleaned = time_stage(lambda: [parser.clean_markdown(d) for d in docstrings], repeats)
+        timings["markdown_render"], _ = time_stage(lambda: [parser.md.render(c) for c in cleaned], repeats)
+
+        def render_modules():
+            parser.markdown_cache.clear()
+            parser.docstring_cache.clear()
+            return [parser.parse(module_content, yapper_config) for module_content in module_contents]
+
+        timings["render"], rendered = time_stage(render_modules, repeats)
+
+        def write_modules():
+            for module_info, astro in zip(yapper_config["module_map"], rendered):
+                handler.write_astro(module_info, Path(module_info["astro"]), astro)
+
+        timings["write"], _ = time_stage(write_modules, repeats)
+
+        def run_pipeline(queue_size: int):
+            # each repeat loads and renders from scratch, rather than from the caches populated by earlier repeats
+            parser.markdown_cache.clear()
+            parser.docstring_cache.clear()
+            handler.main({**yapper_config, "pipeline_queue_size": queue_size, "module_cache": False}, force=True)
+
+        timings["full_pipeline"], _ = time_stage(lambda: run_pipeline(yapper_config["pipeline_queue_size"]), repeats)
+        # the same run with the load, render, and write stages in turn, for comparing against the pipelined run
+        timings["full_pipeline_in_turn"], _ = time_stage(lambda: run_pipeline(0), repeats)
+        sys.path.remove(str(root / "src"))
+
+    return {
+        "yapper_version": cache.yapper_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": spec.as_dict(),
+        "render_backend": render_backend,
+        "jobs": jobs,
+        "repeats": repeats,
+        "timings": timings,
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any]) -> None:
+    """Print the timings against baseline results."""
+    print(f"baseline: yapper {baseline['yapper_version']}, current: yapper {results['yapper_version']}")
+    print(f"{'stage':>16} {'baseline (s)':>14} {'current (s)':>14} {'ratio':>8}")
+    for stage, seconds in results["timings"].items():
+        baseline_seconds = baseline["timings"].get(stage)
+        if baseline_seconds is None:
+            print(f"{stage:>16} {'-':>14} {seconds:>14.4f} {'-':>8}")
+        else:
+            print(f"{stage:>16} {baseline_seconds:>14.4f} {seconds:>14.4f} {seconds / baseline_seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark the yapper pipeline on a synthetic package.")
+    arg_parser.add_argument("--modules", type=int, default=SyntheticSpec.n_modules)
+    arg_parser.add_argument("--members", type=int, default=SyntheticSpec.members_per_module)
+    arg_parser.add_argument("--class-depth", type=int, default=SyntheticSpec.class_depth)
+    arg_parser.add_argument("--docstring-lines", type=int, default=SyntheticSpec.docstring_lines)
+    arg_parser.add_argument("--table-share", type=float, default=SyntheticSpec.table_share)
+    arg_parser.add_argument("--code-share", type=float, default=SyntheticSpec.code_share)
+    arg_parser.add_argument("--math-share", type=float, default=SyntheticSpec.math_share)
+    arg_parser.add_argument("--seed", type=int, default=SyntheticSpec.seed)
+    arg_parser.add_argument("--backend", type=str, default="dom", choices=handler.RENDER_BACKENDS)
+    arg_parser.add_argument("--jobs", type=int, default=1)
+    arg_parser.add_argument("--repeats", type=int, default=3)
+    arg_parser.add_argument("--output", type=str, default=None, help="Path for writing the JSON results.")
+    arg_parser.add_argument("--compare", type=str, default=None, help="Path to JSON results to compare against.")
+    args = arg_parser.parse_args()
+    synthetic_spec = SyntheticSpec(
+        n_modules=args.modules,
+        members_per_module=args.members,
+        class_depth=args.class_depth,
+        docstring_lines=args.docstring_lines,
+        table_share=args.table_share,
+        code_share=args.code_share,
+        math_share=args.math_share,
+        seed=args.seed,
+    )
+    bench_results = run(synthetic_spec, args.backend, args.jobs, args.repeats)
+    print(json.dumps(bench_results, indent=2))
+    if args.output is not None:
+        with open(args.output, mode="w") as out_file:
+            json.dump(bench_results, out_file, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            compare(bench_results, json.load(baseline_file))
@@ -0,0 +1,119 @@
+"""
+Generator for synthetic python packages used to benchmark yapper.
+
+Modules mirror the style of `tests/comparisons/mock_file.py`: numpy style docstrings containing prose, parameter
+sections, tables, code blocks and math, with classes inheriting from one another to a configurable depth.
+"""
+from __future__ import annotations
+
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+
+@dataclass
+class SyntheticSpec:
+    """Parameters for a synthetic package."""
+
+    package_name: str = "synthetic_pkg"
+    n_modules: int = 20
+    members_per_module: int = 20
+    class_depth: int = 2
+    docstring_lines: int = 10
+    table_share: float = 0.2
+    code_share: float = 0.2
+    math_share: float = 0.1
+    seed: int = 0
+
+    def as_dict(self) -> dict[str, object]:
+        """Return the spec as a dictionary, e.g. for JSON output."""
+        return asdict(self)
+
+
+WORDS = [
+    "network",
+    "node",
+    "edge",
+    "distance",
+    "threshold",
+    "weighted",
+    "centrality",
+    "returns",
+    "computes",
+    "layer",
+    "array",
+    "value",
+]
+
+
+def _prose(rng: random.Random, n_lines: int, indent: str) -> list[str]:
+    """Generate lines of prose."""
+    return [indent + " ".join(rng.choice(WORDS) for _ in range(10)) for _ in range(n_lines)]
+
+
+def _extras(rng: random.Random, spec: SyntheticSpec, indent: str) -> list[str]:
+    """Generate tables, code blocks and math blocks according to the spec's shares."""
+    lines: list[str] = []
+    if rng.random() < spec.table_share:
+        lines += ["", f"{indent}| col A | col B |", f"{indent}|-------|-------|"]
+        lines += [f"{indent}| {rng.choice(WORDS)} | {rng.choice(WORDS)} |" for _ in range(4)]
+    if rng.random() < spec.code_share:
+        lines += ["", f"{indent}```python", f"{indent}result = compute({rng.randint(0, 9)})", f"{indent}```"]
+    if rng.random() < spec.math_share:
+        lines += ["", f"{indent}$$", f"{indent}d_{{ij}} = \\sum_k w_k x_{{ik}}", f"{indent}$$"]
+    return lines
+
+
+def _function_source(rng: random.Random, spec: SyntheticSpec, name: str, indent: str, is_method: bool) -> list[str]:
+    """Generate the source for a function or method with a numpy style docstring."""
+    doc_indent = indent + "    "
+    params = [f"param_{idx}" for idx in range(rng.randint(1, 4))]
+    signature = ", ".join(
+        (["self"] if is_method else []) + [f"{param}: int = {idx}" for idx, param in enumerate(params)]
+    )
+    lines = [f"{indent}def {name}({signature}) -> int:", f'{doc_indent}"""']
+    lines += _prose(rng, spec.docstring_lines, doc_indent)
+    lines += _extras(rng, spec, doc_indent)
+    lines += ["", f"{doc_indent}Parameters", f"{doc_indent}----------"]
+    for param in params:
+        lines += [f"{doc_indent}{param}: int"] + _prose(rng, 2, doc_indent + "    ")
+    lines += ["", f"{doc_indent}Returns", f"{doc_indent}-------", f"{doc_indent}result: int"]
+    lines += _prose(rng, 1, doc_indent + "    ")
+    lines += [f'{doc_indent}"""', f"{doc_indent}return {params[0]}", ""]
+    return lines
+
+
+def _module_source(rng: random.Random, spec: SyntheticSpec, module_idx: int) -> str:
+    """Generate the source for a module."""
+    lines = ['"""'] + _prose(rng, spec.docstring_lines, "") + _extras(rng, spec, "") + ['"""', "", ""]
+    parent_class = None
+    depth = 0
+    for member_idx in range(spec.members_per_module):
+        if member_idx % 2 == 0:
+            lines += _function_source(rng, spec, f"func_{module_idx}_{member_idx}", "", is_method=False)
+            continue
+        class_name = f"Class{module_idx}x{member_idx}"
+        bases = f"({parent_class})" if parent_class is not None and depth < spec.class_depth else ""
+        depth = depth + 1 if bases else 0
+        lines += (
+            [f"class {class_name}{bases}:", '    """'] + _prose(rng, spec.docstring_lines, "    ") + ['    """', ""]
+        )
+        lines += ["    prop_a: int", '    """A property."""', ""]
+        lines += _function_source(rng, spec, "__init__", "    ", is_method=True)
+        lines += _function_source(rng, spec, f"method_{member_idx}", "    ", is_method=True)
+        parent_class = class_name
+    return "\n".join(lines) + "\n"
+
+
+def generate_package(root: Path, spec: SyntheticSpec) -> list[str]:
+    """Write a synthetic package under root, returning the names of its modules."""
+    rng = random.Random(spec.seed)
+    package_path = root / spec.package_name
+    package_path.mkdir(parents=True, exist_ok=True)
+    (package_path / "__init__.py").write_text('"""Synthetic package."""\n')
+    module_names: list[str] = []
+    for module_idx in range(spec.n_modules):
+        module_name = f"module_{module_idx}"
+        (package_path / f"{module_name}.py").write_text(_module_source(rng, spec, module_idx))
+        module_names.append(f"{spec.package_name}.{module_name}")
+    return module_names
@@ -1,16 +1,42 @@
 from __future__ import annotations
 
 import copy
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
 from pathlib import Path
 
 import pytest
 import toml
+from dominate import tags  # type: ignore
+from griffe.agents.visitor import visit
 from griffe.loader import GriffeLoader
 
-from yapper import cli, handler, parser
+import yapper
+from yapper import cache, cli, diagnostics, emitter, handler, output, parser, pipeline, profiler, search, slugs, watcher
 
 yapper_clean_config = copy.deepcopy(handler.yapper_template_config)
 
+# modules which should only be imported once parsing starts, so that the cli starts quickly
+DEFERRED_IMPORTS = [
+    "griffe",
+    "yapper.parser",
+    "markdown_it",
+    "mdit_py_plugins",
+    "dominate",
+    "slugify",
+    "multiprocessing",
+]
+
+
+def normalize_markup(markup: str) -> str:
+    """Collapse whitespace, including whitespace around tags, so that formatted fixtures compare equal."""
+    return re.sub(r"\s*([<>])\s*", r"\1", re.sub(r"\s+", " ", markup)).strip()
+
 
 def test_load_config():
     # should raise if bad path provided
@@ -60,6 +86,16 @@ def test_process_config():
     # should raise if astro file isn't string with correct endings
     with pytest.raises(ValueError):
         handler.process_config({"module_map": [{"module": "some.module", "astro": "baa.html"}]})
+    # should raise if jobs is not a positive integer
+    for jobs in [0, -1, 1.5, "2", True]:
+        with pytest.raises(ValueError):
+            handler.process_config({"jobs": jobs, "module_map": [{"module": "some.module", "astro": "baa.astro"}]})
+    # should raise if flags are not booleans
+    for flag in ["true", 1, None]:
+        with pytest.raises(ValueError):
+            handler.process_config(
+                {"markdown_disk_cache": flag, "module_map": [{"module": "some.module", "astro": "baa.astro"}]}
+            )
     # should raise if invalid key provided
     with pytest.raises(KeyError):
         handler.process_config({"boo": "baa", "module_map": [{"module": "some.module", "astro": "baa.astro"}]})
@@ -88,7 +124,7 @@ def test_parse():
         out_file.write(astro)
     with open("./tests/comparisons/expected_default.html") as expected_html:
         with open("./tests/comparisons/generated_default.html") as generated_html:
-            assert generated_html.read().strip() == expected_html.read().strip()
+            assert normalize_markup(generated_html.read()) == normalize_markup(expected_html.read())
     # using the custom config
     args_custom = cli.arg_parser.parse_args(["--config", "./tests/yap_config_custom.toml"])
     yapper_config_custom = handler.load_config(args_custom)
@@ -103,7 +139,7 @@ def test_parse():
         out_file.write(astro)
     with open("./tests/comparisons/expected_custom.html") as expected_html:
         with open("./tests/comparisons/generated_custom.html") as generated_html:
-            assert generated_html.read().strip() == expected_html.read().strip()
+            assert normalize_markup(generated_html.read()) == normalize_markup(expected_html.read())
 
 
 def test_main():
@@ -115,7 +151,7 @@ def test_main():
     # verify the output file
     with open("./tests/comparisons/mock_default.astro") as astro_file:
         with open("./tests/comparisons/expected_default.astro") as expected_astro_file:
-            assert astro_file.read().strip() == expected_astro_file.read().strip()
+            assert normalize_markup(astro_file.read()) == normalize_markup(expected_astro_file.read())
     # using the custom yapper_config
     args_custom = cli.arg_parser.parse_args(["--config", "./tests/yap_config_custom.toml"])
     yapper_config_custom = handler.load_config(args_custom)
@@ -123,4 +159,1034 @@ def test_main():
     handler.main(yapper_config_custom)
     with open("./tests/comparisons/mock_custom.astro") as astro_file:
         with open("./tests/comparisons/expected_custom.astro") as expected_astro_file:
-            assert astro_file.read().strip() == expected_astro_file.read().strip()
+            assert normalize_markup(astro_file.read()) == normalize_markup(expected_astro_file.read())
+
+
+def test_load_module():
+    # modules from an already loaded package should be reused rather than parsed again
+    griffe_loader = GriffeLoader()
+    module_a = handler.load_module(griffe_loader, "tests.comparisons.mock_file")
+    module_b = handler.load_module(griffe_loader, "tests.comparisons.mock_file")
+    assert module_a is module_b
+    assert handler.load_module(griffe_loader, "tests.comparisons") is module_a.parent
+
+
+def test_build_manifest(tmp_path):
+    yapper_config = handler.process_config(
+        {"module_map": [{"module": "tests.comparisons.mock_file", "astro": "./tests/comparisons/mock_default.astro"}]}
+    )
+    module_info = yapper_config["module_map"][0]
+    griffe_loader = handler.create_loader(yapper_config)
+    source_files = cache.module_sources(handler.load_module(griffe_loader, module_info["module"]))
+    assert Path.cwd() / "tests/comparisons/mock_file.py" in source_files
+    assert Path.cwd() / "tests/__init__.py" in source_files
+    digest = cache.entry_digest(module_info, cache.hash_files(source_files), cache.config_digest(yapper_config))
+    out_path = tmp_path / "out.astro"
+    out_path.write_text("")
+    manifest = cache.BuildManifest(tmp_path / "cache")
+    assert not manifest.is_current(module_info["astro"], digest, out_path)
+    manifest.record(module_info["astro"], module_info["module"], digest, sources=source_files)
+    manifest.save()
+    # should be current, and keep the entry's sources, once reloaded from disk
+    manifest = cache.BuildManifest(tmp_path / "cache")
+    assert manifest.is_current(module_info["astro"], digest, out_path)
+    assert manifest.sources(module_info["astro"]) == source_files
+    # changes to the templates should invalidate the entry
+    yapper_config["intro_template"] = "boo"
+    changed_digest = cache.entry_digest(module_info, cache.hash_files(source_files), cache.config_digest(yapper_config))
+    assert not manifest.is_current(module_info["astro"], changed_digest, out_path)
+    # missing outputs should invalidate the entry
+    out_path.unlink()
+    assert not manifest.is_current(module_info["astro"], digest, out_path)
+    # cleaning removes the manifest
+    cache.clean_cache(tmp_path / "cache")
+    assert not cache.BuildManifest(tmp_path / "cache").entries
+
+
+def test_entry_digest_dependencies(tmp_path, monkeypatch):
+    package_dir = tmp_path / "dep_pkg"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text("")
+    (package_dir / "base.py").write_text("class Base:\n    pass\n")
+    (package_dir / "helpers.py").write_text("def helper():\n    pass\n")
+    (package_dir / "other.py").write_text("class Other:\n    pass\n")
+    (package_dir / "child.py").write_text(
+        "from dep_pkg.base import Base\nfrom dep_pkg.helpers import helper\n\n\nclass Child(Base):\n    pass\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yapper_config = {
+        "package_root_relative_path": str(tmp_path),
+        "module_map": [{"module": "dep_pkg.child", "astro": "./docs/child.astro"}],
+    }
+    griffe_loader = handler.create_loader(handler.process_config(copy.deepcopy(yapper_config)))
+    source_files = cache.module_sources(handler.load_module(griffe_loader, "dep_pkg.child"))
+    # the module, its parent package, its base class, and its re-exported members
+    assert source_files == sorted(package_dir / name for name in ["__init__.py", "base.py", "child.py", "helpers.py"])
+    handler.main(copy.deepcopy(yapper_config), clean=True)
+    plan = handler.BuildPlan(copy.deepcopy(yapper_config))
+    assert plan.sources(plan.yapper_config["module_map"][0]) == source_files
+    assert not plan.stale_entries
+    # editing a module which the entry doesn't depend on should keep it current
+    (package_dir / "other.py").write_text('class Other:\n    """Changed."""\n')
+    assert not handler.BuildPlan(copy.deepcopy(yapper_config)).stale_entries
+    # whereas editing the base class, or the parent package, should not
+    for name, code in [("base.py", 'class Base:\n    """Changed."""\n'), ("__init__.py", '"""Changed."""\n')]:
+        (package_dir / name).write_text(code)
+        assert handler.BuildPlan(copy.deepcopy(yapper_config)).stale_entries
+        handler.main(copy.deepcopy(yapper_config))
+    # entries without recorded sources have no digest
+    assert plan.digest(plan.yapper_config["module_map"][0], []) is None
+    assert cache.entry_digest(plan.yapper_config["module_map"][0], None, plan.config_digest) is None
+
+
+def test_reload_module(tmp_path, monkeypatch):
+    package_dir = tmp_path / "watched_pkg"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text("def func_a():\n    pass\n")
+    (package_dir / "sub.py").write_text("def func_b():\n    pass\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    griffe_loader = GriffeLoader()
+    sub_module = handler.load_module(griffe_loader, "watched_pkg.sub")
+    # reloading a changed submodule should only replace that submodule
+    (package_dir / "sub.py").write_text("def func_b():\n    pass\n\n\ndef func_c():\n    pass\n")
+    reloaded = watcher.reload_module(griffe_loader, "watched_pkg.sub")
+    assert reloaded is not sub_module
+    assert list(reloaded.members) == ["func_b", "func_c"]
+    assert handler.load_module(griffe_loader, "watched_pkg.sub") is reloaded
+    # reloading a package should carry over its submodules
+    (package_dir / "__init__.py").write_text("def func_a():\n    pass\n\n\ndef func_d():\n    pass\n")
+    package = watcher.reload_module(griffe_loader, "watched_pkg")
+    assert "func_d" in package.members
+    assert package["sub"] is reloaded
+
+
+def test_watch(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    package_dir = tmp_path / "watch_pkg"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text('"""Watched package."""\nfrom watch_pkg.base import Base\n')
+    (package_dir / "base.py").write_text(
+        'class Base:\n    """A base class."""\n\n    def run(self, a: int):\n        """Run the base."""\n'
+    )
+    (package_dir / "child.py").write_text(
+        'from watch_pkg.base import Base\n\n\nclass Child(Base):\n    """A child class."""\n'
+    )
+    (package_dir / "other.py").write_text('class Other:\n    """An unrelated class."""\n')
+    yapper_config = copy.deepcopy(yapper_clean_config)
+    yapper_config["package_root_relative_path"] = str(tmp_path)
+    yapper_config["module_map"] = [{"package": "watch_pkg", "astro_dir": "./docs"}]
+    loaded: list[str] = []
+    load_module = GriffeLoader.load_module
+
+    def counted_load_module(self, module_name, *args, **kwargs):
+        loaded.append(module_name)
+        return load_module(self, module_name, *args, **kwargs)
+
+    monkeypatch.setattr(GriffeLoader, "load_module", counted_load_module)
+    parsed: list[str] = []
+    parse_entry = handler.parse_entry
+
+    def counted_parse_entry(module_content, module_info, *args):
+        parsed.append(module_info["module"])
+        return parse_entry(module_content, module_info, *args)
+
+    monkeypatch.setattr(handler, "parse_entry", counted_parse_entry)
+    polls: list[int] = []
+
+    def edit_base(_seconds):
+        # the base class changes before the first poll
+        if not polls:
+            (package_dir / "base.py").write_text(
+                'class Base:\n    """A base class."""\n\n    def run(self, a: int):\n        """Run the changed base."""\n'
+            )
+            os.utime(package_dir / "base.py", ns=(time.time_ns(), time.time_ns() + 10**9))
+        polls.append(len(polls))
+
+    monkeypatch.setattr(watcher.time, "sleep", edit_base)
+    watcher.watch(copy.deepcopy(yapper_config), clean=True, max_polls=2)
+    assert polls == [0, 1]
+    # the package is loaded once, by the initial build, and then reused
+    assert loaded == ["watch_pkg"]
+    assert "Run the changed base." in (tmp_path / "docs" / "base.astro").read_text()
+    # only the entries depending on the changed module are rebuilt, i.e. the package re-exporting the base class, the
+    # base module, and the subclass module, and not the unrelated module
+    assert sorted(parsed[4:]) == ["watch_pkg", "watch_pkg.base", "watch_pkg.child"]
+    # the entries of dependent modules are rebuilt and recorded with their new digests
+    plan = handler.BuildPlan(copy.deepcopy(yapper_config))
+    assert not plan.stale_entries
+
+
+def test_render_cache(tmp_path):
+    rendered: list[str] = []
+
+    def render(text: str) -> str:
+        rendered.append(text)
+        return text.upper()
+
+    render_cache = cache.RenderCache(render, "config-a", max_size=2)
+    assert render_cache.render("a") == "A"
+    assert render_cache.render("a") == "A"
+    assert render_cache.stats() == {"hits": 1, "disk_hits": 0, "misses": 1}
+    # least recently used entries should be evicted beyond the size limit
+    render_cache.render("b")
+    render_cache.render("c")
+    assert render_cache.render("a") == "A"
+    assert rendered == ["a", "b", "c", "a"]
+    # the disk tier should persist between instances
+    render_cache.configure(max_size=2, disk_dir=tmp_path)
+    render_cache.render("d")
+    disk_cache = cache.RenderCache(render, "config-a")
+    disk_cache.configure(max_size=2, disk_dir=tmp_path)
+    assert disk_cache.render("d") == "D"
+    assert disk_cache.stats() == {"hits": 0, "disk_hits": 1, "misses": 0}
+    # a different configuration should not share entries
+    other_cache = cache.RenderCache(render, "config-b")
+    other_cache.configure(max_size=2, disk_dir=tmp_path)
+    other_cache.render("d")
+    assert other_cache.stats()["misses"] == 1
+    # the disk tier should evict the least recently used entries beyond its size limit
+    bounded_dir = tmp_path / "bounded"
+    bounded_cache = cache.RenderCache(render, "config-a", max_size=0, max_bytes=3)
+    bounded_cache.configure(max_size=0, disk_dir=bounded_dir)
+    for idx, text in enumerate(["e", "f", "g", "h"]):
+        existing = set(bounded_dir.glob("*/*.html"))
+        bounded_cache.render(text)
+        # distinct modification times, since writes within a clock tick may share one
+        for entry_path in set(bounded_dir.glob("*/*.html")) - existing:
+            os.utime(entry_path, ns=(idx * 10**9, idx * 10**9))
+    assert sorted(path.read_text() for path in bounded_dir.glob("*/*.html")) == ["G", "H"]
+    # lowering the limit evicts on configuration
+    bounded_cache.configure(max_size=0, disk_dir=bounded_dir, max_bytes=1)
+    assert list(bounded_dir.glob("*/*.html")) == []
+
+
+def test_clean_markdown():
+    # prose lines should be welded, tables, code blocks and admonitions should be kept on separate lines
+    text = "\n".join(
+        [
+            "Some text",
+            "  continued here.",
+            "",
+            "| a | b |",
+            "|---|---|",
+            "    ```python",
+            "    x = 1",
+            "    ```",
+            ":::note",
+            "  A note.",
+            ":::",
+            "- a list item",
+            "welded # pylint: disable=line-too-long",
+        ]
+    )
+    expected = (
+        "\nSome text continued here.\n\n"
+        "| a | b |\n|---|---|"
+        "\n```python\nx = 1\n```\n\n"
+        ":::note\nA note.\n:::"
+        "\n- a list item welded\n"
+    )
+    assert parser.clean_markdown(text) == expected
+    # unclosed blocks should raise
+    with pytest.raises(ValueError):
+        parser.clean_markdown("```python\nx = 1")
+
+
+def test_render_backends():
+    # the streaming emitter should produce markup identical to the dominate DOM
+    for heading_level in ["h1", "h2"]:
+        html_emitter = emitter.HtmlEmitter()
+        parser.emit_heading(html_emitter, heading_level, "Some <heading> & name", "yap heading")
+        dom_heading = parser.generate_heading(heading_level, "Some <heading> & name", "yap heading")
+        assert html_emitter.getvalue() == dom_heading.render()
+    griffe_loader = GriffeLoader()
+    module_content = griffe_loader.load_module("tests.comparisons.mock_file")
+    module_function = module_content.members["mock_function"]
+    html_emitter = emitter.HtmlEmitter()
+    parser.emit_signature(html_emitter, module_function)
+    assert html_emitter.getvalue() == parser.process_signature(module_function).render()
+    # classes, with their base classes, properties, and methods, should also be emitted identically
+    for class_name in ["ParentClass", "ChildClass"]:
+        module_class = module_content.members[class_name]
+        html_emitter = emitter.HtmlEmitter()
+        parser.emit_class(html_emitter, module_class)
+        assert html_emitter.getvalue() == parser.process_class(module_class).render()
+        assert 'class="yap class-prop-elem-container"' in html_emitter.getvalue()
+        assert f'id="{class_name.lower()}-init"' in html_emitter.getvalue()
+    assert 'class="yap class-base"' in html_emitter.getvalue()
+    # already built fragments should be emitted identically
+    fragment = parser.add_heading(tags.div(tags.div("a & b", cls="yap"), cls="yap outer"), heading="Notes")
+    html_emitter = emitter.HtmlEmitter()
+    html_emitter.open("section")
+    html_emitter.dom(fragment)
+    html_emitter.close()
+    assert html_emitter.getvalue() == tags.section(fragment).render()
+    # including fragments containing templates
+    fragment = tags.section(parser.generate_heading("h2", "foo", "yap"), cls="yap")
+    html_emitter = emitter.HtmlEmitter()
+    html_emitter.dom(fragment)
+    assert html_emitter.getvalue() == fragment.render()
+    # streamed chunks should join to the complete page for either backend
+    for render_backend in handler.RENDER_BACKENDS:
+        yapper_config = copy.deepcopy(yapper_clean_config)
+        yapper_config["render_backend"] = render_backend
+        chunks = list(parser.iter_parse(module_content, yapper_config))
+        assert len(chunks) > 3
+        assert "".join(chunks) == parser.parse(module_content, yapper_config)
+
+
+def test_compact_output():
+    # compact markup should match dominate's unindented rendering, including templates
+    fragment = tags.section(
+        parser.generate_heading("h2", "foo", "yap"),
+        parser.add_heading(tags.div(tags.div("a & b", cls="yap"), cls="yap outer"), heading="Notes"),
+        cls="yap",
+    )
+    html_emitter = emitter.HtmlEmitter(compact=True)
+    html_emitter.dom(fragment)
+    compact = html_emitter.getvalue()
+    assert compact == fragment.render(pretty=False)
+    assert "\n" not in compact
+    # headings reference the shared link icon symbol instead of repeating its path
+    assert f'<use href="#{parser.LINK_ICON_ID}"></use>' in compact
+    assert parser.LINK_ICON.strip() not in compact
+    griffe_loader = GriffeLoader()
+    module_content = griffe_loader.load_module("tests.comparisons.mock_file")
+    yapper_config = copy.deepcopy(yapper_clean_config)
+    pages = {}
+    for render_backend in handler.RENDER_BACKENDS:
+        yapper_config["render_backend"] = render_backend
+        yapper_config["compact_output"] = True
+        pages[render_backend] = parser.parse(module_content, yapper_config)
+        assert "".join(parser.iter_parse(module_content, yapper_config)) == pages[render_backend]
+        yapper_config["compact_output"] = False
+        pretty = parser.parse(module_content, yapper_config)
+        assert len(pages[render_backend]) < len(pretty)
+        # besides line breaks, indentation, and the shared icon, compact pages match pretty pages, classes included
+        pretty = pretty.replace(
+            f'<path clip-rule="evenodd" d="{parser.LINK_ICON}" fill-rule="evenodd"></path>',
+            f'<use href="#{parser.LINK_ICON_ID}"></use>',
+        )
+        compact = re.sub(r'<svg aria-hidden="true" style="display: none".*?</svg>', "", pages[render_backend], count=1)
+        assert 'id="childclass"' in compact
+        assert re.sub(r"\s*\n\s*", "", compact) == re.sub(r"\s*\n\s*", "", pretty)
+    assert pages["dom"] == pages["stream"]
+    # the icon's path is written once per page
+    assert pages["dom"].count(parser.LINK_ICON.strip()) == 1
+    assert pages["dom"].count(f'id="{parser.LINK_ICON_ID}"') == 1
+
+
+def test_fragment_templates():
+    # templates should render identically to the equivalent dominate structure at any depth
+    for depth in range(4):
+        reference = tags.div(
+            tags.div(
+                tags.div("a <name>", cls="yap class-prop-def-name"),
+                tags.div("int", cls="yap class-prop-def-type"),
+                cls="yap class-prop-def",
+            ),
+            tags.div("a & description", cls="yap class-prop-def-desc"),
+            cls="yap class-prop-elem-container",
+        )
+        templated = emitter.TemplateTag(
+            parser.PROP_ROW_TEMPLATE, {"name": "a <name>", "type": "int", "desc": "a & description"}
+        )
+        for _ in range(depth):
+            reference = tags.section(reference)
+            templated = tags.section(templated)
+        assert templated.render() == reference.render()
+
+
+def test_slug_registry():
+    slug_registry = slugs.SlugRegistry()
+    assert slug_registry.anchor("foo_bar") == "foo-bar"
+    # colliding names should receive deterministic numbered suffixes
+    assert slug_registry.anchor("Foo_Bar") == "foo-bar-1"
+    assert slug_registry.anchor("foo bar") == "foo-bar-2"
+    # suffixed anchors should not collide with existing anchors
+    assert slug_registry.anchor("foo-bar-3") == "foo-bar-3"
+    assert slug_registry.anchor("FOO BAR") == "foo-bar-4"
+    # links resolve to the first heading generated for a name
+    assert slug_registry.link("Foo_Bar") == "foo-bar-1"
+    assert slug_registry.link("Unseen") == "unseen"
+    # headings should use the registry when provided
+    html_emitter = emitter.HtmlEmitter()
+    parser.emit_heading(html_emitter, "h2", "foo_bar", "yap", slug_registry=slug_registry)
+    assert 'id="foo-bar-5"' in html_emitter.getvalue()
+    # memoized slugs are bounded for long-lived processes
+    assert slugs.cached_slugify.cache_info().maxsize == slugs.SLUG_CACHE_SIZE
+
+
+def test_profiler(tmp_path):
+    yapper_profiler = profiler.Profiler()
+    # disabled profilers should return the shared no-op context and record nothing
+    with yapper_profiler.stage("render", module="foo"):
+        pass
+    assert yapper_profiler.stage("render") is yapper_profiler.stage("write")
+    assert not yapper_profiler.records
+    yapper_profiler.start()
+    with yapper_profiler.stage("render", module="foo"):
+        with yapper_profiler.stage("process_function", member="foo.bar"):
+            _allocated = [0] * 10000
+    yapper_profiler.stop()
+    inner, outer = yapper_profiler.records
+    # nested stages inherit the module and are excluded from the self times of enclosing stages
+    assert inner["module"] == "foo" and inner["member"] == "foo.bar"
+    assert outer["self_wall"] == pytest.approx(outer["wall"] - inner["wall"])
+    assert inner["allocated"] > 0
+    report = yapper_profiler.report()
+    assert set(report["stages"]) == {"render", "process_function"}
+    assert report["modules"]["foo"]["self_wall"] == pytest.approx(outer["wall"])
+    assert report["members"][0]["member"] == "foo.bar"
+    yapper_profiler.write_report(tmp_path / "profile.json")
+    assert json.loads((tmp_path / "profile.json").read_text())["stages"]["render"]["count"] == 1
+    assert "foo.bar" in yapper_profiler.summary()
+
+
+def test_cli_deferred_imports():
+    # import in a fresh interpreter, since the deferred modules are already imported by this test module
+    script = "import json, sys\nimport yapper.cli\nprint(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    imported = json.loads(result.stdout)
+    assert "yapper.handler" in imported
+    for module_name in DEFERRED_IMPORTS:
+        assert not [name for name in imported if name == module_name or name.startswith(f"{module_name}.")]
+
+
+def test_diagnostics(tmp_path):
+    module_function = GriffeLoader().load_module("tests.comparisons.mock_file").members["mock_function"]
+    collector = diagnostics.DiagnosticsCollector()
+    collector.module = "tests.comparisons.mock_file"
+    collector.add("param_count", module_function, signature=["param_a", "param_b"], docstring=["param_a"])
+    collector.add("return_type", module_function, signature="int", docstring=[])
+    record = collector.records[0]
+    # records should locate the member for annotations
+    assert record.member == "tests.comparisons.mock_file.mock_function"
+    assert record.path is not None and record.path.endswith("mock_file.py")
+    assert record.line == module_function.lineno
+    assert "['param_a', 'param_b']" in record.message()
+    # summaries are grouped per kind, and only list each message if verbose
+    assert "param_count: 1 across 1 modules" in collector.summary()
+    assert record.message() not in collector.summary()
+    assert record.message() in collector.summary(verbose=True)
+    collector.write_json(tmp_path / "diagnostics.json")
+    written = json.loads((tmp_path / "diagnostics.json").read_text())
+    assert [diagnostic["kind"] for diagnostic in written] == ["param_count", "return_type"]
+    assert written[0]["message"] == record.message()
+    # verbosity arguments set the level of the yapper loggers
+    cli.configure_logging(cli.arg_parser.parse_args(["--quiet"]))
+    assert logging.getLogger("yapper").level == logging.WARNING
+    cli.configure_logging(cli.arg_parser.parse_args(["--verbose"]))
+    assert logging.getLogger("yapper").level == logging.DEBUG
+    with pytest.raises(SystemExit):
+        cli.arg_parser.parse_args(["--quiet", "--verbose"])
+
+
+def test_output_writer(tmp_path):
+    output_writer = output.OutputWriter()
+    out_path = tmp_path / "nested" / "mock.astro"
+    assert output_writer.write(out_path, "<div>mock</div>")
+    assert out_path.read_text() == "<div>mock</div>"
+    # identical content should not be rewritten, keeping the modification time
+    mtime = out_path.stat().st_mtime_ns
+    assert not output_writer.write(out_path, "<div>mock</div>")
+    assert out_path.stat().st_mtime_ns == mtime
+    # changed content is replaced without leaving temporary files
+    assert output_writer.write(out_path, "<div>changed</div>")
+    assert out_path.read_text() == "<div>changed</div>"
+    assert [path.name for path in out_path.parent.iterdir()] == ["mock.astro"]
+    assert output_writer.remove(out_path)
+    assert not output_writer.remove(out_path)
+    assert output_writer.counts() == {"written": 2, "unchanged": 1, "removed": 1}
+    # chunks are streamed to the output path, also skipping identical content
+    assert output_writer.write(out_path, iter(["<div>", "chunked", "</div>"]))
+    assert not output_writer.write(out_path, iter(["<div>chunk", "ed</div>"]))
+    assert out_path.read_text() == "<div>chunked</div>"
+
+    def failing_chunks():
+        yield "<div>"
+        raise ValueError("render failed")
+
+    # failed renders leave the previous output in place
+    with pytest.raises(ValueError):
+        output_writer.write(out_path, failing_chunks())
+    assert out_path.read_text() == "<div>chunked</div>"
+    assert [path.name for path in out_path.parent.iterdir()] == ["mock.astro"]
+    # the manifest reports dropped entries so that their outputs can be pruned
+    manifest = cache.BuildManifest(tmp_path / "cache")
+    manifest.record("a.astro", "a", "digest_a")
+    manifest.record("b.astro", "b", "digest_b")
+    assert manifest.prune(["a.astro"]) == ["b.astro"]
+
+
+def test_build_daemon(tmp_path, monkeypatch):
+    import threading
+
+    from yapper import client, server
+
+    package_dir = tmp_path / "daemon_pkg"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text("def func_a():\n    pass\n")
+    (package_dir / "sub.py").write_text("def func_b():\n    pass\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(parser, "parse", lambda module_content, yapper_config: ",".join(module_content.members))
+    yapper_config = {
+        "module_map": [
+            {"module": "daemon_pkg", "astro": "out/daemon_pkg.astro"},
+            {"module": "daemon_pkg.sub", "astro": "out/daemon_pkg_sub.astro"},
+        ]
+    }
+    build_daemon = server.BuildDaemon(yapper_config)
+    reloaded: list[str] = []
+    reload_module = watcher.reload_module
+    monkeypatch.setattr(
+        watcher, "reload_module", lambda loader, name: reloaded.append(name) or reload_module(loader, name)
+    )
+    sourced: list[int] = []
+    entry_sources = watcher.entry_sources
+    monkeypatch.setattr(
+        watcher, "entry_sources", lambda loader, module_map: sourced.append(1) or entry_sources(loader, module_map)
+    )
+    connection = {"socket_path": str(tmp_path / "yapper.sock")}
+    build_server = server.make_server(build_daemon, **connection)
+    thread = threading.Thread(target=build_server.serve_forever)
+    thread.start()
+    try:
+        assert client.status(**connection)["modules"] == ["daemon_pkg", "daemon_pkg.sub"]
+        result = client.rebuild(**connection)
+        assert result["written"] == ["out/daemon_pkg.astro", "out/daemon_pkg_sub.astro"]
+        # unchanged entries are skipped unless forced
+        assert client.rebuild(**connection)["skipped"] == ["out/daemon_pkg.astro", "out/daemon_pkg_sub.astro"]
+        assert client.rebuild(modules=["daemon_pkg"], force=True, **connection)["unchanged"] == ["out/daemon_pkg.astro"]
+        # unchanged source files aren't re-visited, and the entries' sources are found once per request
+        assert not reloaded
+        assert len(sourced) == 3
+        # changed source paths are mapped to their entries and re-visited
+        (package_dir / "sub.py").write_text("def func_b():\n    pass\n\n\ndef func_c():\n    pass\n")
+        result = client.rebuild(paths=[str(package_dir / "sub.py")], modules=["missing"], **connection)
+        assert result["written"] == ["out/daemon_pkg_sub.astro"]
+        assert result["unknown"] == ["missing"]
+        assert (tmp_path / "out" / "daemon_pkg_sub.astro").read_text() == "func_b,func_c"
+        assert reloaded == ["daemon_pkg.sub"]
+        # as are changed source files of the requested modules
+        (package_dir / "sub.py").write_text("def func_d():\n    pass\n")
+        os.utime(package_dir / "sub.py", ns=(time.time_ns(), time.time_ns() + 10**9))
+        assert client.rebuild(modules=["daemon_pkg.sub"], **connection)["written"] == ["out/daemon_pkg_sub.astro"]
+        assert (tmp_path / "out" / "daemon_pkg_sub.astro").read_text() == "func_d"
+        with pytest.raises(RuntimeError):
+            client.request("POST", "/rebuild", {"modules": "daemon_pkg"}, **connection)
+        assert client.shutdown(**connection) == {"stopping": True}
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+    finally:
+        build_server.shutdown()
+        build_server.server_close()
+
+
+def test_serve_initial_build(tmp_path, monkeypatch):
+    import socket
+
+    from yapper import server
+
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    package_dir = tmp_path / "serve_pkg"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text('def run(a: int):\n    """Run the package."""\n')
+    (package_dir / "sub.py").write_text('def walk(b: str):\n    """Walk the submodule."""\n')
+    yapper_config = copy.deepcopy(yapper_clean_config)
+    yapper_config["package_root_relative_path"] = str(tmp_path)
+    yapper_config["module_map"] = [{"package": "serve_pkg", "astro_dir": "./docs"}]
+    # the daemon reuses the build plan and loaded modules of the initial build
+    griffe_loader = handler.create_loader(yapper_config)
+    plan = handler.main(copy.deepcopy(yapper_config), griffe_loader=griffe_loader)
+    package = griffe_loader.modules_collection["serve_pkg"]
+    build_daemon = server.BuildDaemon(yapper_config, plan, griffe_loader)
+    assert build_daemon.plan is plan
+    assert griffe_loader.modules_collection["serve_pkg"] is package
+    assert build_daemon.rebuild()["skipped"] == ["docs/index.astro", "docs/sub.astro"]
+    # unix domain sockets raise a clear error where unsupported
+    monkeypatch.delattr(socket, "AF_UNIX")
+    with pytest.raises(ValueError):
+        server.make_server(build_daemon, socket_path=str(tmp_path / "yapper.sock"))
+
+
+def test_module_cache(tmp_path, monkeypatch):
+    package_dir = tmp_path / "cached_pkg"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text('"""Package."""\n')
+    sub_code = 'def func_a(a: int = 1) -> str:\n    """\n    Summary.\n        Indented.\n    """\n'
+    (package_dir / "sub.py").write_text(sub_code)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module_cache = cache.ModuleTreeCache(tmp_path / "modules", max_bytes=1024 * 1024)
+    loaded = module_cache.load_module(GriffeLoader(), "cached_pkg.sub")
+    assert module_cache.stats() == {"hits": 0, "misses": 1, "evicted": 0}
+    # unchanged packages are restored from the cache into the loader's modules collection
+    griffe_loader = GriffeLoader()
+    restored = module_cache.load_module(griffe_loader, "cached_pkg.sub")
+    assert module_cache.stats() == {"hits": 1, "misses": 1, "evicted": 0}
+    assert handler.load_module(griffe_loader, "cached_pkg.sub") is restored
+    assert restored.path == "cached_pkg.sub"
+    assert restored.filepath == loaded.filepath
+    func_a = restored["func_a"]
+    assert func_a.docstring.value == loaded["func_a"].docstring.value == "Summary.\n    Indented."
+    assert [(param.name, str(param.annotation), param.default) for param in func_a.parameters] == [("a", "int", "1")]
+    assert str(func_a.returns) == "str"
+    # changed sources miss the cache
+    (package_dir / "sub.py").write_text(sub_code + "\n\ndef func_b():\n    pass\n")
+    assert "func_b" in module_cache.load_module(GriffeLoader(), "cached_pkg.sub").members
+    assert module_cache.misses == 2
+    # the least recently used entries are evicted beyond the size limit
+    entry_paths = sorted((tmp_path / "modules").glob("*/*.json"), key=lambda path: path.stat().st_mtime_ns)
+    assert len(entry_paths) == 2
+    module_cache.max_bytes = entry_paths[-1].stat().st_size
+    module_cache.evict()
+    assert list((tmp_path / "modules").glob("*/*.json")) == [entry_paths[-1]]
+    assert module_cache.evicted == 1
+    # unreadable entries are ignored and replaced
+    entry_paths[-1].write_text("{")
+    assert "func_b" in module_cache.load_module(GriffeLoader(), "cached_pkg.sub").members
+    assert module_cache.misses == 3
+    # a disabled cache loads directly
+    assert "func_b" in cache.ModuleTreeCache().load_module(GriffeLoader(), "cached_pkg.sub").members
+
+
+def test_expand_module_map(tmp_path, monkeypatch):
+    package_dir = tmp_path / "discovered_pkg"
+    for sub_dir in ["", "sub", "sub/tests", "data-files"]:
+        (package_dir / sub_dir).mkdir(exist_ok=True)
+    for file_name in ["__init__.py", "mod.py", "mod.pyi", "sub/__init__.py", "sub/deep.py", "sub/tests/__init__.py"]:
+        (package_dir / file_name).write_text("")
+    # modules in directories which aren't packages are not importable
+    (package_dir / "data-files" / "script.py").write_text("")
+    (package_dir / "sub" / "tests" / "scripts").mkdir()
+    (package_dir / "sub" / "tests" / "scripts" / "script.py").write_text("")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    # package entries are validated
+    with pytest.raises(KeyError):
+        handler.process_config({"module_map": [{"package": "discovered_pkg"}]})
+    with pytest.raises(TypeError):
+        handler.process_config({"module_map": [{"package": "discovered_pkg", "astro_dir": "api", "exclude": "x"}]})
+    yapper_config = handler.process_config(
+        {
+            "module_map": [
+                {"module": "discovered_pkg.mod", "astro": "custom/mod.astro"},
+                {"package": "discovered_pkg", "astro_dir": "src/pages/api", "exclude": ["*.tests*"]},
+            ]
+        }
+    )
+    expanded_config = handler.expand_module_map(yapper_config)
+    # individually listed modules keep their entries, and packages are written to index files
+    assert expanded_config["module_map"] == [
+        {"module": "discovered_pkg.mod", "astro": "custom/mod.astro"},
+        {"module": "discovered_pkg", "astro": "src/pages/api/index.astro"},
+        {"module": "discovered_pkg.sub", "astro": "src/pages/api/sub/index.astro"},
+        {"module": "discovered_pkg.sub.deep", "astro": "src/pages/api/sub/deep.astro"},
+    ]
+    # the original config is unchanged and expanded configs are expanded again unchanged
+    assert len(yapper_config["module_map"]) == 2
+    assert handler.expand_module_map(expanded_config) is expanded_config
+    # subpackages can be discovered on their own
+    sub_map = handler.discover_package({"package": "discovered_pkg.sub", "astro_dir": "api", "exclude": []})
+    assert [module_info["module"] for module_info in sub_map] == [
+        "discovered_pkg.sub",
+        "discovered_pkg.sub.deep",
+        "discovered_pkg.sub.tests",
+    ]
+    with pytest.raises(ValueError):
+        handler.discover_package({"package": "discovered_pkg.missing", "astro_dir": "api", "exclude": []})
+
+
+def test_docstring_cache(tmp_path, monkeypatch):
+    fragment_cache = cache.FragmentCache(max_size=2)
+    for key in ["a", "b", "a", "c"]:
+        if fragment_cache.get(key) is None:
+            fragment_cache.put(key, key.upper())
+    # the least recently used entry is evicted
+    assert list(fragment_cache.entries) == ["a", "c"]
+    assert fragment_cache.stats() == {"hits": 1, "misses": 3}
+    assert cache.FragmentCache.key("doc", [["a", "int"]]) != cache.FragmentCache.key("doc", [["a", "str"]])
+    (tmp_path / "docstring_mod.py").write_text(
+        'def func_a(a: int):\n    """Shared."""\n\n\ndef func_b(a: int):\n    """Shared."""\n\n\n'
+        'def func_c(a: str):\n    """Shared."""\n'
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module_content = GriffeLoader().load_module("docstring_mod")
+    built: list[str] = []
+
+    def build_func_docstring(module_function):
+        built.append(module_function.name)
+        diagnostics.diagnostics.add("param_type", module_function, param="a", docstring="str", signature="int")
+        doc_str_frag = tags.div(cls="yap")
+        with doc_str_frag:
+            tags.p(module_function.docstring.value)
+        return doc_str_frag
+
+    monkeypatch.setattr(parser, "build_func_docstring", build_func_docstring)
+    rendered = {}
+    for cache_size in [0, 1024]:
+        parser.docstring_cache.clear()
+        parser.docstring_cache.configure(cache_size)
+        diagnostics.diagnostics.clear()
+        built.clear()
+        rendered[cache_size] = [parser.render_module_dom(module_content), parser.render_module_stream(module_content)]
+        # diagnostics are recorded for each function, including cached ones
+        assert [record.member for record in diagnostics.diagnostics.records] == [
+            f"docstring_mod.func_{name}" for name in "abcabc"
+        ]
+    # identical docstrings and signatures are built once, and the rendered output is unchanged
+    assert built == ["func_a", "func_c"]
+    assert parser.docstring_cache.stats() == {"hits": 4, "misses": 2}
+    assert len(set(rendered[0] + rendered[1024])) == 1
+    parser.docstring_cache.clear()
+    diagnostics.diagnostics.clear()
+
+
+def test_search_index(tmp_path, monkeypatch):
+    assert search.tokenize("The SlugRegistry for HTMLParser_v2") == [
+        "slugregistry",
+        "slug",
+        "registry",
+        "htmlparser_v2",
+        "html",
+        "parser",
+    ]
+    assert search.page_url("./src/pages/api/index.astro") == "/api/"
+    assert search.page_url("./src/pages/api/core.astro") == "/api/core"
+    assert search.page_url("./tests/mock_default.astro") == "/tests/mock_default"
+    (tmp_path / "search_mod.py").write_text(
+        'class Network:\n    """A street network."""\n\n    def shortest_path(self, source: int):\n'
+        '        """Find a route."""\n'
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module_content = GriffeLoader().load_module("search_mod")
+    network = module_content.members["Network"]
+    collector = search.SearchCollector()
+    collector.add("class", network, "Network", "network")
+    # documents are only collected once enabled, for the current module
+    assert collector.entries == {}
+    collector.enabled = True
+    collector.module = "search_mod"
+    collector.add("class", network, "Network", "network")
+    collector.add("function", network.members["shortest_path"], "Network.shortest_path", "network-shortest-path")
+    docs = collector.pop("search_mod")
+    assert collector.entries == {}
+    assert docs[1][:3] == ["network-shortest-path", "Network.shortest_path", "f"]
+    assert "source" in docs[1][3] and "self" not in docs[1][3]
+    # documents are persisted between runs and pruned to the module map
+    entries = search.SearchEntries(tmp_path / "cache")
+    entries.record("./src/pages/search.astro", docs)
+    entries.record("./src/pages/removed.astro", docs)
+    entries.prune(["./src/pages/search.astro"])
+    entries.save()
+    entries = search.SearchEntries(tmp_path / "cache")
+    assert list(entries.pages) == ["./src/pages/search.astro"]
+    index = json.loads(search.dumps_index(search.build_index(entries.pages)))
+    assert index["pages"] == ["/search"]
+    assert index["tokens"] == sorted(index["tokens"])
+    assert search.lookup(index, "netw") == {0, 1}
+    # title matches are ranked first, and each query token has to match
+    assert [result["url"] for result in search.search(index, "network")] == [
+        "/search#network",
+        "/search#network-shortest-path",
+    ]
+    assert search.search(index, "route street") == []
+    # documents on shard pages are indexed with their page
+    sharded_docs = [doc[:] for doc in docs]
+    collector.entries["search_mod"] = sharded_docs
+    collector.assign_pages("search_mod", "./src/pages/search.astro", {"network": "./src/pages/search/network.astro"})
+    sharded_index = search.build_index({"./src/pages/search.astro": collector.pop("search_mod")})
+    assert sharded_index["pages"] == ["/search", "/search/network"]
+    assert search.search(sharded_index, "street")[0]["url"] == "/search/network#network"
+    assert search.search(index, "rout sour") == [
+        {"url": "/search#network-shortest-path", "title": "Network.shortest_path", "kind": "f"}
+    ]
+    # the index is written to the configured path relative to the package root
+    yapper_config = copy.deepcopy(yapper_clean_config)
+    yapper_config["module_map"] = [{"module": "search_mod", "astro": "./src/pages/search.astro"}]
+    yapper_config["search_index"] = "public/search.json"
+    with pytest.raises(ValueError):
+        handler.process_config(dict(yapper_config, search_index="search.txt"))
+    writer = output.OutputWriter()
+    handler.write_search_index(yapper_config, tmp_path, entries, writer)
+    assert json.loads((tmp_path / "public/search.json").read_text()) == index
+
+
+def test_shard_pages(tmp_path):
+    griffe_loader = GriffeLoader()
+    module_content = griffe_loader.load_module("tests.comparisons.mock_file")
+    yapper_config = copy.deepcopy(yapper_clean_config)
+    yapper_config["shard_by"] = "members"
+    astro_key = "./src/pages/mock_file.astro"
+    # modules within the policy's limit are rendered to a single page
+    assert parser.parse_pages(module_content, yapper_config, astro_key) == {
+        astro_key: parser.parse(module_content, yapper_config)
+    }
+    yapper_config["shard_max_members"] = 1
+    pages = {}
+    for render_backend in handler.RENDER_BACKENDS:
+        yapper_config["render_backend"] = render_backend
+        pages[render_backend] = parser.parse_pages(module_content, yapper_config, astro_key)
+    assert pages["dom"] == pages["stream"]
+    assert list(pages["dom"]) == [astro_key] + [parser.shard_path(astro_key, str(idx)) for idx in range(1, 4)]
+    index_page = pages["dom"][astro_key]
+    assert '<a href="/mock_file/1#mock-function">mock_function</a>' in index_page
+    # the child class's base class link points to the parent class's page
+    assert 'href="/mock_file/2#parentclass"' in pages["dom"]["./src/pages/mock_file/3.astro"]
+    # each class has its own page while functions remain on the index page
+    yapper_config["shard_by"] = "class"
+    pages = parser.parse_pages(module_content, yapper_config, astro_key)
+    assert list(pages) == [
+        astro_key,
+        "./src/pages/mock_file/parentclass.astro",
+        "./src/pages/mock_file/childclass.astro",
+    ]
+    assert 'id="mock-function"' in pages[astro_key]
+    # shard pages are recorded in the manifest and removed once no longer built
+    yapper_config["prune_outputs"] = True
+    module_info = {"module": "tests.comparisons.mock_file", "astro": astro_key}
+    manifest = cache.BuildManifest(tmp_path / "cache")
+    writer = output.OutputWriter()
+    assert handler.store_entry(module_info, pages, "digest", tmp_path, manifest, writer, yapper_config)
+    assert manifest.shards(astro_key) == list(pages)[1:]
+    assert manifest.is_current(astro_key, "digest", tmp_path / astro_key)
+    (tmp_path / "src/pages/mock_file/childclass.astro").unlink()
+    assert not manifest.is_current(astro_key, "digest", tmp_path / astro_key)
+    handler.store_entry(module_info, {astro_key: "page"}, "digest", tmp_path, manifest, writer, yapper_config)
+    assert not (tmp_path / "src/pages/mock_file/parentclass.astro").exists()
+    assert manifest.shards(astro_key) == []
+    # as are the shard pages of entries removed from the module map
+    manifest.record(astro_key, module_info["module"], "digest", ["./src/pages/mock_file/1.astro"])
+    assert manifest.prune([]) == [astro_key, "./src/pages/mock_file/1.astro"]
+
+
+def test_batch(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    for package_name in ["batch_alpha", "batch_beta"]:
+        package_dir = tmp_path / "packages" / package_name
+        (package_dir / package_name).mkdir(parents=True)
+        (package_dir / package_name / "__init__.py").write_text('def run(a: int):\n    """Run."""\n')
+        (package_dir / "pyproject.toml").write_text(
+            toml.dumps(
+                {
+                    "tool": {
+                        "yapper": {"module_map": [{"module": package_name, "astro": f"./docs/{package_name}.astro"}]}
+                    }
+                }
+            )
+        )
+    # packages without a yapper section are skipped
+    (tmp_path / "packages" / "other").mkdir()
+    (tmp_path / "packages" / "other" / "pyproject.toml").write_text('[project]\nname = "other"\n')
+    yapper_configs = handler.load_batch_configs([str(tmp_path / "packages" / "*" / "pyproject.toml")])
+    # package roots are relative to each config file
+    assert [yapper_config["package_root_relative_path"] for yapper_config in yapper_configs] == [
+        str(tmp_path / "packages" / "batch_alpha" / "."),
+        str(tmp_path / "packages" / "batch_beta" / "."),
+    ]
+    with pytest.raises(ValueError):
+        handler.load_batch_configs([str(tmp_path / "missing" / "*.toml")])
+    with caplog.at_level(logging.INFO, logger="yapper"):
+        handler.batch(copy.deepcopy(yapper_configs))
+    assert (tmp_path / "packages" / "batch_alpha" / "docs" / "batch_alpha.astro").exists()
+    assert (tmp_path / "packages" / "batch_beta" / "docs" / "batch_beta.astro").exists()
+    assert "Built 2 configs: 2 of 2 modules processed." in caplog.text
+    # each config keeps its own build manifest
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger="yapper"):
+        handler.batch(copy.deepcopy(yapper_configs))
+    assert "Built 2 configs: 0 of 2 modules processed." in caplog.text
+
+
+def test_pipeline(tmp_path, monkeypatch):
+    produced = []
+
+    def items():
+        for idx in range(10):
+            produced.append(idx)
+            yield idx
+
+    # items are yielded in order while the producer stays within the queue size of the consumer
+    prefetched = pipeline.prefetch(items(), 2)
+    assert next(prefetched) == 0
+    time.sleep(0.2)
+    # the queued items, and an item waiting to be queued
+    assert len(produced) <= 4
+    assert list(prefetched) == list(range(1, 10))
+
+    def failing():
+        yield 1
+        raise ValueError("bad module")
+
+    with pytest.raises(ValueError):
+        list(pipeline.prefetch(failing(), 2))
+    # consumer errors are raised on the calling thread
+    consumed = []
+    with pipeline.Consumer(consumed.append, 2) as consumer:
+        for idx in range(5):
+            consumer.put(idx)
+    assert consumed == list(range(5))
+
+    def fail(_item):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        with pipeline.Consumer(fail, 2) as consumer:
+            consumer.put(1)
+    # pipelined builds write the same pages as builds which run the stages in turn
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    for module_name in ["pipe_alpha", "pipe_beta", "pipe_gamma"]:
+        (tmp_path / f"{module_name}.py").write_text(f'def {module_name}(a: int):\n    """Run {module_name}."""\n')
+    yapper_config = copy.deepcopy(yapper_clean_config)
+    yapper_config["package_root_relative_path"] = str(tmp_path)
+    yapper_config["module_map"] = [
+        {"module": module_name, "astro": f"./docs/{module_name}.astro"}
+        for module_name in ["pipe_alpha", "pipe_beta", "pipe_gamma"]
+    ]
+    resolve_calls = []
+    resolve_aliases = GriffeLoader.resolve_aliases
+    monkeypatch.setattr(
+        GriffeLoader,
+        "resolve_aliases",
+        lambda self, **kwargs: resolve_calls.append(1) or resolve_aliases(self, **kwargs),
+    )
+    pages = {}
+    for queue_size in [0, 2]:
+        yapper_config["pipeline_queue_size"] = queue_size
+        resolve_calls.clear()
+        handler.main(copy.deepcopy(yapper_config), clean=True)
+        pages[queue_size] = {path.name: path.read_text() for path in (tmp_path / "docs").glob("*.astro")}
+        assert len(pages[queue_size]) == 3
+        # aliases are resolved once all of the modules are loaded, rather than per loaded module
+        assert len(resolve_calls) == 1
+    assert pages[0] == pages[2]
+
+    # parallel builds only submit an entry per worker, plus the queue size, ahead of the results taken
+    class InlineExecutor:
+        def __init__(self):
+            self.pending = 0
+            self.max_pending = 0
+
+        def submit(self, _func, *_args):
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+            return self
+
+        def result(self):
+            self.pending -= 1
+            stats = {
+                "markdown": dict.fromkeys(parser.markdown_cache.stats(), 0),
+                "docstrings": dict.fromkeys(parser.docstring_cache.stats(), 0),
+                "modules": dict.fromkeys(cache.module_cache.stats(), 0),
+            }
+            return "astro", [], stats, [], [], [], []
+
+    inline_executor = InlineExecutor()
+    entries = [{"module": f"pipe_{idx}", "astro": f"./docs/pipe_{idx}.astro"} for idx in range(10)]
+    parsed = handler.parse_parallel(entries, handler.process_config(yapper_config), tmp_path, 1, inline_executor)
+    assert list(parsed) == [("astro", [])] * 10
+    assert inline_executor.max_pending == 3
+    with pytest.raises(ValueError):
+        handler.process_config({"module_map": yapper_config["module_map"], "pipeline_queue_size": -1})
+
+
+def test_parse_parallel(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    package_dir = tmp_path / "par_pkg"
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text('"""Parallel package."""\nfrom par_pkg.base import Base\n')
+    (package_dir / "base.py").write_text(
+        'class Base:\n    """A base class."""\n\n    def run(self, a: int):\n        """Run the base."""\n'
+    )
+    (package_dir / "child.py").write_text(
+        'from par_pkg.base import Base\n\n\nclass Child(Base):\n    """A child class."""\n\n'
+        '    def walk(self, b: str):\n        """Walk the child."""\n'
+    )
+    yapper_config = copy.deepcopy(yapper_clean_config)
+    yapper_config["package_root_relative_path"] = str(tmp_path)
+    yapper_config["module_map"] = [{"package": "par_pkg", "astro_dir": "./docs"}]
+    # pages parsed across worker processes should match those parsed in the current process
+    pages = {}
+    for jobs in [1, 2]:
+        handler.main(copy.deepcopy(yapper_config), clean=True, jobs=jobs)
+        pages[jobs] = {path.name: path.read_text() for path in (tmp_path / "docs").glob("*.astro")}
+        assert len(pages[jobs]) == 3
+    assert pages[1] == pages[2]
+    # workers resolve the aliases of a loaded package once, rather than for every module parsed from it
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(handler, "_worker_loader", GriffeLoader())
+    monkeypatch.setattr(handler, "_worker_resolved", set())
+    resolve_calls = []
+    resolve_aliases = GriffeLoader.resolve_aliases
+    monkeypatch.setattr(
+        GriffeLoader,
+        "resolve_aliases",
+        lambda self, **kwargs: resolve_calls.append(1) or resolve_aliases(self, **kwargs),
+    )
+    worker_config = handler.expand_module_map(handler.process_config(copy.deepcopy(yapper_config)))
+    for module_info in worker_config["module_map"]:
+        astro, *_results = handler._parse_in_worker(module_info, worker_config, tmp_path)
+        assert astro == pages[1][Path(module_info["astro"]).name]
+    assert len(resolve_calls) == 1
+    # non-positive jobs are rejected, whether passed as arguments or on the command line
+    with pytest.raises(ValueError):
+        handler.main(copy.deepcopy(yapper_config), jobs=0)
+    for jobs_arg in ["0", "-2", "two"]:
+        with pytest.raises(SystemExit):
+            cli.arg_parser.parse_args(["--jobs", jobs_arg])
+    assert cli.arg_parser.parse_args(["--jobs", "2"]).jobs == 2
+
+
+def test_build(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "src" / "build_pkg").mkdir(parents=True)
+    (tmp_path / "src" / "build_pkg" / "__init__.py").write_text('def run(a: int):\n    """Run the package."""\n')
+    (tmp_path / "src" / "build_pkg" / "extra.py").write_text('def extra(b: str):\n    """Add extras."""\n')
+    yapper_config = copy.deepcopy(yapper_clean_config)
+    yapper_config["package_root_relative_path"] = "./src"
+    yapper_config["module_map"] = [{"package": "build_pkg", "astro_dir": "./docs"}]
+    yapper_config["search_index"] = "./public/search.json"
+    python_paths = list(sys.path)
+    parser.markdown_cache.configure(16, tmp_path / "markdown", 1024)
+    parser.docstring_cache.configure(8)
+    cache.module_cache.configure(tmp_path / "modules", 2048)
+    pages = yapper.build(copy.deepcopy(yapper_config))
+    # the previous configuration of the shared caches is restored, including when the pages are only partly consumed
+    partial_build = yapper.iter_build(copy.deepcopy(yapper_config))
+    next(partial_build)
+    assert cache.module_cache.disk_dir is None
+    partial_build.close()
+    assert (parser.markdown_cache.max_size, parser.markdown_cache.disk_dir, parser.markdown_cache.max_bytes) == (
+        16,
+        tmp_path / "markdown",
+        1024,
+    )
+    assert parser.docstring_cache.max_size == 8
+    assert (cache.module_cache.disk_dir, cache.module_cache.max_bytes) == (tmp_path / "modules", 2048)
+    parser.markdown_cache.configure(handler.yapper_template_config["markdown_cache_size"], None)
+    parser.docstring_cache.configure(handler.yapper_template_config["docstring_cache_size"])
+    cache.module_cache.configure(None, 0)
+    # pages are returned in module map order, followed by the search index, without touching the python paths or disk
+    assert list(pages) == ["docs/index.astro", "docs/extra.astro", "./public/search.json"]
+    assert json.loads(pages["./public/search.json"])["pages"] == ["/docs/", "/docs/extra"]
+    assert sys.path == python_paths
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["src"]
+    assert [astro_key for astro_key, _page in yapper.iter_build(copy.deepcopy(yapper_config))] == list(pages)
+    # pages match those written by a build
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    handler.main(copy.deepcopy(yapper_config))
+    for astro_key, page in pages.items():
+        assert (tmp_path / "src" / astro_key).read_text() == page
+    # already loaded modules, and the submodules of loaded packages, are used instead of loading them from disk
+    griffe_loader = GriffeLoader(search_paths=[str(tmp_path / "src")])
+    build_pkg = griffe_loader.load_module("build_pkg")
+    virtual_module = visit(
+        "virtual_module", filepath=tmp_path / "virtual_module.py", code='def run():\n    """Run."""\n'
+    )
+    yapper_config["module_map"] = [
+        {"module": "build_pkg.extra", "astro": "./docs/extra.astro"},
+        {"module": "virtual_module", "astro": "./docs/virtual_module.astro"},
+    ]
+    loaded_pages = yapper.build(copy.deepcopy(yapper_config), modules=[build_pkg, virtual_module])
+    assert loaded_pages["./docs/extra.astro"] == pages["docs/extra.astro"]
+    assert list(loaded_pages) == ["./docs/extra.astro", "./docs/virtual_module.astro", "./public/search.json"]
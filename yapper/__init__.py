@@ -1,7 +1,10 @@
 """Yapper module."""
 from __future__ import annotations
 
-from typing import TypedDict
+from typing import TYPE_CHECKING, Iterable, Iterator, TypedDict
+
+if TYPE_CHECKING:
+    from griffe.dataclasses import Module
 
 
 class ModuleMap(TypedDict):
@@ -11,6 +14,14 @@ class ModuleMap(TypedDict):
     astro: str
 
 
+class PackageMap(TypedDict):
+    """Typed dict for package entries in module maps, which are expanded to a module map per discovered submodule."""
+
+    package: str
+    astro_dir: str
+    exclude: list[str]
+
+
 class YapperConfig(TypedDict):
     """Typed dict for yapper config."""
 
@@ -18,3 +29,39 @@ class YapperConfig(TypedDict):
     intro_template: str | None
     outro_template: str | None
     module_map: list[ModuleMap]
+    cache_dir: str
+    jobs: int
+    markdown_cache_size: int
+    markdown_disk_cache: bool
+    markdown_disk_cache_max_mb: float
+    docstring_cache_size: int
+    render_backend: str
+    prune_outputs: bool
+    stream_output: bool
+    compact_output: bool
+    shard_by: str | None
+    shard_max_members: int
+    shard_max_kb: int
+    module_cache: bool
+    module_cache_max_mb: float
+    search_index: str | None
+    pipeline_queue_size: int
+
+
+def build(yapper_config: YapperConfig, modules: Iterable[Module] | None = None) -> dict[str, str]:
+    """
+    Render a yapper config's pages in memory, returning the astro content keyed by the module map's astro paths.
+
+    Modules can be provided as already loaded griffe modules. No files are written, see `yapper.handler.iter_build`.
+    """
+    # the handler is imported here so that importing yapper stays light
+    from yapper import handler
+
+    return handler.build(yapper_config, modules)
+
+
+def iter_build(yapper_config: YapperConfig, modules: Iterable[Module] | None = None) -> Iterator[tuple[str, str]]:
+    """Render a yapper config's pages in memory, yielding each page's astro path and content as it finishes."""
+    from yapper import handler
+
+    return handler.iter_build(yapper_config, modules)
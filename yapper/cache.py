@@ -0,0 +1,547 @@
+"""
+Caches for skipping unchanged work between yapper runs.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+
+from yapper import ModuleMap, YapperConfig
+
+# griffe is imported once modules are loaded, so that the cli and config handling start quickly
+if TYPE_CHECKING:
+    from griffe.dataclasses import Alias, Class, Module
+    from griffe.loader import GriffeLoader
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+# config keys which do not affect the rendered output
+NON_OUTPUT_KEYS = [
+    "module_map",
+    "cache_dir",
+    "jobs",
+    "markdown_cache_size",
+    "markdown_disk_cache",
+    "markdown_disk_cache_max_mb",
+    "docstring_cache_size",
+    "prune_outputs",
+    "stream_output",
+    "module_cache",
+    "module_cache_max_mb",
+    "search_index",
+    "pipeline_queue_size",
+]
+
+
+def package_version(package_name: str) -> str:
+    """Return an installed package's version."""
+    # imported here because importlib.metadata is slow to import and only needed once a build starts
+    from importlib import metadata
+
+    try:
+        return metadata.version(package_name)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def yapper_version() -> str:
+    """Return the installed yapper version."""
+    return package_version("yapper")
+
+
+def _iter_classes(griffe_object: Module | Class) -> Iterator[Class]:
+    """Iterate the classes defined in a module or class, nested classes included."""
+    for member in griffe_object.members.values():
+        if not member.is_alias and member.is_class:
+            yield member  # type: ignore
+            yield from _iter_classes(member)  # type: ignore
+
+
+def module_sources(module_content: Module) -> list[Path]:
+    """
+    Return the source files which a loaded module's pages depend on.
+
+    These are the module's own file, the files of its parent packages, and the files of the modules defining the bases
+    of its classes and the targets of its aliases, e.g. re-exported members. Bases and targets which can't be found in
+    the loaded modules, e.g. builtins, are skipped.
+    """
+    from griffe.exceptions import AliasResolutionError, CyclicAliasError
+
+    griffe_objects: list[Module | Class | Alias] = []
+    parent: Module | None = module_content
+    while parent is not None:
+        griffe_objects.append(parent)
+        parent = parent.parent  # type: ignore
+    dependency_paths = [member.target_path for member in module_content.members.values() if member.is_alias]
+    for module_class in _iter_classes(module_content):
+        dependency_paths += [getattr(base, "full", str(base)) for base in module_class.bases]
+    for dependency_path in dependency_paths:
+        try:
+            griffe_objects.append(module_content.modules_collection[dependency_path])
+        except (KeyError, AliasResolutionError, CyclicAliasError):
+            continue
+    source_files: set[Path] = set()
+    for griffe_object in griffe_objects:
+        try:
+            filepath = griffe_object.filepath
+        except (AliasResolutionError, CyclicAliasError):
+            continue
+        # namespace packages span several directories, without a file of their own
+        if isinstance(filepath, Path):
+            source_files.add(filepath)
+    return sorted(source_files)
+
+
+def hash_files(file_paths: Iterable[Path], file_digests: dict[Path, str] | None = None) -> str:
+    """
+    Hash the contents of a set of files.
+
+    The digests of individual files are reused from, and added to, `file_digests` if provided, so that files shared
+    between several sets are only read once.
+    """
+    if file_digests is None:
+        file_digests = {}
+    hasher = hashlib.sha256()
+    for file_path in sorted(file_paths):
+        if file_path not in file_digests:
+            file_digests[file_path] = hashlib.sha256(file_path.read_bytes()).hexdigest()
+        hasher.update(str(file_path).encode())
+        hasher.update(file_digests[file_path].encode())
+    return hasher.hexdigest()
+
+
+def evict_lru(entry_paths: Iterable[Path], max_bytes: int) -> tuple[int, int]:
+    """
+    Remove the least recently used cache entry files, per their modification times, until they fit within `max_bytes`.
+
+    Returns the total size of the remaining entries and the number of removed entries.
+    """
+    entries = []
+    for entry_path in entry_paths:
+        try:
+            entry_stat = entry_path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((entry_stat.st_mtime_ns, entry_stat.st_size, entry_path))
+    total_bytes = sum(size for _mtime, size, _path in entries)
+    removed = 0
+    for _mtime, size, entry_path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        # another process may have already removed the entry
+        entry_path.unlink(missing_ok=True)
+        total_bytes -= size
+        removed += 1
+    return total_bytes, removed
+
+
+def config_digest(yapper_config: YapperConfig) -> str:
+    """Hash the effective configuration, templates included, together with the yapper version."""
+    output_config = {k: v for k, v in yapper_config.items() if k not in NON_OUTPUT_KEYS}
+    payload = json.dumps({"config": output_config, "version": yapper_version()}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def entry_digest(module_info: ModuleMap, sources_digest: str | None, yapper_config_digest: str) -> str | None:
+    """
+    Hash the inputs for a module map entry, given the hash of its source files, per `module_sources` and `hash_files`.
+
+    `sources_digest` is None if the source files are unknown or could not be read, in which case None is returned.
+    """
+    if sources_digest is None:
+        return None
+    payload = json.dumps(
+        {
+            "module": module_info["module"],
+            "astro": module_info["astro"],
+            "sources": sources_digest,
+            "config": yapper_config_digest,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class BuildManifest:
+    """Persistent record of the inputs used to build each module map entry."""
+
+    def __init__(self, cache_dir: Path):
+        """Load the manifest from the cache directory, if present."""
+        self.cache_dir = cache_dir
+        self.manifest_path = cache_dir / MANIFEST_NAME
+        self.entries: dict[str, dict[str, Any]] = {}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path) as manifest_file:
+                    self.entries = json.load(manifest_file)["entries"]
+            except (ValueError, KeyError):
+                logger.warning(f"Ignoring unreadable build manifest at {self.manifest_path}")
+
+    def is_current(self, astro_key: str, digest: str | None, out_path: Path) -> bool:
+        """Whether an entry was built from identical inputs and its outputs, including any shards, still exist."""
+        if digest is None or astro_key not in self.entries:
+            return False
+        if self.entries[astro_key]["digest"] != digest or not out_path.exists():
+            return False
+        # shard pages are kept in a directory named after the index page
+        shard_dir = out_path.with_suffix("")
+        return all((shard_dir / PurePosixPath(shard_key).name).exists() for shard_key in self.shards(astro_key))
+
+    def shards(self, astro_key: str) -> list[str]:
+        """Return the astro keys of the shard pages recorded for an entry."""
+        return self.entries.get(astro_key, {}).get("shards", [])
+
+    def sources(self, astro_key: str) -> list[Path]:
+        """Return the source files recorded for an entry, or an empty list if none were recorded."""
+        return [Path(source_file) for source_file in self.entries.get(astro_key, {}).get("sources", [])]
+
+    def record(
+        self,
+        astro_key: str,
+        module_name: str,
+        digest: str | None,
+        shards: list[str] | None = None,
+        sources: list[Path] | None = None,
+    ) -> list[str]:
+        """
+        Record the inputs used to build an entry, i.e. its digest and source files, and its shard pages if sharded.
+
+        Returns the astro keys of the shard pages recorded by a previous build which are no longer built.
+        """
+        stale_shards = [shard_key for shard_key in self.shards(astro_key) if shard_key not in (shards or [])]
+        if digest is None:
+            self.entries.pop(astro_key, None)
+        else:
+            self.entries[astro_key] = {"module": module_name, "digest": digest}
+            if sources:
+                self.entries[astro_key]["sources"] = [str(source_file) for source_file in sources]
+            if shards:
+                self.entries[astro_key]["shards"] = shards
+        return stale_shards
+
+    def prune(self, astro_keys: Iterable[str]) -> list[str]:
+        """
+        Drop entries which are no longer in the module map.
+
+        Returns the astro keys of the dropped entries, each followed by those of its shard pages.
+        """
+        keep = set(astro_keys)
+        dropped = []
+        for astro_key in self.entries:
+            if astro_key not in keep:
+                dropped += [astro_key] + self.shards(astro_key)
+        self.entries = {k: v for k, v in self.entries.items() if k in keep}
+        return dropped
+
+    def save(self) -> None:
+        """Atomically write the manifest to the cache directory."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.manifest_path.with_suffix(".tmp")
+        with open(temp_path, mode="w") as manifest_file:
+            json.dump({"yapper_version": yapper_version(), "entries": self.entries}, manifest_file, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+
+class RenderCache:
+    """
+    Memoizes a text rendering function using a bounded LRU cache with an optional on-disk tier.
+
+    Keys combine the input text with a fingerprint of the renderer's configuration. The on-disk tier persists rendered
+    output between runs and is safe to share between worker processes. The total size of the on-disk entries is
+    bounded, with the least recently used entries evicted first.
+    """
+
+    def __init__(
+        self,
+        render_func: Callable[[str], str],
+        config_key: str,
+        max_size: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        """Wrap a render function."""
+        self.render_func = render_func
+        self.config_key = config_key
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.disk_dir: Path | None = None
+        # the size of the on-disk entries as of the last eviction, plus the size of the entries written since
+        self.disk_bytes = 0
+        self.entries: OrderedDict[str, str] = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def configure(self, max_size: int, disk_dir: Path | None = None, max_bytes: int | None = None) -> None:
+        """
+        Set the maximum number of in-memory entries, the optional on-disk cache directory, and its maximum total size.
+
+        The on-disk entries are evicted down to the size limit when the directory or the limit changes.
+        """
+        changed = disk_dir != self.disk_dir or (max_bytes is not None and max_bytes != self.max_bytes)
+        self.max_size = max_size
+        self.disk_dir = disk_dir
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        if changed and self.disk_dir is not None:
+            self.evict()
+
+    def render(self, text: str) -> str:
+        """Render text, returning cached output where available."""
+        key = hashlib.sha256(f"{self.config_key}\0{text}".encode()).hexdigest()
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        disk_path = None
+        if self.disk_dir is not None:
+            disk_path = self.disk_dir / key[:2] / f"{key}.html"
+            try:
+                rendered = disk_path.read_text()
+            except FileNotFoundError:
+                pass
+            else:
+                self.disk_hits += 1
+                # the modification time tracks when an entry was last used
+                os.utime(disk_path)
+                self._store(key, rendered)
+                return rendered
+        self.misses += 1
+        rendered = self.render_func(text)
+        self._store(key, rendered)
+        if disk_path is not None:
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = disk_path.with_suffix(f".{os.getpid()}.tmp")
+            temp_path.write_text(rendered)
+            os.replace(temp_path, disk_path)
+            self.disk_bytes += disk_path.stat().st_size
+            if self.disk_bytes > self.max_bytes:
+                self.evict()
+        return rendered
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used on-disk entries until they fit within three quarters of the size limit.
+
+        Evicting below the limit leaves room for further entries before the directory has to be scanned again.
+        """
+        self.disk_bytes, _evicted = evict_lru(self.disk_dir.glob("*/*.html"), self.max_bytes * 3 // 4)  # type: ignore
+
+    def _store(self, key: str, rendered: str) -> None:
+        """Add an entry to the in-memory tier, evicting the least recently used entries beyond the size limit."""
+        if self.max_size <= 0:
+            return
+        self.entries[key] = rendered
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        """Return the hit and miss counts."""
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+    def add_stats(self, stats: dict[str, int]) -> None:
+        """Accumulate hit and miss counts, e.g. as reported by worker processes."""
+        self.hits += stats["hits"]
+        self.disk_hits += stats["disk_hits"]
+        self.misses += stats["misses"]
+
+    def clear(self) -> None:
+        """Clear the in-memory tier and reset the counts."""
+        self.entries.clear()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+
+class FragmentCache:
+    """
+    Bounded LRU cache for values built from hashable inputs, e.g. rendered docstring fragments.
+
+    Keys are hashes of the JSON-serialised inputs. A maximum size of `0` disables the cache.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        """Prepare an empty cache."""
+        self.max_size = max_size
+        self.entries: OrderedDict[str, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*inputs: Any) -> str:
+        """Hash the inputs for a cache entry."""
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def configure(self, max_size: int) -> None:
+        """Set the maximum number of entries."""
+        self.max_size = max_size
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get(self, key: str) -> Any | None:
+        """Return the value for a key, or None if not cached."""
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        """Add an entry, evicting the least recently used entries beyond the size limit."""
+        if self.max_size <= 0:
+            return
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        """Return the hit and miss counts."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def add_stats(self, stats: dict[str, int]) -> None:
+        """Accumulate hit and miss counts, e.g. as reported by worker processes."""
+        self.hits += stats["hits"]
+        self.misses += stats["misses"]
+
+    def clear(self) -> None:
+        """Clear the entries and reset the counts."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def _decode_griffe_object(obj_dict: dict[str, Any]) -> Any:
+    """Decode griffe objects from JSON, keeping docstrings as serialised rather than dedenting them a second time."""
+    from griffe.encoders import json_decoder
+
+    decoded = json_decoder(obj_dict)
+    if "docstring" in obj_dict and getattr(decoded, "docstring", None) is not None:
+        decoded.docstring.value = obj_dict["docstring"]["value"]
+    return decoded
+
+
+class ModuleTreeCache:
+    """
+    Persists loaded griffe package trees on disk, so that unchanged packages aren't parsed and visited again.
+
+    Entries are keyed on the contents of a package's source files and the griffe and yapper versions. The total size of
+    the entries is bounded, with the least recently used entries evicted first, so that the cache directory can be
+    persisted between CI jobs. Namespace packages are not cached.
+    """
+
+    def __init__(self, disk_dir: Path | None = None, max_bytes: int = 256 * 1024 * 1024):
+        """Prepare a cache, which is disabled unless a directory is provided."""
+        self.disk_dir = disk_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def configure(self, disk_dir: Path | None, max_bytes: int) -> None:
+        """Set the cache directory, or None to disable the cache, and the maximum total size of the entries."""
+        self.disk_dir = disk_dir
+        self.max_bytes = max_bytes
+
+    def package_key(self, griffe_loader: GriffeLoader, module_name: str) -> tuple[str, str] | None:
+        """
+        Find the top-level package for a module and hash its source files.
+
+        Returns the package name and key, or None if the package can't be found or is a namespace package.
+        """
+        from griffe.finder import Package
+
+        try:
+            _module_name, package = griffe_loader.finder.find_spec(module_name)
+        except (ModuleNotFoundError, FileNotFoundError):
+            return None
+        if not isinstance(package, Package):
+            return None
+        source_files = [package.path] + [path for _parts, path in griffe_loader.finder.iter_submodules(package.path)]
+        if package.stubs is not None:
+            source_files.append(package.stubs)
+        payload = json.dumps(
+            {
+                "package": package.name,
+                "sources": hash_files(source_files),
+                "griffe": package_version("griffe"),
+                "yapper": yapper_version(),
+            },
+            sort_keys=True,
+        )
+        return package.name, hashlib.sha256(payload.encode()).hexdigest()
+
+    def entry_path(self, key: str) -> Path:
+        """Return the file path for a cache entry."""
+        return self.disk_dir / key[:2] / f"{key}.json"  # type: ignore
+
+    def load_module(self, griffe_loader: GriffeLoader, module_name: str) -> Module:
+        """
+        Load a module with the griffe loader, restoring its package tree from the cache where available.
+
+        Restored packages are added to the loader's modules collection, as if loaded by the loader itself.
+        """
+        if self.disk_dir is None:
+            return griffe_loader.load_module(module_name)
+        package_key = self.package_key(griffe_loader, module_name)
+        if package_key is None:
+            return griffe_loader.load_module(module_name)
+        package_name, key = package_key
+        entry_path = self.entry_path(key)
+        try:
+            package_content = json.loads(entry_path.read_text(), object_hook=_decode_griffe_object)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            logger.warning(f"Ignoring unreadable module cache entry at {entry_path}")
+        else:
+            self.hits += 1
+            # the modification time tracks when an entry was last used
+            os.utime(entry_path)
+            griffe_loader.modules_collection[package_name] = package_content
+            return griffe_loader.modules_collection[module_name]
+        self.misses += 1
+        module_content = griffe_loader.load_module(module_name)
+        self.store(entry_path, griffe_loader.modules_collection[package_name])
+        return module_content
+
+    def store(self, entry_path: Path, package_content: Module) -> None:
+        """Atomically write a package tree to the cache and evict entries beyond the size limit."""
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_text(package_content.as_json())
+        os.replace(temp_path, entry_path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the entries fit within the size limit."""
+        _total_bytes, evicted = evict_lru(self.disk_dir.glob("*/*.json"), self.max_bytes)  # type: ignore
+        self.evicted += evicted
+
+    def stats(self) -> dict[str, int]:
+        """Return the hit, miss, and eviction counts."""
+        return {"hits": self.hits, "misses": self.misses, "evicted": self.evicted}
+
+    def add_stats(self, stats: dict[str, int]) -> None:
+        """Accumulate hit, miss, and eviction counts, e.g. as reported by worker processes."""
+        self.hits += stats["hits"]
+        self.misses += stats["misses"]
+        self.evicted += stats["evicted"]
+
+
+module_cache = ModuleTreeCache()
+
+
+def clean_cache(cache_dir: Path) -> None:
+    """Remove the cache directory."""
+    if cache_dir.exists():
+        logger.info(f"Removing yapper cache at {cache_dir}")
+        shutil.rmtree(cache_dir)
@@ -5,22 +5,180 @@ Yapper cli interface for invoking the methods in the handler module.
 from __future__ import annotations
 
 import argparse
+import json
+import logging
+import sys
+
+from yapper import handler, watcher
+
+
+def positive_int(value: str) -> int:
+    """Parse a positive integer argument, as the jobs config key is validated by `handler.process_config`."""
+    try:
+        number = int(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(f'should be a positive integer but encountered "{value}"') from err
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'should be a positive integer but encountered "{value}"')
+    return number
 
-from yapper import handler
 
 # prepare args
 arg_parser = argparse.ArgumentParser(description="Load TOML configuration file for yapper.")
 arg_parser.add_argument(
     "--config", type=str, help="Relative or absolute file path to the configuration file.", default=None, required=False
 )
+arg_parser.add_argument(
+    "--batch",
+    type=str,
+    nargs="+",
+    default=None,
+    help="Build several configuration files, or glob patterns such as 'packages/*/pyproject.toml', in one process.",
+)
+arg_parser.add_argument(
+    "--force", action="store_true", help="Rebuild all modules, even if their inputs are unchanged since the last run."
+)
+arg_parser.add_argument(
+    "--clean", action="store_true", help="Remove the yapper cache directory, including the build manifest, first."
+)
+arg_parser.add_argument(
+    "--jobs",
+    type=positive_int,
+    help="Number of worker processes, overrides the jobs config key.",
+    default=None,
+    required=False,
+)
+arg_parser.add_argument(
+    "--watch", action="store_true", help="Keep running and rebuild modules when their source files change."
+)
+arg_parser.add_argument(
+    "--profile",
+    type=str,
+    nargs="?",
+    const="yapper_profile.json",
+    default=None,
+    help="Profile each module and stage, writing a JSON report to the path (defaults to yapper_profile.json).",
+)
+arg_parser.add_argument(
+    "--diagnostics-json",
+    type=str,
+    default=None,
+    help="Write docstring diagnostics as JSON to the path, e.g. for CI annotations.",
+)
+verbosity_group = arg_parser.add_mutually_exclusive_group()
+verbosity_group.add_argument("--quiet", action="store_true", help="Only log warnings and errors.")
+verbosity_group.add_argument(
+    "--verbose", action="store_true", help="Log each processed member and list each docstring diagnostic."
+)
+# the build daemon and its client commands
+sub_parsers = arg_parser.add_subparsers(dest="command")
+serve_parser = sub_parsers.add_parser("serve", help="Run a build daemon which serves rebuild requests.")
+# suppressed defaults so that the top level argument is not overridden
+serve_parser.add_argument(
+    "--config", type=str, help="Relative or absolute file path to the configuration file.", default=argparse.SUPPRESS
+)
+rebuild_parser = sub_parsers.add_parser("rebuild", help="Request a rebuild from a running build daemon.")
+rebuild_parser.add_argument(
+    "--module", dest="modules", action="append", default=None, help="Module to rebuild, can be repeated."
+)
+rebuild_parser.add_argument(
+    "--path", dest="paths", action="append", default=None, help="Source file path to rebuild, can be repeated."
+)
+rebuild_parser.add_argument(
+    "--force", action="store_true", default=argparse.SUPPRESS, help="Rebuild even if the inputs are unchanged."
+)
+status_parser = sub_parsers.add_parser("status", help="Request the status of a running build daemon.")
+stop_parser = sub_parsers.add_parser("stop", help="Stop a running build daemon.")
+for daemon_parser in [serve_parser, rebuild_parser, status_parser, stop_parser]:
+    daemon_parser.add_argument(
+        "--host", type=str, default=None, help="Host of the build daemon, defaults to 127.0.0.1."
+    )
+    daemon_parser.add_argument("--port", type=int, default=None, help="Port of the build daemon, defaults to 7878.")
+    daemon_parser.add_argument(
+        "--socket", type=str, default=None, help="Unix domain socket path of the build daemon, instead of a port."
+    )
+
+
+def configure_logging(args: argparse.Namespace) -> None:
+    """Configure logging for the yapper loggers per the verbosity arguments."""
+    log_level = logging.INFO
+    if args.quiet:
+        log_level = logging.WARNING
+    elif args.verbose:
+        log_level = logging.DEBUG
+    # other libraries' loggers remain at warning level
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("yapper").setLevel(log_level)
+
+
+def daemon_connection(args: argparse.Namespace) -> dict[str, str | int]:
+    """Return the provided build daemon connection arguments."""
+    connection = {"host": args.host, "port": args.port, "socket_path": args.socket}
+    return {key: value for key, value in connection.items() if value is not None}
+
+
+def run_client(args: argparse.Namespace) -> None:
+    """Send a request to a running build daemon and print the JSON response, exiting with 1 on any errors."""
+    # the client is imported here so that its http dependencies are only loaded when needed
+    from yapper import client
+
+    connection = daemon_connection(args)
+    if args.command == "rebuild":
+        response = client.rebuild(modules=args.modules, paths=args.paths, force=args.force, **connection)
+    elif args.command == "status":
+        response = client.status(**connection)
+    else:
+        response = client.shutdown(**connection)
+    print(json.dumps(response, indent=2))
+    if response.get("errors") or response.get("unknown"):
+        sys.exit(1)
 
 
 def parse_cli():
     """Command Line Interface to yapper."""
     args = arg_parser.parse_args()
+    configure_logging(args)
+    if args.command in ["rebuild", "status", "stop"]:
+        run_client(args)
+        return
+    if args.batch:
+        if args.command == "serve" or args.watch or args.config is not None:
+            arg_parser.error("--batch can't be combined with --config, --watch, or serve")
+        handler.batch(
+            handler.load_batch_configs(args.batch),
+            force=args.force,
+            clean=args.clean,
+            jobs=args.jobs,
+            profile=args.profile,
+            diagnostics_json=args.diagnostics_json,
+        )
+        return
     config_file = handler.load_config(args)
     yapper_config = handler.process_config(config_file)
-    handler.main(yapper_config)
+    if args.command == "serve":
+        from yapper import server
+
+        server.serve(
+            yapper_config, force=args.force, clean=args.clean, jobs=args.jobs, **daemon_connection(args)  # type: ignore
+        )
+    elif args.watch:
+        watcher.watch(
+            yapper_config,
+            force=args.force,
+            clean=args.clean,
+            jobs=args.jobs,
+            profile=args.profile,
+            diagnostics_json=args.diagnostics_json,
+        )
+    else:
+        handler.main(
+            yapper_config,
+            force=args.force,
+            clean=args.clean,
+            jobs=args.jobs,
+            profile=args.profile,
+            diagnostics_json=args.diagnostics_json,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+"""
+Thin client for the yapper build daemon, see `yapper.server`.
+
+Requests and responses are JSON over HTTP, either on a localhost port or on a Unix domain socket. Other clients, e.g.
+Node's `http.request` with a `socketPath`, can call the same endpoints directly.
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import socket
+from pathlib import Path
+from typing import Any
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7878
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: float | None = None):
+        """Prepare a connection to the socket path."""
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        """Connect to the Unix domain socket."""
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)  # pylint: disable=no-member
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def request(
+    method: str,
+    endpoint: str,
+    payload: dict[str, Any] | None = None,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: str | None = None,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    """Send a request to the daemon and return the decoded JSON response."""
+    if socket_path is not None:
+        connection: http.client.HTTPConnection = UnixHTTPConnection(socket_path, timeout=timeout)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        body = json.dumps(payload) if payload is not None else None
+        connection.request(method, endpoint, body=body, headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response_data = json.loads(response.read() or b"{}")
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise RuntimeError(f"The yapper daemon responded with {response.status}: {response_data.get('error')}")
+    return response_data
+
+
+def rebuild(
+    modules: list[str] | None = None,
+    paths: list[str] | None = None,
+    force: bool = False,
+    **connection: Any,
+) -> dict[str, Any]:
+    """
+    Request a rebuild of all module map entries, or of the entries for the specified modules or source paths.
+
+    Source paths are resolved relative to the current working directory. Returns the astro files which were written,
+    unchanged, or skipped because their inputs are unchanged, and any errors.
+    """
+    payload: dict[str, Any] = {"force": force}
+    if modules:
+        payload["modules"] = modules
+    if paths:
+        payload["paths"] = [str(Path(path).resolve()) for path in paths]
+    return request("POST", "/rebuild", payload, **connection)
+
+
+def status(**connection: Any) -> dict[str, Any]:
+    """Request the daemon's status."""
+    return request("GET", "/status", **connection)
+
+
+def shutdown(**connection: Any) -> dict[str, Any]:
+    """Request that the daemon shuts down."""
+    return request("POST", "/shutdown", **connection)
@@ -0,0 +1,110 @@
+"""
+Structured diagnostics for docstring and signature mismatches.
+
+Diagnostics are recorded with their raw details and are only formatted into messages when emitted, either as a grouped
+summary at the end of a run or as JSON, e.g. for CI annotations.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+# message templates per diagnostic kind, formatted with the diagnostic's details
+MESSAGES = {
+    "param_count": (
+        "Number of docstring params does not match number of signature params. Please check that all function "
+        "parameters have been declared in the docstring. Signature params: {signature}. Docstring params: {docstring}."
+    ),
+    "param_type": (
+        "Parameter types mismatch in docstring vs. signature for param {param}. This may be intentional. "
+        "Docstring type: {docstring}. Signature type: {signature}."
+    ),
+    "return_type": (
+        "Possible return type mismatch in docstring vs. function signature. This may be intentional. "
+        "Signature type: {signature}. Docstring types: {docstring}."
+    ),
+}
+
+
+@dataclass
+class Diagnostic:
+    """A diagnostic for a module member, with the details used for formatting its message."""
+
+    kind: str
+    module: str | None
+    member: str
+    path: str | None = None
+    line: int | None = None
+    details: dict[str, Any] = field(default_factory=dict)
+
+    def message(self) -> str:
+        """Format the diagnostic's message."""
+        return MESSAGES[self.kind].format(**self.details)
+
+
+class DiagnosticsCollector:
+    """Collects diagnostics across a run, attributed to the module currently being parsed."""
+
+    def __init__(self):
+        """Prepare an empty collector."""
+        self.records: list[Diagnostic] = []
+        self.module: str | None = None
+
+    def add(self, kind: str, member: Any, **details: Any) -> None:
+        """Record a diagnostic for a griffe object, e.g. a function."""
+        filepath = getattr(member, "filepath", None)
+        self.records.append(
+            Diagnostic(
+                kind=kind,
+                module=self.module,
+                member=getattr(member, "path", str(member)),
+                path=str(filepath) if isinstance(filepath, Path) else None,
+                line=getattr(member, "lineno", None),
+                details=details,
+            )
+        )
+
+    def add_records(self, records: list[Diagnostic]) -> None:
+        """Add diagnostics collected elsewhere, e.g. by worker processes."""
+        self.records.extend(records)
+
+    def clear(self) -> None:
+        """Remove all recorded diagnostics."""
+        self.records = []
+        self.module = None
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of diagnostics per kind."""
+        kind_counts: dict[str, int] = {}
+        for record in self.records:
+            kind_counts[record.kind] = kind_counts.get(record.kind, 0) + 1
+        return kind_counts
+
+    def summary(self, verbose: bool = False) -> str:
+        """Summarise the diagnostics grouped by kind, listing each diagnostic's message if verbose."""
+        lines = [f"{len(self.records)} docstring diagnostics:"]
+        for kind, count in self.counts().items():
+            modules = {record.module for record in self.records if record.kind == kind}
+            lines.append(f"  {kind}: {count} across {len(modules)} modules")
+            if verbose:
+                for record in self.records:
+                    if record.kind == kind:
+                        lines.append(f"    {record.member}: {record.message()}")
+        return "\n".join(lines)
+
+    def log_summary(self, logger: logging.Logger) -> None:
+        """Log the summary, listing each diagnostic if the logger is enabled for debug messages."""
+        if self.records:
+            logger.warning(self.summary(verbose=logger.isEnabledFor(logging.DEBUG)))
+
+    def write_json(self, out_path: Path) -> None:
+        """Write the diagnostics, including their formatted messages, as JSON."""
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_path, mode="w") as out_file:
+            json.dump([{**asdict(record), "message": record.message()} for record in self.records], out_file, indent=2)
+
+
+diagnostics = DiagnosticsCollector()
@@ -0,0 +1,185 @@
+"""
+Streaming HTML emitter used as an alternative to building a dominate DOM tree.
+
+Markup is written directly to an output callable as elements are opened and closed. Formatting follows dominate's
+pretty rendering, or its unindented rendering in compact mode, so that both backends produce identical markup.
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+from dominate import dom_tag, util  # type: ignore
+
+INDENT = "  "
+# delimits template fields in pre-rendered markup
+FIELD_MARKER = "\x00"
+
+
+def format_attributes(attributes: dict[str, str | None] | None) -> str:
+    """Format element attributes, sorted by name and escaped, per dominate."""
+    if not attributes:
+        return ""
+    formatted = ""
+    for name, value in sorted(attributes.items()):
+        if value in (False, None):
+            continue
+        formatted += f' {name}="{util.escape(str(value), True)}"'
+    return formatted
+
+
+class HtmlEmitter:
+    """Writes pretty-printed, or compact, HTML as elements are emitted."""
+
+    def __init__(self, write: Callable[[str], object] | None = None, indent: str = INDENT, compact: bool = False):
+        """
+        Prepare an emitter.
+
+        If no write callable is provided, the markup is collected in memory and can be retrieved with `getvalue`. In
+        compact mode, elements are written without line breaks and indentation.
+        """
+        self.parts: list[str] = []
+        self.write: Callable[[str], object] = write if write is not None else self.parts.append
+        self.indent = indent
+        self.compact = compact
+        # open elements, each paired with whether it has block (non-inline) children
+        self.stack: list[list[str | bool]] = []
+
+    def _start_block(self, inline: bool = False) -> None:
+        """Start a block element on a new indented line within the current element."""
+        if self.stack and not inline:
+            self.stack[-1][1] = True
+            if not self.compact:
+                self.write("\n" + self.indent * len(self.stack))
+
+    def open(self, tag: str, attributes: dict[str, str | None] | None = None, inline: bool = False) -> None:
+        """Open an element."""
+        self._start_block(inline)
+        self.write(f"<{tag}{format_attributes(attributes)}>")
+        self.stack.append([tag, False])
+
+    def close(self) -> None:
+        """Close the most recently opened element."""
+        tag, has_blocks = self.stack.pop()
+        if has_blocks and not self.compact:
+            self.write("\n" + self.indent * len(self.stack))
+        self.write(f"</{tag}>")
+
+    def element(self, tag: str, text: str = "", attributes: dict[str, str | None] | None = None) -> None:
+        """Emit an element containing only escaped text."""
+        self._start_block()
+        self.write(f"<{tag}{format_attributes(attributes)}>{util.escape(text)}</{tag}>")
+
+    def text(self, text: str) -> None:
+        """Emit escaped text."""
+        self.write(util.escape(text))
+
+    def raw(self, text: str) -> None:
+        """Emit unescaped text."""
+        self.write(text)
+
+    def dom(self, node: dom_tag.dom_tag) -> None:
+        """Emit an already built dominate node."""
+        if isinstance(node, util.text):
+            self.write(node.text)
+            return
+        if isinstance(node, TemplateTag):
+            self.template(node.fragment_template, node.values)
+            return
+        tag: str = getattr(node, "tagname", type(node).__name__)
+        if tag[-1] == "_":
+            tag = tag[:-1]
+        if node.is_single:
+            self._start_block(node.is_inline)
+            self.write(f"<{tag}{format_attributes(node.attributes)}>")
+            return
+        self.open(tag, node.attributes, node.is_inline)
+        for child in node.children:
+            if isinstance(child, dom_tag.dom_tag):
+                self.dom(child)
+            else:
+                # string children are escaped when added to the dominate node
+                self.write(str(child))
+        self.close()
+
+    def template(self, fragment_template: FragmentTemplate, values: dict[str, str]) -> None:
+        """Emit a pre-rendered fragment template as a block element."""
+        self._start_block()
+        self.write(fragment_template.render(len(self.stack), values, self.compact))
+
+    def blocks(self, markup: str) -> None:
+        """Emit markup for block elements rendered at the current depth, e.g. markup flushed from another emitter."""
+        if self.stack:
+            self.stack[-1][1] = True
+        self.write(markup)
+
+    def getvalue(self) -> str:
+        """Return the markup collected in memory."""
+        return "".join(self.parts)
+
+    def flush(self) -> str:
+        """Return the markup collected in memory since the previous flush, and clear it."""
+        markup = "".join(self.parts)
+        self.parts.clear()
+        return markup
+
+
+class FragmentTemplate:
+    """
+    A fixed element structure which is rendered once per indentation depth, or once in compact mode, and then reused.
+
+    The structure is emitted with marker placeholders for its fields and split into literal and field parts. Rendering
+    only joins the literal parts with the escaped field values, or the unescaped values for raw fields.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[HtmlEmitter, dict[str, str]], None],
+        fields: list[str],
+        raw_fields: list[str] | None = None,
+    ):
+        """Prepare a template from a function which emits the structure for the provided field values."""
+        self.emit = emit
+        self.fields = fields
+        self.raw_fields = raw_fields or []
+        # keyed by indentation depth, or by None in compact mode where the depth doesn't affect the markup
+        self.rendered: dict[int | None, list[str]] = {}
+
+    def parts(self, depth: int, compact: bool = False) -> list[str]:
+        """Return the literal and field parts at an indentation depth, rendering them on first use."""
+        key = None if compact else depth
+        if key not in self.rendered:
+            html_emitter = HtmlEmitter(compact=compact)
+            html_emitter.stack = [["", False] for _ in range(depth)]
+            placeholders = {field: f"{FIELD_MARKER}{field}{FIELD_MARKER}" for field in self.fields + self.raw_fields}
+            self.emit(html_emitter, placeholders)
+            # the leading line break and indentation are written by the enclosing element
+            markup = html_emitter.getvalue().lstrip("\n").lstrip(html_emitter.indent)
+            self.rendered[key] = markup.split(FIELD_MARKER)
+        return self.rendered[key]
+
+    def render(self, depth: int, values: dict[str, str], compact: bool = False) -> str:
+        """Render the template at an indentation depth, or in compact mode, using the provided field values."""
+        parts = self.parts(depth, compact)
+        rendered = parts[:]
+        for idx in range(1, len(parts), 2):
+            field = parts[idx]
+            if field in self.raw_fields:
+                rendered[idx] = values[field]
+            else:
+                rendered[idx] = util.escape(values[field])
+        return "".join(rendered)
+
+
+class TemplateTag(dom_tag.dom_tag):
+    """A dominate tag which renders a fragment template in place of a subtree of tags."""
+
+    def __init__(self, fragment_template: FragmentTemplate, values: dict[str, str]):
+        """Wrap a fragment template and its field values."""
+        super().__init__()
+        self.fragment_template = fragment_template
+        self.values = values
+
+    def _render(self, sb: list[str], indent_level: int, indent_str: str, pretty: bool, xhtml: bool) -> list[str]:
+        """Render the template at the indentation level of the enclosing DOM element, or compact if not pretty."""
+        sb.append(self.fragment_template.render(indent_level, self.values, not pretty))
+        return sb
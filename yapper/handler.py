@@ -5,19 +5,39 @@ Yapper logic for loading and processing the config, and for using the config to
 from __future__ import annotations
 
 import argparse
+import collections
+import contextlib
 import copy
+import fnmatch
+import functools
+import glob
+import itertools
 import logging
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
 
 import toml
-from griffe.loader import GriffeLoader
 
-from yapper import YapperConfig, parser
+from yapper import ModuleMap, PackageMap, YapperConfig, cache, pipeline, search
+from yapper.diagnostics import Diagnostic, diagnostics
+from yapper.output import OutputWriter
+from yapper.profiler import profiler
+from yapper.search import search_collector
+
+# griffe, the parser module (and its markdown, DOM, and slug dependencies), and multiprocessing are imported once
+# parsing starts, so that the cli and config handling start quickly
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    from griffe.dataclasses import Module
+    from griffe.loader import GriffeLoader
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+RENDER_BACKENDS = ["dom", "stream"]
+# policies for splitting a module's members across shard pages
+SHARD_POLICIES = ["members", "size", "class"]
 
 # template configs
 yapper_template_config: YapperConfig = {
@@ -25,6 +45,23 @@ yapper_template_config: YapperConfig = {
     "intro_template": "---\n\nimport { Markdown } from 'astro/components';\n\n---\n\n",
     "outro_template": "",
     "module_map": [],
+    "cache_dir": ".yapper_cache",
+    "jobs": 1,
+    "markdown_cache_size": 1024,
+    "markdown_disk_cache": False,
+    "markdown_disk_cache_max_mb": 64,
+    "docstring_cache_size": 1024,
+    "render_backend": "dom",
+    "prune_outputs": False,
+    "stream_output": False,
+    "compact_output": False,
+    "shard_by": None,
+    "shard_max_members": 50,
+    "shard_max_kb": 512,
+    "module_cache": True,
+    "module_cache_max_mb": 256,
+    "search_index": None,
+    "pipeline_queue_size": 2,
 }
 
 
@@ -62,6 +99,40 @@ def load_config(args: argparse.Namespace) -> YapperConfig:
     return yapper_config
 
 
+def load_batch_configs(patterns: list[str]) -> list[YapperConfig]:
+    """
+    Load the yapper configs from config file paths or glob patterns, e.g. "packages/*/pyproject.toml".
+
+    Files matched by glob patterns which don't have a [tool.yapper] section are skipped. The
+    "package_root_relative_path" of each config is resolved relative to the directory containing its config file.
+    """
+    config_paths: dict[Path, bool] = {}
+    for pattern in patterns:
+        if not any(char in pattern for char in "*?["):
+            config_paths.setdefault(Path(pattern).resolve(), False)
+            continue
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            raise ValueError(f"No config files match the pattern {pattern}")
+        for match in matches:
+            config_paths.setdefault(Path(match).resolve(), True)
+    yapper_configs: list[YapperConfig] = []
+    for config_path, globbed in config_paths.items():
+        try:
+            yapper_config = load_config(argparse.Namespace(config=str(config_path)))
+        except KeyError:
+            if not globbed:
+                raise
+            logger.info(f"Skipping {config_path} without a [tool.yapper] section")
+            continue
+        package_root = yapper_config.get("package_root_relative_path", "./")
+        yapper_config["package_root_relative_path"] = str(config_path.parent / package_root)
+        yapper_configs.append(yapper_config)
+    if not yapper_configs:
+        raise ValueError(f"No yapper configs were found for {patterns}")
+    return yapper_configs
+
+
 def process_config(yapper_config: YapperConfig) -> YapperConfig:
     """Validate and prepares a yapper config for downstream use."""
     err_msg = """
@@ -69,6 +140,10 @@ def process_config(yapper_config: YapperConfig) -> YapperConfig:
     Each inline table should contain: 
     - a "module" key with the module name; 
     - an "astro" key with output filepath for the astro file.
+    Or, to include a package's modules:
+    - a "package" key with the package name;
+    - an "astro_dir" key with the output directory for the astro files;
+    - an optional "exclude" key with an array of module name patterns to exclude.
     """
     if "module_map" not in yapper_config:
         raise KeyError('The configuration file requires a "module_map" key.')
@@ -77,6 +152,13 @@ def process_config(yapper_config: YapperConfig) -> YapperConfig:
     for module_info in yapper_config["module_map"]:
         if not isinstance(module_info, dict):  # type: ignore
             raise TypeError(err_msg)
+        if "package" in module_info.keys():
+            if "astro_dir" not in module_info.keys():
+                raise KeyError(err_msg)
+            exclude = module_info.get("exclude", [])
+            if not isinstance(exclude, list) or not all(isinstance(pattern, str) for pattern in exclude):
+                raise TypeError(err_msg)
+            continue
         if "module" not in module_info.keys():
             raise KeyError(err_msg)
         if "astro" not in module_info.keys():
@@ -84,6 +166,49 @@ def process_config(yapper_config: YapperConfig) -> YapperConfig:
         astro_path = module_info["astro"]
         if not astro_path.endswith(".astro"):
             raise ValueError(f'Expecting an astro output file type ending in ".astro" but encountered "{astro_path}"')
+    if "jobs" in yapper_config:
+        jobs = yapper_config["jobs"]
+        if not isinstance(jobs, int) or isinstance(jobs, bool) or jobs < 1:  # type: ignore
+            raise ValueError(f'The "jobs" key should be a positive integer but encountered "{jobs}"')
+    for cache_size_key in ["markdown_cache_size", "docstring_cache_size", "pipeline_queue_size"]:
+        if cache_size_key in yapper_config:
+            cache_size = yapper_config[cache_size_key]  # type: ignore
+            if not isinstance(cache_size, int) or isinstance(cache_size, bool) or cache_size < 0:  # type: ignore
+                raise ValueError(
+                    f'The "{cache_size_key}" key should be a non-negative integer but encountered "{cache_size}"'
+                )
+    for max_mb_key in ["module_cache_max_mb", "markdown_disk_cache_max_mb"]:
+        if max_mb_key in yapper_config:
+            max_mb = yapper_config[max_mb_key]  # type: ignore
+            if not isinstance(max_mb, (int, float)) or isinstance(max_mb, bool) or max_mb < 0:  # type: ignore
+                raise ValueError(f'The "{max_mb_key}" key should be a non-negative number but encountered "{max_mb}"')
+    for flag_key in ["markdown_disk_cache", "module_cache", "prune_outputs", "stream_output", "compact_output"]:
+        if flag_key in yapper_config and not isinstance(yapper_config[flag_key], bool):  # type: ignore
+            raise ValueError(
+                f'The "{flag_key}" key should be a boolean but encountered "{yapper_config[flag_key]}"'  # type: ignore
+            )
+    if yapper_config.get("search_index") is not None:
+        search_index = yapper_config["search_index"]
+        if not isinstance(search_index, str) or not search_index.endswith(".json"):
+            raise ValueError(
+                f'The "search_index" key should be a file path ending in ".json" but encountered "{search_index}"'
+            )
+    if yapper_config.get("shard_by") is not None and yapper_config["shard_by"] not in SHARD_POLICIES:
+        raise ValueError(
+            f'The "shard_by" key should be one of {SHARD_POLICIES} but encountered "{yapper_config["shard_by"]}"'
+        )
+    for shard_limit_key in ["shard_max_members", "shard_max_kb"]:
+        if shard_limit_key in yapper_config:
+            shard_limit = yapper_config[shard_limit_key]  # type: ignore
+            if not isinstance(shard_limit, int) or isinstance(shard_limit, bool) or shard_limit < 1:  # type: ignore
+                raise ValueError(
+                    f'The "{shard_limit_key}" key should be a positive integer but encountered "{shard_limit}"'
+                )
+    if "render_backend" in yapper_config and yapper_config["render_backend"] not in RENDER_BACKENDS:
+        raise ValueError(
+            f'The "render_backend" key should be one of {RENDER_BACKENDS} but encountered '
+            f'"{yapper_config["render_backend"]}"'
+        )
     # check for invalid keys
     for key in yapper_config.keys():
         if key not in yapper_template_config:
@@ -97,30 +222,740 @@ def process_config(yapper_config: YapperConfig) -> YapperConfig:
     return merged_config
 
 
-def main(yapper_config: YapperConfig) -> None:
-    """Use a yapper config to parse docstrings from a python file to an astro output file."""
-    yapper_config = process_config(yapper_config)
-    # check and add package root path if spec'd in config
+def resolve_package_path(yapper_config: YapperConfig) -> Path:
+    """Resolve the package root path relative to the current working directory."""
     # this should only be necessary if the script is placed somewhere other than the package root
     if "package_root_relative_path" in yapper_config:
         config_path: str = yapper_config["package_root_relative_path"]
-        package_path = Path(Path.cwd() / config_path)
+        return Path(Path.cwd() / config_path)
+    return Path.cwd()
+
+
+def add_package_path(yapper_config: YapperConfig) -> Path:
+    """Resolve the package root path and add it to the Python paths."""
+    package_path = resolve_package_path(yapper_config)
+    if str(package_path) not in sys.path:
+        logger.info(f"Adding {package_path} to Python paths")
+        sys.path.append(str(package_path))
+    return package_path
+
+
+def create_loader(yapper_config: YapperConfig) -> GriffeLoader:
+    """Add the config's package path to the Python paths, then create a griffe loader, which searches those paths."""
+    from griffe.loader import GriffeLoader
+
+    add_package_path(yapper_config)
+    return GriffeLoader()
+
+
+def _is_importable(package_dir: Path, sub_parts: tuple[str, ...], is_namespace: bool) -> bool:
+    """Whether each of a submodule's parent directories is a package, or a namespace package."""
+    for depth in range(1, len(sub_parts)):
+        if Path(package_dir, *sub_parts[:depth], "__init__.py").exists():
+            is_namespace = False
+        elif not is_namespace:
+            return False
+    return True
+
+
+def discover_package(package_info: PackageMap, search_paths: list[str] | None = None) -> list[ModuleMap]:
+    """
+    Build module map entries for a package and each of its submodules, walking the package's directories once.
+
+    Packages are written to an "index.astro" file in their directory, and modules to a file named after the module,
+    mirroring the package structure within the "astro_dir" directory. Modules whose names match any of the "exclude"
+    patterns are skipped. The package is found in the `search_paths`, which default to the Python paths.
+    """
+    from griffe.finder import NamespacePackage
+    from griffe.loader import GriffeLoader
+
+    package_name = package_info["package"]
+    name_parts = package_name.split(".")
+    finder = GriffeLoader(search_paths=search_paths).finder
+    top_package = finder.find_package(name_parts[0])
+    if isinstance(top_package, NamespacePackage):
+        base_dirs = top_package.path
+    elif top_package.path.name == "__init__.py":
+        base_dirs = [top_package.path.parent]
     else:
-        package_path = Path.cwd()
-    logger.info(f"Adding {package_path} to Python paths")
-    sys.path.append(str(package_path))
-    # parse the modules
-    for module_info in yapper_config["module_map"]:
-        astro_path = module_info["astro"]
-        out_path = Path(package_path / astro_path)
-        logger.info(f"Processing {module_info['module']} to {out_path}")
+        base_dirs = []
+    package_dirs = [Path(base_dir, *name_parts[1:]) for base_dir in base_dirs]
+    package_dirs = [package_dir for package_dir in package_dirs if package_dir.is_dir()]
+    if not package_dirs:
+        raise ValueError(f'Unable to find a package directory for the "{package_name}" package.')
+    modules: dict[str, tuple[str, ...]] = {}
+    for package_dir in package_dirs:
+        is_namespace = not (package_dir / "__init__.py").exists()
+        if not is_namespace:
+            modules.setdefault(package_name, ("index",))
+        for sub_parts, sub_path in finder.iter_submodules(package_dir):
+            # stubs and compiled modules are not documented separately
+            if sub_path.suffix != ".py" or not all(part.isidentifier() for part in sub_parts):
+                continue
+            # as per griffe, modules within directories without an __init__ module are only loaded for namespaces
+            if not _is_importable(package_dir, sub_parts, is_namespace):
+                continue
+            module_name = ".".join([package_name, *sub_parts])
+            modules.setdefault(module_name, (*sub_parts, "index") if sub_path.name == "__init__.py" else sub_parts)
+    module_map: list[ModuleMap] = []
+    for module_name, path_parts in sorted(modules.items()):
+        if any(fnmatch.fnmatchcase(module_name, pattern) for pattern in package_info.get("exclude", [])):
+            continue
+        astro_path = Path(package_info["astro_dir"], *path_parts).with_suffix(".astro")
+        module_map.append({"module": module_name, "astro": astro_path.as_posix()})
+    logger.info(f"Discovered {len(module_map)} modules in the {package_name} package")
+    return module_map
+
+
+def expand_module_map(yapper_config: YapperConfig, search_paths: list[str] | None = None) -> YapperConfig:
+    """
+    Replace package entries in the module map with an entry for each of the package's modules.
+
+    Modules which are also listed individually keep their own entries. Packages are found in the `search_paths`, which
+    default to the Python paths, in which case the package root path should already have been added per
+    `add_package_path`.
+    """
+    module_entries = [module_info for module_info in yapper_config["module_map"] if "package" not in module_info]
+    package_entries = [module_info for module_info in yapper_config["module_map"] if "package" in module_info]
+    if not package_entries:
+        return yapper_config
+    module_map = list(module_entries)
+    listed_modules = {module_info["module"] for module_info in module_entries}
+    for package_info in package_entries:
+        for module_info in discover_package(package_info, search_paths):  # type: ignore
+            if module_info["module"] not in listed_modules:
+                listed_modules.add(module_info["module"])
+                module_map.append(module_info)
+    expanded_config = copy.copy(yapper_config)
+    expanded_config["module_map"] = module_map
+    return expanded_config
+
+
+def write_astro(
+    module_info: ModuleMap, out_path: Path, astro: str | Iterable[str], output_writer: OutputWriter | None = None
+) -> bool:
+    """
+    Write astro content, or chunks of astro content, to the output path, returning whether the file was written.
+
+    Files with identical content are left untouched. Written and unchanged files are counted by the output writer.
+    """
+    if output_writer is None:
+        output_writer = OutputWriter()
+    # the output directories are created as needed
+    if output_writer.write(out_path.absolute(), astro):
+        logger.info(f"Wrote {module_info['module']} to {out_path}")
+        return True
+    logger.debug("Unchanged %s at %s", module_info["module"], out_path)
+    return False
+
+
+def store_entry(
+    module_info: ModuleMap,
+    astro: str | Iterable[str] | dict[str, str],
+    digest: str | None,
+    package_path: Path,
+    manifest: cache.BuildManifest,
+    output_writer: OutputWriter,
+    yapper_config: YapperConfig,
+    search_entries: search.SearchEntries | None = None,
+    search_docs: list[list[Any]] | None = None,
+    sources: list[Path] | None = None,
+) -> bool:
+    """
+    Write an entry's astro content, or its pages if sharded, and record the entry and its search documents.
+
+    The entry's source files, per `cache.module_sources`, are recorded in the manifest alongside its digest.
+
+    The search documents are taken from the search collector once the content is written, unless already provided,
+    e.g. when writing on a background thread. Shard pages built by a previous run which are no longer built are
+    removed if the config's "prune_outputs" key is set. Returns whether any of the entry's pages were written.
+    """
+    pages = astro if isinstance(astro, dict) else {module_info["astro"]: astro}
+    written = False
+    for astro_key, page in pages.items():
+        if write_astro(module_info, Path(package_path / astro_key), page, output_writer):
+            written = True
+    # the index page is followed by the shard pages
+    stale_shards = manifest.record(module_info["astro"], module_info["module"], digest, list(pages)[1:], sources)
+    if yapper_config["prune_outputs"]:
+        for shard_key in stale_shards:
+            if output_writer.remove(Path(package_path / shard_key)):
+                logger.info(f"Removed stale shard {shard_key}")
+    if search_docs is None:
+        search_docs = search_collector.pop(module_info["module"])
+    if search_entries is not None:
+        search_entries.record(module_info["astro"], search_docs)
+    return written
+
+
+def parse_entry(module_content: Module, module_info: ModuleMap, yapper_config: YapperConfig) -> str | dict[str, str]:
+    """Parse a module map entry's module to astro content, or to its pages if the config's "shard_by" key is set."""
+    from yapper import parser
+
+    if yapper_config["shard_by"] is not None:
+        return parser.parse_pages(module_content, yapper_config, module_info["astro"])  # type: ignore
+    return parser.parse(module_content=module_content, yapper_config=yapper_config)  # type: ignore
+
+
+def load_module(griffe_loader: GriffeLoader, module_name: str) -> Module:
+    """
+    Load a module using a shared griffe loader.
+
+    Griffe loads the full package tree when loading a module, so modules belonging to an already loaded package are
+    retrieved from the loader's modules collection instead of being parsed again. Otherwise, unchanged packages are
+    restored from the module cache, if configured.
+    """
+    try:
+        return griffe_loader.modules_collection[module_name]
+    except KeyError:
+        return cache.module_cache.load_module(griffe_loader, module_name)
+
+
+class _LogCollector(logging.Handler):
+    """Collects log records in worker processes so that they can be emitted per module by the main process."""
+
+    def __init__(self):
+        """Initialise an empty record buffer."""
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Format the message eagerly so that the record can be pickled."""
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+_worker_loader: GriffeLoader | None = None
+# top-level packages whose aliases have been resolved by the worker's loader
+_worker_resolved: set[str] = set()
+_worker_log_collector = _LogCollector()
+
+
+def configure_render_caches(yapper_config: YapperConfig, package_path: Path) -> None:
+    """
+    Configure the render caches, i.e. the markdown render cache and the docstring fragment cache.
+
+    Sets the size of each cache, and whether the markdown render cache persists to the cache directory, together with
+    the maximum total size of the persisted renders.
+    """
+    from yapper import parser
+
+    disk_dir = None
+    if yapper_config["markdown_disk_cache"]:
+        disk_dir = Path(package_path / yapper_config["cache_dir"] / "markdown")
+    max_bytes = int(yapper_config["markdown_disk_cache_max_mb"] * 1024 * 1024)
+    parser.markdown_cache.configure(yapper_config["markdown_cache_size"], disk_dir, max_bytes)
+    parser.docstring_cache.configure(yapper_config["docstring_cache_size"])
+
+
+def configure_search(yapper_config: YapperConfig, cache_dir: Path) -> search.SearchEntries | None:
+    """Enable collecting search documents if the config's "search_index" key is set, returning the stored documents."""
+    search_collector.clear()
+    search_collector.enabled = yapper_config["search_index"] is not None
+    if not search_collector.enabled:
+        return None
+    return search.SearchEntries(cache_dir)
+
+
+def configure_module_cache(yapper_config: YapperConfig, package_path: Path) -> None:
+    """Configure whether loaded package trees persist to the cache directory, and the maximum size of the entries."""
+    disk_dir = None
+    if yapper_config["module_cache"]:
+        disk_dir = Path(package_path / yapper_config["cache_dir"] / "modules")
+    cache.module_cache.configure(disk_dir, int(yapper_config["module_cache_max_mb"] * 1024 * 1024))
+
+
+def _init_worker(package_paths: list[Path], log_level: int = logging.INFO, profile: bool = False) -> None:
+    """
+    Prepare a worker process with its own shared loader, logging, and profiler, for the modules of the package paths.
+    """
+    from griffe.loader import GriffeLoader
+
+    global _worker_loader  # pylint: disable=global-statement
+    for package_path in package_paths:
+        if str(package_path) not in sys.path:
+            sys.path.append(str(package_path))
+    _worker_loader = GriffeLoader()
+    _worker_resolved.clear()
+    root_logger = logging.getLogger()
+    root_logger.handlers = [_worker_log_collector]
+    logging.getLogger("yapper").setLevel(log_level)
+    if profile:
+        profiler.start()
+
+
+def _parse_in_worker(
+    module_info: ModuleMap, yapper_config: YapperConfig, package_path: Path
+) -> tuple[
+    str | dict[str, str],
+    list[logging.LogRecord],
+    dict[str, dict[str, int]],
+    list[dict[str, Any]],
+    list[Diagnostic],
+    list[list[Any]],
+    list[Path],
+]:
+    """
+    Load and parse a module in a worker process, configuring the worker's caches and search collector for the config.
+
+    Returns the astro content, or the pages of a sharded module, the buffered log records, the markdown, docstring,
+    and module cache counts, the profile records, the diagnostics, the search documents, and the module's source files
+    per `cache.module_sources`.
+    """
+    from yapper import parser
+
+    configure_render_caches(yapper_config, package_path)
+    configure_module_cache(yapper_config, package_path)
+    search_collector.enabled = yapper_config["search_index"] is not None
+    _worker_log_collector.records = []
+    profiler.records = []
+    diagnostics.clear()
+    markdown_stats = parser.markdown_cache.stats()
+    docstring_stats = parser.docstring_cache.stats()
+    module_stats = cache.module_cache.stats()
+    with profiler.stage("griffe_load", module=module_info["module"]):
+        module_content = load_module(_worker_loader, module_info["module"])  # type: ignore
+        # aliases are resolved across the loader's modules once per loaded package, rather than for every module
+        if module_content.package.path not in _worker_resolved:
+            _worker_loader.resolve_aliases()  # type: ignore
+            _worker_resolved.add(module_content.package.path)
+    with profiler.stage("render", module=module_info["module"]):
+        astro = parse_entry(module_content, module_info, yapper_config)
+    cache_stats = {
+        "markdown": {k: v - markdown_stats[k] for k, v in parser.markdown_cache.stats().items()},
+        "docstrings": {k: v - docstring_stats[k] for k, v in parser.docstring_cache.stats().items()},
+        "modules": {k: v - module_stats[k] for k, v in cache.module_cache.stats().items()},
+    }
+    search_docs = search_collector.pop(module_info["module"])
+    sources = cache.module_sources(module_content)
+    return (
+        astro,
+        _worker_log_collector.records,
+        cache_stats,
+        profiler.records,
+        diagnostics.records,
+        search_docs,
+        sources,
+    )
+
+
+def load_modules(griffe_loader: GriffeLoader, stale_entries: list[ModuleMap]) -> Iterator[Module]:
+    """
+    Load the modules of module map entries per `load_module`, yielding them once the aliases are resolved.
+
+    Aliases across the loader's modules are resolved once all of the modules are loaded, so that the loaded objects are
+    no longer updated once the first module is yielded for rendering.
+    """
+    loaded_modules: list[Module] = []
+    for module_info in stale_entries:
+        with profiler.stage("griffe_load", module=module_info["module"]):
+            loaded_modules.append(load_module(griffe_loader, module_info["module"]))
+    griffe_loader.resolve_aliases()
+    yield from loaded_modules
+
+
+def pipeline_size(yapper_config: YapperConfig) -> int:
+    """
+    Return the size of the queues between the load, render, and write stages, or 0 if the stages run in turn.
+
+    The stages run in turn while profiling, since the profiler measures one stage at a time, and when streaming output,
+    since streamed pages are rendered as they are written.
+    """
+    if profiler.enabled or yapper_config["stream_output"]:
+        return 0
+    return yapper_config["pipeline_queue_size"]
+
+
+def parse_serial(
+    stale_entries: list[ModuleMap], yapper_config: YapperConfig, griffe_loader: GriffeLoader | None = None
+) -> Iterator[tuple[str | Iterator[str] | dict[str, str], list[Path]]]:
+    """
+    Parse module map entries in the current process using a single shared loader, which is created if not provided.
+
+    The parsed content of each entry is yielded together with its source files, per `cache.module_sources`. If the
+    config's "stream_output" key is set, each entry is yielded as an iterator of chunks which are rendered as
+    they are written, unless modules are sharded, in which case the pages of each entry are yielded. Unless the stages
+    run in turn per `pipeline_size`, the modules are loaded on a background thread, per `load_modules`.
+    """
+    from griffe.loader import GriffeLoader
+
+    from yapper import parser
+
+    # load the modules with a single shared loader so that packages are only walked once per run
+    if griffe_loader is None:
         griffe_loader = GriffeLoader()
-        module_content = griffe_loader.load_module(module_info["module"])
-        # parse
-        astro = parser.parse(module_content=module_content, yapper_config=yapper_config)  # type: ignore
-        # create the path and output directories as needed
-        astro_path = Path(out_path)
-        astro_path.parent.mkdir(parents=True, exist_ok=True)
-        # write!
-        with open(astro_path.absolute(), mode="w") as out_file:
-            out_file.write(astro)
+    queue_size = pipeline_size(yapper_config)
+    module_contents = load_modules(griffe_loader, stale_entries)
+    if queue_size > 0:
+        # only the background thread updates the loaded objects, which is done before the first module is rendered
+        module_contents = pipeline.prefetch(module_contents, queue_size)
+    for module_info, module_content in zip(stale_entries, module_contents):
+        sources = cache.module_sources(module_content)
+        if yapper_config["stream_output"] and yapper_config["shard_by"] is None:
+            # rendering is profiled as part of the write stage
+            yield parser.iter_parse(module_content=module_content, yapper_config=yapper_config), sources  # type: ignore
+            continue
+        with profiler.stage("render", module=module_info["module"]):
+            astro = parse_entry(module_content, module_info, yapper_config)
+        yield astro, sources
+
+
+def worker_pool(package_paths: list[Path], jobs: int) -> ProcessPoolExecutor:
+    """Create a pool of worker processes for parsing the modules of the package paths."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    log_level = logging.getLogger("yapper").getEffectiveLevel()
+    return ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(package_paths, log_level, profiler.enabled)
+    )
+
+
+def parse_parallel(
+    stale_entries: list[ModuleMap],
+    yapper_config: YapperConfig,
+    package_path: Path,
+    jobs: int,
+    executor: ProcessPoolExecutor | None = None,
+) -> Iterator[tuple[str | dict[str, str], list[Path]]]:
+    """
+    Parse module map entries across a pool of worker processes, which is created if not provided.
+
+    The parsed content of each entry is yielded together with its source files, per `parse_serial`. Results are
+    yielded in module map order and each module's log records are emitted together once it completes.
+    Entries are submitted as results are taken, so that at most one entry per worker, plus the queue size per
+    `pipeline_size`, is pending or held as a finished result.
+    """
+    from yapper import parser
+
+    entries = iter(stale_entries)
+    with worker_pool([package_path], jobs) if executor is None else contextlib.nullcontext(executor) as pool:
+        futures: collections.deque[tuple[ModuleMap, Future]] = collections.deque()
+        for module_info in itertools.islice(entries, jobs + pipeline_size(yapper_config)):
+            futures.append((module_info, pool.submit(_parse_in_worker, module_info, yapper_config, package_path)))
+        while futures:
+            module_info, future = futures.popleft()
+            try:
+                astro, records, cache_stats, profile_records, diagnostic_records, search_docs, sources = future.result()
+            except Exception as err:
+                for _pending_info, pending in futures:
+                    pending.cancel()
+                raise RuntimeError(f"Failed to process module {module_info['module']}: {err}") from err
+            next_info = next(entries, None)
+            if next_info is not None:
+                futures.append((next_info, pool.submit(_parse_in_worker, next_info, yapper_config, package_path)))
+            for record in records:
+                logging.getLogger(record.name).handle(record)
+            parser.markdown_cache.add_stats(cache_stats["markdown"])
+            parser.docstring_cache.add_stats(cache_stats["docstrings"])
+            cache.module_cache.add_stats(cache_stats["modules"])
+            profiler.add_records(profile_records)
+            diagnostics.add_records(diagnostic_records)
+            search_collector.entries[module_info["module"]] = search_docs
+            yield astro, sources
+
+
+def write_search_index(
+    yapper_config: YapperConfig, package_path: Path, search_entries: search.SearchEntries, output_writer: OutputWriter
+) -> None:
+    """Persist the search documents for the module map's pages, and write the search index if it has changed."""
+    astro_keys = [module_info["astro"] for module_info in yapper_config["module_map"]]
+    search_entries.prune(astro_keys)
+    search_entries.save()
+    index = search.build_index({k: search_entries.pages[k] for k in astro_keys if k in search_entries.pages})
+    index_path = Path(package_path / yapper_config["search_index"])  # type: ignore
+    if output_writer.write(index_path.absolute(), search.dumps_index(index)):
+        logger.info(f"Wrote search index with {len(index['docs'])} documents to {index_path}")
+
+
+class BuildPlan:
+    """A config prepared for building, with its build manifest and the module map entries whose inputs have changed."""
+
+    def __init__(self, yapper_config: YapperConfig, force: bool = False, clean: bool = False):
+        """
+        Add the config's package path to the Python paths, expand its package entries, and find the stale entries.
+
+        Entries whose source files, as recorded by the previous run, and configuration are unchanged are skipped,
+        unless `force` is set. Setting `clean` removes the cache directory, and therefore the build manifest, first.
+        """
+        yapper_config = process_config(yapper_config)
+        self.package_path = add_package_path(yapper_config)
+        self.yapper_config = expand_module_map(yapper_config)
+        # prepare the build manifest
+        cache_dir = Path(self.package_path / self.yapper_config["cache_dir"])
+        if clean:
+            cache.clean_cache(cache_dir)
+        self.manifest = cache.BuildManifest(cache_dir)
+        self.search_entries = configure_search(self.yapper_config, cache_dir)
+        self.config_digest = cache.config_digest(self.yapper_config)
+        # find the entries with changed inputs, reading each of the recorded source files once
+        self.stale_entries: list[ModuleMap] = []
+        file_digests: dict[Path, str] = {}
+        for module_info in self.yapper_config["module_map"]:
+            # pages without search documents are rebuilt so that the search index is complete
+            searchable = self.search_entries is None or module_info["astro"] in self.search_entries.pages
+            if not force and self.is_current(module_info, file_digests) and searchable:
+                logger.info(f"Skipping unchanged {module_info['module']}")
+                continue
+            self.stale_entries.append(module_info)
+
+    def sources(self, module_info: ModuleMap) -> list[Path]:
+        """Return the source files recorded for an entry by the previous build, per `cache.module_sources`."""
+        return self.manifest.sources(module_info["astro"])
+
+    def digest(
+        self, module_info: ModuleMap, sources: list[Path], file_digests: dict[Path, str] | None = None
+    ) -> str | None:
+        """
+        Hash an entry's inputs per `cache.entry_digest`, given its source files.
+
+        The digests of individual files are reused from `file_digests`, per `cache.hash_files`. Returns None if there
+        are no source files or if any can't be read.
+        """
+        if not sources:
+            return None
+        try:
+            sources_digest = cache.hash_files(sources, file_digests)
+        except OSError:
+            return None
+        return cache.entry_digest(module_info, sources_digest, self.config_digest)
+
+    def is_current(self, module_info: ModuleMap, file_digests: dict[Path, str] | None = None) -> bool:
+        """Whether an entry's recorded source files and the configuration are unchanged since it was built."""
+        digest = self.digest(module_info, self.sources(module_info), file_digests)
+        out_path = Path(self.package_path / module_info["astro"])
+        return self.manifest.is_current(module_info["astro"], digest, out_path)
+
+    def configure(self) -> None:
+        """Configure the shared markdown, docstring, and module caches and the search collector for the config."""
+        configure_render_caches(self.yapper_config, self.package_path)
+        configure_module_cache(self.yapper_config, self.package_path)
+        search_collector.enabled = self.search_entries is not None
+
+    def store(
+        self,
+        output_writer: OutputWriter,
+        entry: tuple[ModuleMap, list[Path], str | Iterable[str] | dict[str, str], list[list[Any]] | None],
+    ) -> bool:
+        """
+        Write a parsed entry's pages, paired with its source files and any search documents, per `store_entry`.
+
+        The entry is recorded with the digest of its source files, which are hashed before the pages are written.
+        """
+        module_info, sources, astro, search_docs = entry
+        with profiler.stage("write", module=module_info["module"]):
+            digest = self.digest(module_info, sources)
+            return store_entry(
+                module_info,
+                astro,
+                digest,
+                self.package_path,
+                self.manifest,
+                output_writer,
+                self.yapper_config,
+                self.search_entries,
+                search_docs,
+                sources,
+            )
+
+    def finish(self, output_writer: OutputWriter) -> None:
+        """Persist the build manifest, prune stale outputs if configured, and write the search index if configured."""
+        stale_outputs = self.manifest.prune([module_info["astro"] for module_info in self.yapper_config["module_map"]])
+        if self.yapper_config["prune_outputs"]:
+            for astro_key in stale_outputs:
+                if output_writer.remove(Path(self.package_path / astro_key)):
+                    logger.info(f"Removed stale output {astro_key}")
+        self.manifest.save()
+        if self.search_entries is not None:
+            write_search_index(self.yapper_config, self.package_path, self.search_entries, output_writer)
+
+
+def main(
+    yapper_config: YapperConfig,
+    force: bool = False,
+    clean: bool = False,
+    jobs: int | None = None,
+    profile: str | None = None,
+    diagnostics_json: str | None = None,
+    griffe_loader: GriffeLoader | None = None,
+) -> BuildPlan:
+    """
+    Use a yapper config to parse docstrings from a python file to an astro output file.
+
+    Package entries in the module map are expanded to an entry for each of the package's modules.
+
+    Entries whose source files and configuration are unchanged since the previous run are skipped, unless `force` is
+    set. Setting `clean` removes the cache directory, and therefore the build manifest, before running. Entries are
+    spread across `jobs` worker processes, which defaults to the config's "jobs" key. If a `profile` path is provided,
+    the stages of each entry are profiled and a JSON report is written to the path. Docstring diagnostics are logged
+    as a grouped summary at the end of the run, and are written to the `diagnostics_json` path if provided.
+
+    Output files are only replaced if their content changes. If the config's "prune_outputs" key is set, astro files
+    built by previous runs for entries which are no longer in the module map are removed. If the config's
+    "stream_output" key is set, pages in serial builds are written to the output files as they are rendered. If the
+    config's "search_index" key is set, a search index for all of the module map's pages is written to the path.
+
+    Modules parsed in the current process are loaded with `griffe_loader`, if provided, per `batch`. Returns the build
+    plan, e.g. for rebuilding entries with the same manifest and loaded modules.
+    """
+    (plan,) = batch(
+        [yapper_config],
+        force=force,
+        clean=clean,
+        jobs=jobs,
+        profile=profile,
+        diagnostics_json=diagnostics_json,
+        griffe_loader=griffe_loader,
+    )
+    return plan
+
+
+def batch(
+    yapper_configs: list[YapperConfig],
+    force: bool = False,
+    clean: bool = False,
+    jobs: int | None = None,
+    profile: str | None = None,
+    diagnostics_json: str | None = None,
+    griffe_loader: GriffeLoader | None = None,
+) -> list[BuildPlan]:
+    """
+    Build several yapper configs in one process, e.g. for each package of a monorepo, per `main`.
+
+    The configs are built in turn, sharing a griffe loader, the markdown, docstring, and module caches, and a pool of
+    worker processes, and a combined summary is logged at the end of the run. `jobs` defaults to the largest of the
+    configs' "jobs" keys. The shared loader is created unless provided, in which case it should be created once the
+    configs' package paths are on the Python paths. Returns the build plan for each config.
+    """
+    from griffe.loader import GriffeLoader
+
+    from yapper import parser
+
+    diagnostics.clear()
+    if profile is not None:
+        profiler.start()
+    # the package paths are added before the shared loader and workers are created, since they search the python
+    # paths present at creation
+    plans = [BuildPlan(yapper_config, force=force, clean=clean) for yapper_config in yapper_configs]
+    if jobs is None:
+        jobs = max(plan.yapper_config["jobs"] for plan in plans)
+    elif not isinstance(jobs, int) or isinstance(jobs, bool) or jobs < 1:
+        raise ValueError(f'The "jobs" argument should be a positive integer but encountered "{jobs}"')
+    cache_stats = parser.markdown_cache.stats()
+    docstring_stats = parser.docstring_cache.stats()
+    module_stats = cache.module_cache.stats()
+    if griffe_loader is None:
+        griffe_loader = GriffeLoader()
+    output_writer = OutputWriter()
+    with contextlib.ExitStack() as exit_stack:
+        executor: ProcessPoolExecutor | None = None
+        for plan in plans:
+            plan.configure()
+            # parse the modules
+            if jobs > 1 and len(plan.stale_entries) > 1:
+                if executor is None:
+                    executor = exit_stack.enter_context(worker_pool([plan.package_path for plan in plans], jobs))
+                logger.info(f"Processing {len(plan.stale_entries)} modules across {jobs} worker processes")
+                parsed = parse_parallel(plan.stale_entries, plan.yapper_config, plan.package_path, jobs, executor)
+            else:
+                parsed = parse_serial(plan.stale_entries, plan.yapper_config, griffe_loader)
+            # the pages are written on a background thread while the next entry is rendered, unless the stages run in
+            # turn, in which case the search documents are collected as the pages are written
+            queue_size = pipeline_size(plan.yapper_config)
+            with pipeline.Consumer(functools.partial(plan.store, output_writer), queue_size, "yapper-writer") as writer:
+                for module_info, (astro, sources) in zip(plan.stale_entries, parsed):
+                    search_docs = search_collector.pop(module_info["module"]) if queue_size > 0 else None
+                    writer.put((module_info, sources, astro, search_docs))
+            plan.finish(output_writer)
+    if len(plans) > 1:
+        n_stale = sum(len(plan.stale_entries) for plan in plans)
+        n_entries = sum(len(plan.yapper_config["module_map"]) for plan in plans)
+        logger.info(f"Built {len(plans)} configs: {n_stale} of {n_entries} modules processed.")
+    logger.info(
+        f"Output files: {output_writer.written} written, {output_writer.unchanged} unchanged, "
+        f"{output_writer.removed} removed."
+    )
+    cache_stats = {k: v - cache_stats[k] for k, v in parser.markdown_cache.stats().items()}
+    logger.info(
+        f"Markdown render cache: {cache_stats['hits']} hits, {cache_stats['disk_hits']} disk hits, "
+        f"{cache_stats['misses']} misses."
+    )
+    docstring_stats = {k: v - docstring_stats[k] for k, v in parser.docstring_cache.stats().items()}
+    logger.info(f"Docstring cache: {docstring_stats['hits']} hits, {docstring_stats['misses']} misses.")
+    if any(plan.yapper_config["module_cache"] for plan in plans):
+        module_stats = {k: v - module_stats[k] for k, v in cache.module_cache.stats().items()}
+        logger.info(
+            f"Module cache: {module_stats['hits']} hits, {module_stats['misses']} misses, "
+            f"{module_stats['evicted']} evicted."
+        )
+    diagnostics.log_summary(logger)
+    if diagnostics_json is not None:
+        diagnostics.write_json(Path(diagnostics_json))
+    if profile is not None:
+        profiler.stop()
+        profiler.write_report(Path(profile))
+        logger.info(profiler.summary())
+        logger.info(f"Wrote profile report to {profile}")
+    return plans
+
+
+def iter_build(yapper_config: YapperConfig, modules: Iterable[Module] | None = None) -> Iterator[tuple[str, str]]:
+    """
+    Render a yapper config's pages in memory, yielding each page's astro path and content as it finishes.
+
+    Modules are found in the package root path without adding it to the Python paths, unless provided as already
+    loaded griffe modules, which may also be packages containing the module map's modules. Nothing is read from or
+    written to the cache directory, and no output files are written, and the previous configuration of the shared caches
+    is restored afterwards. Sharded modules yield their index page followed by their shard pages. If the config's
+    "search_index" key is set, the search index is yielded last.
+    """
+    from griffe.loader import GriffeLoader
+
+    from yapper import parser
+
+    yapper_config = process_config(yapper_config)
+    search_paths = [str(resolve_package_path(yapper_config)), *sys.path]
+    yapper_config = expand_module_map(yapper_config, search_paths)
+    griffe_loader = GriffeLoader(search_paths=search_paths)
+    provided_modules = {module.path: module for module in modules or []}
+    # the caches are kept in memory, and their previous configuration, e.g. that of a build daemon, is restored once
+    # the pages are rendered or the generator is closed
+    markdown_config = parser.markdown_cache.max_size, parser.markdown_cache.disk_dir, parser.markdown_cache.max_bytes
+    docstring_cache_size = parser.docstring_cache.max_size
+    module_cache_config = cache.module_cache.disk_dir, cache.module_cache.max_bytes
+    parser.markdown_cache.configure(yapper_config["markdown_cache_size"], None)
+    parser.docstring_cache.configure(yapper_config["docstring_cache_size"])
+    cache.module_cache.configure(None, 0)
+    try:
+        search_collector.clear()
+        search_collector.enabled = yapper_config["search_index"] is not None
+        search_pages: dict[str, list[list[Any]]] = {}
+        diagnostics.clear()
+        for module_info in yapper_config["module_map"]:
+            module_name = module_info["module"]
+            package_name = module_name
+            # a provided module, or a submodule of a provided package
+            while package_name not in provided_modules and "." in package_name:
+                package_name = package_name.rsplit(".", 1)[0]
+            if package_name in provided_modules:
+                module_content = provided_modules[package_name]
+                if package_name != module_name:
+                    module_content = module_content[module_name[len(package_name) + 1 :]]
+            else:
+                module_content = load_module(griffe_loader, module_name)
+            astro = parse_entry(module_content, module_info, yapper_config)
+            search_pages[module_info["astro"]] = search_collector.pop(module_name)
+            pages = astro if isinstance(astro, dict) else {module_info["astro"]: astro}
+            yield from pages.items()
+        if yapper_config["search_index"] is not None:
+            yield yapper_config["search_index"], search.dumps_index(search.build_index(search_pages))
+    finally:
+        parser.markdown_cache.configure(*markdown_config)
+        parser.docstring_cache.configure(docstring_cache_size)
+        cache.module_cache.configure(*module_cache_config)
+
+
+def build(yapper_config: YapperConfig, modules: Iterable[Module] | None = None) -> dict[str, str]:
+    """Render a yapper config's pages in memory, returning the content keyed by astro path, per `iter_build`."""
+    return dict(iter_build(yapper_config, modules))
@@ -0,0 +1,116 @@
+"""
+Output writer which only replaces files whose content has changed.
+
+Unchanged files keep their modification times, so that downstream file watchers and caches are not invalidated.
+Content can be provided whole, or as an iterable of chunks which are streamed to a temporary file as they are produced.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+# bytes per read when hashing existing files
+READ_SIZE = 1 << 16
+
+
+def content_digest(content: bytes) -> str:
+    """Hash file content."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_digest(file_path: Path) -> str | None:
+    """Hash a file's content in blocks, returns None if the file does not exist."""
+    hasher = hashlib.sha256()
+    try:
+        with open(file_path, mode="rb") as in_file:
+            for block in iter(lambda: in_file.read(READ_SIZE), b""):
+                hasher.update(block)
+    except FileNotFoundError:
+        return None
+    return hasher.hexdigest()
+
+
+def atomic_write(out_path: Path, content: bytes) -> None:
+    """Write content to a temporary file in the output directory and then rename it over the output path."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = out_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        temp_path.write_bytes(content)
+        os.replace(temp_path, out_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+class OutputWriter:
+    """Writes output files if their content has changed, counting the written, unchanged, and removed files."""
+
+    def __init__(self):
+        """Prepare a writer with zeroed counts."""
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def is_unchanged(self, out_path: Path, content: bytes) -> bool:
+        """Whether the file at the output path already has identical content."""
+        try:
+            if out_path.stat().st_size != len(content):
+                return False
+            return content_digest(out_path.read_bytes()) == content_digest(content)
+        except FileNotFoundError:
+            return False
+
+    def write(self, out_path: Path, content: str | Iterable[str]) -> bool:
+        """Write content to the output path unless identical, returning whether the file was written."""
+        if not isinstance(content, str):
+            return self.write_chunks(out_path, content)
+        encoded = content.encode("utf-8")
+        if self.is_unchanged(out_path, encoded):
+            self.unchanged += 1
+            return False
+        atomic_write(out_path, encoded)
+        self.written += 1
+        return True
+
+    def write_chunks(self, out_path: Path, chunks: Iterable[str]) -> bool:
+        """
+        Stream chunks of content to a temporary file while hashing them, then replace the output path unless identical.
+
+        Only one chunk is held in memory at a time.
+        """
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = out_path.with_suffix(f".{os.getpid()}.tmp")
+        hasher = hashlib.sha256()
+        try:
+            with open(temp_path, mode="wb") as temp_file:
+                for chunk in chunks:
+                    encoded = chunk.encode("utf-8")
+                    hasher.update(encoded)
+                    temp_file.write(encoded)
+            if file_digest(out_path) == hasher.hexdigest():
+                self.unchanged += 1
+                return False
+            os.replace(temp_path, out_path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        self.written += 1
+        return True
+
+    def remove(self, out_path: Path) -> bool:
+        """Remove an output file, returning whether it existed."""
+        try:
+            out_path.unlink()
+        except FileNotFoundError:
+            return False
+        self.removed += 1
+        return True
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of written, unchanged, and removed files."""
+        return {"written": self.written, "unchanged": self.unchanged, "removed": self.removed}
@@ -1,24 +1,61 @@
 """
-Uses AST and docstring_parser to parse docstrings to astro html.
+Uses griffe to parse docstrings to astro html.
 
 Intended for use with the Astro static site generator where further linting / linking / styling is done downstream.
 """
 from __future__ import annotations
 
+import ast
+import json
 import logging
-
-from dominate import dom_tag, svg, tags, util  # type: ignore
+import os
+import re
+from typing import TYPE_CHECKING, Any, Iterator
+
+import markdown_it
+import mdit_py_plugins
+from dominate import dom_tag, tags, util  # type: ignore
+from griffe.dataclasses import Class, Function
+from griffe.docstrings.dataclasses import DocstringSectionKind
+from griffe.docstrings.parsers import Parser
+from griffe.docstrings.parsers import parse as parse_docstring
 from markdown_it import MarkdownIt
 from mdit_py_plugins.admon import admon_plugin  # type: ignore
 from mdit_py_plugins.dollarmath import dollarmath_plugin  # type: ignore
-from slugify import slugify
 
-from yapper import YapperConfig
+from yapper import YapperConfig, cache
+from yapper.diagnostics import diagnostics
+from yapper.emitter import FragmentTemplate, HtmlEmitter, TemplateTag
+from yapper.profiler import profiler
+from yapper.search import page_url, search_collector
+from yapper.slugs import SlugRegistry, cached_slugify
+
+if TYPE_CHECKING:
+    from griffe.dataclasses import Alias, Module, Object
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-md = MarkdownIt("gfm-like", {"breaks": True, "html": True, "linkify": True}).use(dollarmath_plugin).use(admon_plugin)
+MD_PRESET = "gfm-like"
+MD_OPTIONS = {"breaks": True, "html": True, "linkify": True}
+md = MarkdownIt(MD_PRESET, MD_OPTIONS).use(dollarmath_plugin).use(admon_plugin)  # type: ignore
+# identifies the markdown configuration for cached renders
+MD_CONFIG_KEY = json.dumps(
+    {
+        "preset": MD_PRESET,
+        "options": MD_OPTIONS,
+        "plugins": ["dollarmath_plugin", "admon_plugin"],
+        "markdown_it": markdown_it.__version__,
+        "mdit_py_plugins": mdit_py_plugins.__version__,
+    },
+    sort_keys=True,
+)
+markdown_cache = cache.RenderCache(md.render, MD_CONFIG_KEY)  # type: ignore
+# docstring style parsed by griffe, which is part of the docstring cache keys
+DOCSTRING_STYLE = "numpy"
+# caches function docstring fragments, together with their diagnostics, by docstring text, signature, and style
+docstring_cache = cache.FragmentCache()
+# same-page links, which are rewritten for anchors on other pages of a sharded module
+HREF_PATTERN = re.compile(r'href="#([^"]+)"')
 
 
 class Markdown(dom_tag.dom_tag):
@@ -28,32 +65,121 @@ class Markdown(dom_tag.dom_tag):
 LINK_ICON = """
 M12.586 4.586a2 2 0 112.828 2.828l-3 3a2 2 0 01-2.828 0 1 1 0 00-1.414 1.414 4 4 0 005.656 0l3-3a4 4 0 00-5.656-5.656l-1.5 1.5a1 1 0 101.414 1.414l1.5-1.5zm-5 5a2 2 0 012.828 0 1 1 0 101.414-1.414 4 4 0 00-5.656 0l-3 3a4 4 0 105.656 5.656l1.5-1.5a1 1 0 10-1.414-1.414l-1.5 1.5a2 2 0 11-2.828-2.828l3-3z
 """
-
-
-def generate_heading(heading_level: str, heading_name: str, heading_cls: str):
+# id of the link icon's symbol, which compact pages define once and reference from each heading
+LINK_ICON_ID = "yap-link-icon"
+
+
+def _link_icon_symbol_structure(emitter: HtmlEmitter, _values: dict[str, str]) -> None:
+    """Emit the hidden link icon symbol referenced by the headings of compact pages."""
+    emitter.open("svg", {"xmlns": "http://www.w3.org/2000/svg", "aria-hidden": "true", "style": "display: none"})
+    emitter.open("symbol", {"id": LINK_ICON_ID, "viewBox": "0 0 20 20"})
+    emitter.element("path", attributes={"d": LINK_ICON.strip(), "fill-rule": "evenodd", "clip-rule": "evenodd"})
+    emitter.close()
+    emitter.close()
+
+
+def _heading_structure(heading_level: str):
+    """
+    Prepare a function emitting the fixed heading structure for a heading level.
+
+    In compact mode, the link icon references the page's shared symbol instead of repeating the icon's path.
+    """
+
+    def emit(emitter: HtmlEmitter, values: dict[str, str]) -> None:
+        emitter.open(heading_level, {"id": values["slug"], "class": values["cls"]})
+        emitter.open("a", {"aria-hidden": "true", "tabindex": "-1", "href": f"#{values['slug']}"})
+        emitter.open(
+            "svg",
+            {
+                "xmlns": "http://www.w3.org/2000/svg",
+                "viewBox": "0 0 20 20",
+                "aria-hidden": "true",
+                "width": "15px",
+                "height": "15px",
+                "class": "heading-icon",
+            },
+        )
+        if emitter.compact:
+            emitter.element("use", attributes={"href": f"#{LINK_ICON_ID}"})
+        else:
+            emitter.element("path", attributes={"d": LINK_ICON, "fill-rule": "evenodd", "clip-rule": "evenodd"})
+        emitter.close()
+        emitter.close()
+        emitter.text(values["name"])
+        emitter.close()
+
+    return emit
+
+
+def _prop_row_structure(emitter: HtmlEmitter, values: dict[str, str]) -> None:
+    """Emit the fixed structure for a class property row."""
+    emitter.open("div", {"class": "yap class-prop-elem-container"})
+    emitter.open("div", {"class": "yap class-prop-def"})
+    emitter.element("div", values["name"], {"class": "yap class-prop-def-name"})
+    emitter.element("div", values["type"], {"class": "yap class-prop-def-type"})
+    emitter.close()
+    emitter.element("div", values["desc"], {"class": "yap class-prop-def-desc"})
+    emitter.close()
+
+
+def _doc_str_elem_structure(emitter: HtmlEmitter, values: dict[str, str]) -> None:
+    """Emit the fixed structure for a docstring element row, the description being rendered markdown."""
+    emitter.open("div", {"class": "yap doc-str-elem-container"})
+    emitter.open("div", {"class": "yap doc-str-elem-def"})
+    emitter.element("div", values["name"], {"class": "yap doc-str-elem-name"})
+    emitter.element("div", values["type"], {"class": "yap doc-str-elem-type"})
+    emitter.close()
+    emitter.open("div", {"class": "yap doc-str-elem-desc"})
+    emitter.raw(values["desc"])
+    emitter.close()
+    emitter.close()
+
+
+def _sig_param_structure(emitter: HtmlEmitter, values: dict[str, str]) -> None:
+    """Emit the fixed structure for a signature parameter."""
+    emitter.element("div", values["param"], {"class": "yap func-sig-param"})
+
+
+# fixed structures which are rendered once and then only have their fields substituted
+HEADING_TEMPLATES = {
+    heading_level: FragmentTemplate(_heading_structure(heading_level), ["slug", "name", "cls"])
+    for heading_level in ["h1", "h2"]
+}
+PROP_ROW_TEMPLATE = FragmentTemplate(_prop_row_structure, ["name", "type", "desc"])
+DOC_STR_ELEM_TEMPLATE = FragmentTemplate(_doc_str_elem_structure, ["name", "type"], raw_fields=["desc"])
+SIG_PARAM_TEMPLATE = FragmentTemplate(_sig_param_structure, ["param"])
+LINK_ICON_SYMBOL_TEMPLATE = FragmentTemplate(_link_icon_symbol_structure, [])
+
+
+def heading_slug(heading_name: str, slug_registry: SlugRegistry | None = None) -> str:
+    """Return the anchor for a heading, de-duplicated against the page's registry if provided."""
+    if slug_registry is None:
+        return cached_slugify(heading_name)
+    return slug_registry.anchor(heading_name)
+
+
+def link_slug(heading_name: str, slug_registry: SlugRegistry | None = None) -> str:
+    """Return the anchor for linking to a heading, resolved against the page's registry if provided."""
+    if slug_registry is None:
+        return cached_slugify(heading_name)
+    return slug_registry.link(heading_name)
+
+
+def generate_heading(
+    heading_level: str, heading_name: str, heading_cls: str, slug_registry: SlugRegistry | None = None
+):
     """Create a heading of specified level with a link anchor."""
-    if heading_level == "h1":
-        h = tags.h1(id=slugify(heading_name), cls=heading_cls)
-    elif heading_level == "h2":
-        h = tags.h2(id=slugify(heading_name), cls=heading_cls)
-    else:
+    if heading_level not in HEADING_TEMPLATES:
         raise NotImplementedError(f"Heading level {heading_level} is not implemented for linking.")
-    with h:
-        a = tags.a(aria_hidden="true", tabindex="-1", href=f"#{slugify(heading_name)}")
-        with a:
-            s = svg.svg(
-                xmlns="http://www.w3.org/2000/svg",
-                viewBox="0 0 20 20",
-                aria_hidden="true",
-                width="15px",
-                height="15px",
-                cls="heading-icon",
-            )
-            with s:
-                svg.path(d=LINK_ICON, fill_rule="evenodd", clip_rule="evenodd")
-        util.text(heading_name)
+    return TemplateTag(
+        HEADING_TEMPLATES[heading_level],
+        {"slug": heading_slug(heading_name, slug_registry), "name": heading_name, "cls": heading_cls},
+    )
 
-    return h
+
+# characters which prevent a line from being welded to the preceding text
+WELD_END_BLOCKERS = ("|", ">")
+WELD_START_BLOCKERS = ("|", "!", "<", "-", "*")
 
 
 def weld_candidate(text_a: str | None, text_b: str | None) -> bool:
@@ -62,26 +188,27 @@ def weld_candidate(text_a: str | None, text_b: str | None) -> bool:
         return False
     if not text_b or text_b == "":
         return False
-    for char in ["|", ">"]:
-        if text_a.strip().endswith(char):
-            return False
-    for char in ["|", "!", "<", "-", "*"]:
-        if text_b.strip().startswith(char):
-            return False
+    if text_a.strip().endswith(WELD_END_BLOCKERS):
+        return False
+    if text_b.strip().startswith(WELD_START_BLOCKERS):
+        return False
     return True
 
 
-def add_markdown(fragment: tags.section | tags.div, text: str | None) -> tags.section | tags.div:
-    """Add a markdown text block."""
-    content_str = ""
-    if not text:
-        content_str = text.strip()
-    splits = content_str.split("\n")
-    code_padding = None
+def clean_markdown(content_str: str) -> str:
+    """
+    Clean docstring text in preparation for rendering as markdown.
+
+    Lines are classified in a single pass and collected as parts which are joined once at the end. Whether a line can
+    be welded to the preceding text only depends on the last non-whitespace character emitted so far, which is tracked
+    as lines are added instead of re-inspecting the accumulated text.
+    """
+    parts: list[str] = []
+    last_char = ""
+    code_padding = 0
     code_block = False
     other_block = False
-    cleaned_text = ""
-    for next_line in splits:
+    for next_line in content_str.split("\n"):
         # clean out pylint statements
         if "# pylint: disable=line-too-long" in next_line:
             next_line = next_line.replace("# pylint: disable=line-too-long", "")
@@ -90,76 +217,85 @@ def add_markdown(fragment: tags.section | tags.div, text: str | None) -> tags.se
             if code_block is False:
                 code_block = True
                 code_padding = next_line.index("```")
-                cleaned_text += f"\n{next_line[code_padding:]}"
+                part = f"\n{next_line[code_padding:]}"
             else:
-                cleaned_text += f"\n{next_line[code_padding:]}\n"
+                part = f"\n{next_line[code_padding:]}\n"
                 code_block = False
-                code_padding = None
+                code_padding = 0
         elif code_block:
-            cleaned_text += f"\n{next_line[code_padding:]}"
+            part = f"\n{next_line[code_padding:]}"
         # double breaks
         elif next_line == "":
-            cleaned_text += "\n\n"
-        # admonitions
-        elif next_line.startswith(":::") or next_line.startswith("$$"):
-            if not other_block:
-                other_block = True
-                cleaned_text += f"\n{next_line.strip()}"
-            else:
-                other_block = False
-                cleaned_text += f"\n{next_line.strip()}"
-        elif other_block:
-            cleaned_text += f"\n{next_line.strip()}"
-        # tables
-        elif next_line.strip().startswith("|") and next_line.strip().endswith("|"):
-            cleaned_text += f"\n{next_line.strip()}"
-        # otherwise weld if possible
-        elif weld_candidate(cleaned_text, next_line):
-            cleaned_text += f" {next_line.strip()}"
+            part = "\n\n"
         else:
-            cleaned_text += f"\n{next_line.strip()}"
+            stripped = next_line.strip()
+            # admonitions
+            if next_line.startswith(":::") or next_line.startswith("$$"):
+                other_block = not other_block
+                part = f"\n{stripped}"
+            elif other_block:
+                part = f"\n{stripped}"
+            # tables
+            elif stripped.startswith("|") and stripped.endswith("|"):
+                part = f"\n{stripped}"
+            # otherwise weld if possible
+            elif parts and last_char not in WELD_END_BLOCKERS and not stripped.startswith(WELD_START_BLOCKERS):
+                part = f" {stripped}"
+            else:
+                part = f"\n{stripped}"
+        parts.append(part)
+        trimmed = part.rstrip()
+        if trimmed:
+            last_char = trimmed[-1]
+    cleaned_text = "".join(parts)
     if code_block or other_block:
         raise ValueError(f"Unclosed code block or admonition encountered for content: \n{cleaned_text}")
     cleaned_text += "\n"
-    cleaned_text = cleaned_text.replace("\n\n\n", "\n\n")
-    fragment += util.raw(md.render(cleaned_text))  # type: ignore
+    return cleaned_text.replace("\n\n\n", "\n\n")
+
+
+def render_markdown(text: str | None) -> str:
+    """Render a markdown text block to HTML."""
+    with profiler.stage("markdown"):
+        content_str = ""
+        if text:
+            content_str = text.strip()
+        cleaned_text = clean_markdown(content_str)
+        return markdown_cache.render(cleaned_text)
+
+
+def add_markdown(fragment: tags.section | tags.div, text: str | None) -> tags.section | tags.div:
+    """Add a markdown text block."""
+    fragment += util.raw(render_markdown(text))  # type: ignore
     return fragment
 
 
-def process_class(module_class: Class) -> tags.section | None:
+def process_class(module_class: Class, slug_registry: SlugRegistry | None = None) -> tags.section | None:
     """Process a python class."""
-    if not ast_class:
+    if not module_class:
         return None
-    logger.info(f"Processing class {ast_class.name}.")
+    logger.debug("Processing class %s.", module_class.name)
     # build class fragment
     class_fragment: tags.section = tags.section(cls="yap class")
-    class_fragment += generate_heading(
-        heading_level="h2", heading_name=module_class.name, heading_cls="yap class-title"
+    class_heading = generate_heading(
+        heading_level="h2", heading_name=module_class.name, heading_cls="yap class-title", slug_registry=slug_registry
     )
+    class_fragment += class_heading
+    search_collector.add("class", module_class, module_class.name, class_heading.values["slug"])
     # class docstring
     if module_class.docstring is not None:
         class_fragment = add_markdown(fragment=class_fragment, text=module_class.docstring.value)  # type: ignore
     # base classes
-    for base in module_class.bases:
+    if module_class.bases:
         with class_fragment:
-            base_item = tags.p(cls="yap class-base")
-            with base_item:
+            with tags.p(cls="yap class-base"):
                 for base in module_class.bases:
                     util.text("Inherits from")
-                    tags.a(base.brief, href=f"#{slugify(base.brief)}")  # type: ignore
+                    tags.a(base.brief, href=f"#{link_slug(base.brief, slug_registry)}")  # type: ignore
                     util.text(".")
     # process props
-    prop_names: list[str] = []
-    for prop in props:
-        if hasattr(prop, "name"):
-            prop_name: str = prop.name  # type: ignore
-        elif isinstance(prop, ast.AnnAssign):
-            prop_name = prop.target.id  # type: ignore
-        else:
-            raise NotImplementedError(f"Unable to extract property name from: {prop}")
-        if not prop_name.startswith("_"):  # type: ignore
-            prop_names.append(prop_name)  # type: ignore
-    if prop_names:
+    prop_keys = [prop_key for prop_key in module_class.attributes.keys() if not prop_key.startswith("_")]
+    if prop_keys:
         class_fragment = add_heading(doc_str_frag=class_fragment, heading="Properties")  # type: ignore
     for prop_key in prop_keys:
         prop_val = module_class.attributes[prop_key]
@@ -169,16 +305,9 @@ def process_class(module_class: Class) -> tags.section | None:
         prop_desc = ""
         if prop_val.docstring is not None:
             prop_desc = prop_val.docstring.value
-        with class_fragment:
-            tags.div(
-                tags.div(
-                    tags.div(prop_val.name, cls="yap class-prop-def-name"),
-                    tags.div(prop_type, cls="yap class-prop-def-type"),
-                    cls="yap class-prop-def",
-                ),
-                tags.div(prop_desc, cls="yap class-prop-def-desc"),
-                cls="yap class-prop-elem-container",
-            )
+        class_fragment += TemplateTag(
+            PROP_ROW_TEMPLATE, {"name": prop_val.name, "type": prop_type, "desc": prop_desc}  # type: ignore
+        )
     # process methods
     method_keys: list[str] = []
     for method_key in module_class.functions.keys():
@@ -187,7 +316,9 @@ def process_class(module_class: Class) -> tags.section | None:
     if method_keys:
         class_fragment = add_heading(doc_str_frag=class_fragment, heading="Methods")  # type: ignore
     for method_key in method_keys:
-        func_fragment = process_function(module_class.functions[method_key])
+        module_method = module_class.functions[method_key]
+        with profiler.stage("process_function", member=module_method.path):
+            func_fragment = process_function(module_method, slug_registry=slug_registry)
         class_fragment += func_fragment
 
     return class_fragment
@@ -224,8 +355,7 @@ def process_signature(module_function: Function) -> tags.div:
                 param_text += ", "
             else:
                 param_text += ")"
-            with sig_params_fragment:
-                tags.div(param_text, cls="yap func-sig-param")
+            sig_params_fragment += TemplateTag(SIG_PARAM_TEMPLATE, {"param": param_text})
         sig_fragment += sig_params_fragment
     return sig_fragment
 
@@ -237,158 +367,199 @@ def add_heading(doc_str_frag: tags.div | tags.section, heading: str) -> tags.div
     return doc_str_frag
 
 
-docstringContentType = DocstringParameter | DocstringReturn | DocstringRaise | DocstringYield
-
-
-def add_docstr_params(doc_str_frag: tags.div, param_set: docstringContentType) -> tags.div:
+def add_param_set(
+    doc_str_frag: tags.div, param_name: str | None, param_type: str | None, param_description: str | None
+) -> tags.div:
     """Add a parameter set."""
     if not param_name:
         param_name = ""
     if param_type is None:
         param_type = "None"
-    elem_desc_frag = tags.div(cls="yap doc-str-elem-desc")
-    elem_desc_frag = add_markdown(fragment=elem_desc_frag, text=param_set.description)
-    with doc_str_frag:
-        tags.div(
-            tags.div(
-                tags.div(param_name, cls="yap doc-str-elem-name"),
-                tags.div(param_anno, cls="yap doc-str-elem-type"),
-                cls="yap doc-str-elem-def",
-            ),
-            elem_desc_frag,
-            cls="yap doc-str-elem-container",
-        )
+    doc_str_frag += TemplateTag(
+        DOC_STR_ELEM_TEMPLATE,
+        {"name": param_name, "type": param_type, "desc": render_markdown(param_description)},
+    )
     return doc_str_frag
 
 
-def process_func_docstring(module_function: Function) -> tags.div:
+def format_annotation(node: ast.expr) -> str:
+    """Format an annotation's AST node, writing unions, including optional types, as types joined by "|"."""
+    if isinstance(node, ast.Subscript) and ast.unparse(node.value).rsplit(".", 1)[-1] in ["Union", "Optional"]:
+        elements = node.slice.elts if isinstance(node.slice, ast.Tuple) else [node.slice]
+        union_types = [format_annotation(element) for element in elements]
+        if ast.unparse(node.value).endswith("Optional"):
+            union_types.append("None")
+        return "|".join(union_types)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        return f"{format_annotation(node.left)}|{format_annotation(node.right)}"
+    return ast.unparse(node)
+
+
+def annotation_text(annotation: Any) -> str | None:
+    """Return the text of a griffe annotation, or None if not annotated."""
+    if annotation is None:
+        return None
+    try:
+        return format_annotation(ast.parse(str(annotation), mode="eval").body)
+    except SyntaxError:
+        return str(annotation)
+
+
+def docstring_key(module_function: Function) -> str:
+    """Hash the inputs for a function's docstring fragment: the docstring text, signature, and docstring style."""
+    doc_str = module_function.docstring.value if module_function.docstring is not None else None
+    params = [
+        [param.name, str(param.annotation), param.kind.value, param.default] for param in module_function.parameters
+    ]
+    return docstring_cache.key(doc_str, params, str(module_function.returns), DOCSTRING_STYLE, MD_CONFIG_KEY)
+
+
+def process_func_docstring(module_function: Function) -> dom_tag.dom_tag:
+    """
+    Process a docstring, reusing the fragment for an identical docstring and signature if already processed.
+
+    Cached fragments are pre-rendered per indentation depth, and their diagnostics are recorded again for each function.
+    """
+    key = docstring_key(module_function)
+    cached = docstring_cache.get(key)
+    if cached is None:
+        n_diagnostics = len(diagnostics.records)
+        doc_str_frag = build_func_docstring(module_function)
+        fragment_diagnostics = [(record.kind, record.details) for record in diagnostics.records[n_diagnostics:]]
+        # the built fragment is only read when rendered, so it is shared by the cached template
+        fragment_template = FragmentTemplate(lambda emitter, _values: emitter.dom(doc_str_frag), [])
+        docstring_cache.put(key, (fragment_template, fragment_diagnostics))
+        return TemplateTag(fragment_template, {})
+    fragment_template, fragment_diagnostics = cached
+    for kind, details in fragment_diagnostics:
+        diagnostics.add(kind, module_function, **details)
+    return TemplateTag(fragment_template, {})
+
+
+def build_func_docstring(module_function: Function) -> tags.div:
     """Process a docstring."""
     doc_str_frag: tags.div = tags.div(cls="yap")
-    if doc_str is not None:
-        parsed_doc_str = docstring_parser.parse(doc_str)
-        if parsed_doc_str.short_description is not None:
-            desc = parsed_doc_str.short_description
-            if parsed_doc_str.long_description is not None:
-                desc += f"\n{parsed_doc_str.long_description}"
-            doc_str_frag = add_markdown(fragment=doc_str_frag, text=desc)  # type: ignore
-        if (sig_param_names and not parsed_doc_str.params) or (len(sig_param_names) != len(parsed_doc_str.params)):
-            logger.warning(
-                f"""
-            Number of docstring params does not match number of signature params.
-            Please check that all function parameters have been declared in the docstring.
-            Signature paramaters: {sig_param_names}
-            Parsed doc-str params: {parsed_doc_str.params}
-            Doc string: {doc_str}
-            """
-            )
-        if not parsed_doc_str.params and len(parsed_doc_str.params):
-            doc_str_frag = add_heading(doc_str_frag=doc_str_frag, heading="Parameters")  # type: ignore
-            for param in parsed_doc_str.params:
-                param_name = param.arg_name
-                if "kwargs" in param_name:
-                    param_name = param_name.lstrip("**")
-                    param_name = f"**{param_name}"
-                try:
-                    param_idx = sig_param_names.index(param_name)
-                except ValueError as err:
-                    raise ValueError(
-                        f"Docstring param: {param_name} not found in function signature parameters."
-                    ) from err
-                sig_param_type = sig_param_types[param_idx]
-                if param.type_name is not None and param.type_name != sig_param_type:
-                    logger.warning(
-                        f"""
-                    Parameter types mismatch in docstring vs. AST for param {param_name}.
-                    This may be intentional:
-                    Type deduced per docstring: {param.type_name}
-                    Type deduced from AST param: {sig_param_type}
-                    """
-                    )
-                doc_str_frag = add_param_set(
-                    doc_str_frag=doc_str_frag,
-                    param_name=param_name,
-                    param_type=param.type_name,
-                    param_description=param.description,  # type: ignore
-                )
-        # track types parsed from return docstrings
-        return_types_in_docstring: list[str] = []
-        if not parsed_doc_str.many_returns and len(parsed_doc_str.many_returns):
-            doc_str_frag = add_heading(doc_str_frag=doc_str_frag, heading="Returns")  # type: ignore
-            for doc_str_return in parsed_doc_str.many_returns:
-                if doc_str_return.type_name in [None, "None"]:
-                    param_type = None
-                else:
-                    param_type = doc_str_return.type_name
-                    return_types_in_docstring.append(param_type)  # type: ignore
-                # if there is a single return and if the return types are not specified,
-                # then infer return types from the signature if available
-                if len(parsed_doc_str.many_returns) == 1 and not return_types_in_docstring:
-                    param_type = sig_return_type
-                # add fragment
-                doc_str_frag = add_param_set(
-                    doc_str_frag=doc_str_frag,
-                    param_name=doc_str_return.return_name,  # type: ignore
-                    param_type=param_type,  # type: ignore
-                    param_description=doc_str_return.description,  # type: ignore
+    if module_function.docstring is None:
+        return doc_str_frag
+    sig_param_types = {
+        param.name: annotation_text(param.annotation) for param in module_function.parameters if param.name != "self"
+    }
+    sig_param_names = list(sig_param_types)
+    sig_return_type = annotation_text(module_function.returns)
+    # sort the parsed sections, where text following the description and any other sections are added as notes
+    description: str | None = None
+    params: list[Any] = []
+    returns: list[Any] = []
+    raises: list[Any] = []
+    metas: list[str] = []
+    for idx, section in enumerate(parse_docstring(module_function.docstring, Parser(DOCSTRING_STYLE))):
+        if section.kind is DocstringSectionKind.text:
+            if idx == 0:
+                description = section.value
+            else:
+                metas.append(section.value)
+        elif section.kind in (DocstringSectionKind.parameters, DocstringSectionKind.other_parameters):
+            params.extend(section.value)
+        elif section.kind in (DocstringSectionKind.returns, DocstringSectionKind.yields):
+            returns.extend(section.value)
+        elif section.kind is DocstringSectionKind.raises:
+            raises.extend(section.value)
+        elif section.kind is DocstringSectionKind.examples:
+            metas.extend(text for _kind, text in section.value)
+        else:
+            elements = section.value if isinstance(section.value, list) else [section.value]
+            metas.extend(element.description for element in elements)
+    if description is not None:
+        doc_str_frag = add_markdown(fragment=doc_str_frag, text=description)  # type: ignore
+    if len(sig_param_names) != len(params):
+        diagnostics.add(
+            "param_count",
+            module_function,
+            signature=sig_param_names,
+            docstring=[param.name for param in params],
+        )
+    if params:
+        doc_str_frag = add_heading(doc_str_frag=doc_str_frag, heading="Parameters")  # type: ignore
+        for param in params:
+            # variadic params are documented with or without their asterisks
+            param_name = param.name.lstrip("*")
+            if param_name not in sig_param_types:
+                raise ValueError(f"Docstring param: {param_name} not found in function signature parameters.")
+            sig_param_type = sig_param_types[param_name]
+            # griffe fills in missing docstring types from the signature
+            doc_param_type = annotation_text(param.annotation)
+            if doc_param_type is not None and sig_param_type is not None and doc_param_type != sig_param_type:
+                diagnostics.add(
+                    "param_type",
+                    module_function,
+                    param=param_name,
+                    docstring=doc_param_type,
+                    signature=sig_param_type,
                 )
-        # compare return types extracted from docstring to those in function return type
-        n_return_types_in_sig = 0
-        if sig_return_type:
-            trimmed = sig_return_type.lstrip("tuple[").rstrip("]")
-            n_return_types_in_sig = len(trimmed.split(","))
-        # if types were provided in both the signature and the docstring, check whether these match
-        if (return_types_in_docstring or n_return_types_in_sig) and len(
-            return_types_in_docstring
-        ) != n_return_types_in_sig:
-            logger.warning(
-                f"""
-            Possible return type mismatch in docstring vs. function signature.
-            This may be intentional:
-            Type deduced per signature: {sig_return_type}
-            Type deduced from doc-str: {return_types_in_docstring}
-            """
+            doc_str_frag = add_param_set(
+                doc_str_frag=doc_str_frag,
+                param_name=param.name,
+                param_type=sig_param_type if sig_param_type is not None else doc_param_type,
+                param_description=param.description,
             )
-        if len(parsed_doc_str.raises):
-            doc_str_frag = add_heading(doc_str_frag=doc_str_frag, heading="Raises")  # type: ignore
-            for raises in parsed_doc_str.raises:
-                doc_str_frag = add_param_set(
-                    doc_str_frag=doc_str_frag,
-                    param_name="",
-                    param_type=[raises.type_name],  # type: ignore
-                    param_description=raises.description,  # type: ignore
-                )
-        if parsed_doc_str.deprecation is not None:
-            raise NotImplementedError("Deprecation not implemented.")
-        metas: list[docstring_parser.common.DocstringMeta] = []
-        for met in parsed_doc_str.meta:
-            if not isinstance(
-                met,
-                (
-                    docstring_parser.common.DocstringParam,
-                    docstring_parser.common.DocstringDeprecated,
-                    docstring_parser.common.DocstringRaises,
-                    docstring_parser.common.DocstringReturns,
-                ),
-            ):
-                metas.append(met)
-        if metas:
-            metas_frag = tags.div(cls="yap doc-str-meta")
-            metas_frag = add_heading(doc_str_frag=metas_frag, heading="Notes")
-            for meta in metas:
-                metas_frag = add_markdown(fragment=metas_frag, text=meta.description)  # type: ignore
-            doc_str_frag += metas_frag
+    # track types parsed from return docstrings
+    return_types_in_docstring: list[str] = []
+    if returns:
+        doc_str_frag = add_heading(doc_str_frag=doc_str_frag, heading="Returns")  # type: ignore
+        for doc_str_return in returns:
+            param_type = annotation_text(doc_str_return.annotation)
+            if param_type == "None":
+                param_type = None
+            if param_type is not None:
+                return_types_in_docstring.append(param_type)
+            # if there is a single return and if the return types are not specified,
+            # then infer return types from the signature if available
+            if len(returns) == 1 and not return_types_in_docstring:
+                param_type = sig_return_type
+            doc_str_frag = add_param_set(
+                doc_str_frag=doc_str_frag,
+                param_name=doc_str_return.name,
+                param_type=param_type,
+                param_description=doc_str_return.description,
+            )
+    # compare return types extracted from docstring to those in function return type
+    n_return_types_in_sig = 0
+    if sig_return_type:
+        trimmed = sig_return_type
+        if trimmed.startswith("tuple[") and trimmed.endswith("]"):
+            trimmed = trimmed[len("tuple[") : -1]
+        n_return_types_in_sig = len(trimmed.split(","))
+    # if types were provided in both the signature and the docstring, check whether these match
+    if (return_types_in_docstring or n_return_types_in_sig) and len(return_types_in_docstring) != n_return_types_in_sig:
+        diagnostics.add("return_type", module_function, signature=sig_return_type, docstring=return_types_in_docstring)
+    if raises:
+        doc_str_frag = add_heading(doc_str_frag=doc_str_frag, heading="Raises")  # type: ignore
+        for raise_elem in raises:
+            doc_str_frag = add_param_set(
+                doc_str_frag=doc_str_frag,
+                param_name="",
+                param_type=annotation_text(raise_elem.annotation),
+                param_description=raise_elem.description,
+            )
+    if metas:
+        metas_frag = tags.div(cls="yap doc-str-meta")
+        metas_frag = add_heading(doc_str_frag=metas_frag, heading="Notes")
+        for meta in metas:
+            metas_frag = add_markdown(fragment=metas_frag, text=meta)  # type: ignore
+        doc_str_frag += metas_frag
 
     return doc_str_frag
 
 
 def process_function(
     module_function: Function,
+    slug_registry: SlugRegistry | None = None,
 ) -> tags.section | None:
     """Process a function."""
     # don't process private members
     if module_function.name.startswith("_") and not module_function.name == "__init__":
         return None
-    logger.info(f"Processing function: {module_function.name}")
+    logger.debug("Processing function: %s", module_function.name)
     func_fragment: tags.section = tags.section(cls="yap func")
     is_method = False
     if isinstance(module_function.parent, Class):
@@ -399,7 +570,11 @@ def process_function(
         heading_name = f"{module_function.parent.name}.{module_function.name}"  # type: ignore
     else:
         heading_name = module_function.name
-    func_fragment += generate_heading(heading_level="h2", heading_name=heading_name, heading_cls="yap func-title")
+    func_heading = generate_heading(
+        heading_level="h2", heading_name=heading_name, heading_cls="yap func-title", slug_registry=slug_registry
+    )
+    func_fragment += func_heading
+    search_collector.add("function", module_function, heading_name, func_heading.values["slug"])
     # process signature
     with func_fragment:
         tags.div(cls="yap func-sig-content").appendChild(process_signature(module_function))  # type: ignore
@@ -409,14 +584,215 @@ def process_function(
     return func_fragment
 
 
-def parse(module_content: Module, yapper_config: YapperConfig) -> str:
-    """Parse a python module."""
-    logger.info(f"Parsing module: {module_content.canonical_path}")
+def emit_heading(
+    emitter: HtmlEmitter,
+    heading_level: str,
+    heading_name: str,
+    heading_cls: str,
+    slug_registry: SlugRegistry | None = None,
+) -> str:
+    """Emit a heading of specified level with a link anchor, returning the anchor."""
+    if heading_level not in HEADING_TEMPLATES:
+        raise NotImplementedError(f"Heading level {heading_level} is not implemented for linking.")
+    slug = heading_slug(heading_name, slug_registry)
+    emitter.template(HEADING_TEMPLATES[heading_level], {"slug": slug, "name": heading_name, "cls": heading_cls})
+    return slug
+
+
+def emit_class(emitter: HtmlEmitter, module_class: Class, slug_registry: SlugRegistry | None = None) -> None:
+    """Emit a python class."""
+    if not module_class:
+        return
+    logger.debug("Processing class %s.", module_class.name)
+    emitter.open("section", {"class": "yap class"})
+    slug = emit_heading(
+        emitter,
+        heading_level="h2",
+        heading_name=module_class.name,
+        heading_cls="yap class-title",
+        slug_registry=slug_registry,
+    )
+    search_collector.add("class", module_class, module_class.name, slug)
+    # class docstring
+    if module_class.docstring is not None:
+        emitter.raw(render_markdown(module_class.docstring.value))
+    # base classes
+    if module_class.bases:
+        emitter.open("p", {"class": "yap class-base"})
+        for base in module_class.bases:
+            emitter.text("Inherits from")
+            emitter.element("a", base.brief, {"href": f"#{link_slug(base.brief, slug_registry)}"})  # type: ignore
+            emitter.text(".")
+        emitter.close()
+    # process props
+    prop_keys = [prop_key for prop_key in module_class.attributes.keys() if not prop_key.startswith("_")]
+    if prop_keys:
+        emitter.element("h3", "Properties", {"class": "yap"})
+    for prop_key in prop_keys:
+        prop_val = module_class.attributes[prop_key]
+        prop_type = ""
+        if prop_val.annotation is not None and hasattr(prop_val.annotation, "full"):
+            prop_type = prop_val.annotation.full  # type: ignore
+        prop_desc = ""
+        if prop_val.docstring is not None:
+            prop_desc = prop_val.docstring.value
+        emitter.template(PROP_ROW_TEMPLATE, {"name": prop_val.name, "type": prop_type, "desc": prop_desc})  # type: ignore
+    # process methods
+    method_keys: list[str] = []
+    for method_key in module_class.functions.keys():
+        if not method_key.startswith("_") or method_key == "__init__":
+            method_keys.append(method_key)
+    if method_keys:
+        emitter.element("h3", "Methods", {"class": "yap"})
+    for method_key in method_keys:
+        module_method = module_class.functions[method_key]
+        with profiler.stage("process_function", member=module_method.path):
+            emit_function(emitter, module_method, slug_registry=slug_registry)
+    emitter.close()
+
+
+def emit_signature(emitter: HtmlEmitter, module_function: Function) -> None:
+    """Emit a function signature."""
+    emitter.open("div", {"class": "yap func-sig"})
+    # use parent class if __init__ method
+    if module_function.name == "__init__":
+        func_name = module_function.parent.name  # type: ignore
+    else:
+        func_name = module_function.name
+    n_params = 0
+    for param in module_function.parameters:
+        if param.name != "self":
+            n_params += 1
+    if n_params == 0:
+        emitter.element("span", f"{func_name}()")
+    else:
+        emitter.element("span", f"{func_name}(")
+        # nest sig params for CSS alignment
+        emitter.open("div", {"class": "yap func-sig-params"})
+        for idx, (param) in enumerate(module_function.parameters):
+            if param.name == "self":
+                continue
+            param_text = f"{param.name}"
+            if param.default is not None:
+                param_text += f"={param.default}"
+            if idx < len(module_function.parameters) - 1:
+                param_text += ", "
+            else:
+                param_text += ")"
+            emitter.template(SIG_PARAM_TEMPLATE, {"param": param_text})
+        emitter.close()
+    emitter.close()
+
+
+def emit_function(emitter: HtmlEmitter, module_function: Function, slug_registry: SlugRegistry | None = None) -> None:
+    """Emit a function."""
+    # don't process private members
+    if module_function.name.startswith("_") and not module_function.name == "__init__":
+        return
+    logger.debug("Processing function: %s", module_function.name)
+    emitter.open("section", {"class": "yap func"})
+    is_method = False
+    if isinstance(module_function.parent, Class):
+        is_method = True
+    if is_method and module_function.name == "__init__":
+        heading_name = f"{module_function.parent.name}.__init__"  # type: ignore
+    elif is_method:
+        heading_name = f"{module_function.parent.name}.{module_function.name}"  # type: ignore
+    else:
+        heading_name = module_function.name
+    slug = emit_heading(
+        emitter,
+        heading_level="h2",
+        heading_name=heading_name,
+        heading_cls="yap func-title",
+        slug_registry=slug_registry,
+    )
+    search_collector.add("function", module_function, heading_name, slug)
+    # process signature
+    emitter.open("div", {"class": "yap func-sig-content"})
+    emit_signature(emitter, module_function)
+    emitter.close()
+    # process docstring
+    # function docstrings are still built as small per-function fragments and then emitted
+    emitter.dom(process_func_docstring(module_function))
+    emitter.close()
+
+
+def iter_module(module_content: Module, render_backend: str = "stream", compact: bool = False) -> Iterator[str]:
+    """
+    Render a python module in chunks, yielding the markup for each top-level member once it is rendered.
+
+    With the "dom" backend, a DOM tree is built per top-level member instead of for the whole module. In compact mode,
+    the markup is unindented and the headings share a single link icon symbol.
+    """
+    slug_registry = SlugRegistry()
+    emitter = HtmlEmitter(compact=compact)
+    emitter.open("div", {"class": "yap module"})
+    if compact:
+        emitter.template(LINK_ICON_SYMBOL_TEMPLATE, {})
+    emit_module_header(emitter, module_content, slug_registry)
+    yield emitter.flush()
+    # iterate the module's members
+    for member in module_content.members.values():
+        if emit_member(emitter, member, render_backend, slug_registry):
+            yield emitter.flush()
+    emitter.close()
+    yield emitter.flush()
+
+
+def emit_module_header(emitter: HtmlEmitter, module_content: Module, slug_registry: SlugRegistry) -> None:
+    """Emit a python module's heading and docstring."""
+    slug = emit_heading(
+        emitter,
+        heading_level="h1",
+        heading_name=module_content.canonical_path,
+        heading_cls="yap module-title",
+        slug_registry=slug_registry,
+    )
+    search_collector.add("module", module_content, module_content.canonical_path, slug)
+    # module docstring
+    if module_content.docstring is not None:
+        emitter.raw(render_markdown(module_content.docstring.value))
+
+
+def emit_member(emitter: HtmlEmitter, member: Object | Alias, render_backend: str, slug_registry: SlugRegistry) -> bool:
+    """Emit a module's top-level function or class, returning whether the member is documented."""
+    # process functions
+    if isinstance(member, Function):
+        if member.name.startswith("_"):
+            return False
+        with profiler.stage("process_function", member=member.path):
+            if render_backend == "stream":
+                emit_function(emitter, member, slug_registry=slug_registry)
+            else:
+                emitter.dom(process_function(member, slug_registry=slug_registry))
+        return True
+    # process classes and nested methods
+    if isinstance(member, Class):
+        with profiler.stage("process_class", member=member.path):
+            if render_backend == "stream":
+                emit_class(emitter, member, slug_registry=slug_registry)
+            else:
+                emitter.dom(process_class(member, slug_registry=slug_registry))
+        return True
+    return False
+
+
+def render_module_dom(module_content: Module, compact: bool = False) -> str:
+    """Render a python module by building a DOM tree, optionally as compact markup."""
+    slug_registry = SlugRegistry()
     # start the DOM fragment
     dom_fragment: tags.div = tags.div(cls="yap module")
-    dom_fragment += generate_heading(
-        heading_level="h1", heading_name=module_content.canonical_path, heading_cls="yap module-title"
+    if compact:
+        dom_fragment += TemplateTag(LINK_ICON_SYMBOL_TEMPLATE, {})
+    module_heading = generate_heading(
+        heading_level="h1",
+        heading_name=module_content.canonical_path,
+        heading_cls="yap module-title",
+        slug_registry=slug_registry,
     )
+    dom_fragment += module_heading
+    search_collector.add("module", module_content, module_content.canonical_path, module_heading.values["slug"])
     # module docstring
     if module_content.docstring is not None:
         dom_fragment = add_markdown(fragment=dom_fragment, text=module_content.docstring.value)  # type: ignore
@@ -426,18 +802,195 @@ def parse(module_content: Module, yapper_config: YapperConfig) -> str:
         if isinstance(member, Function):
             if member.name.startswith("_"):
                 continue
-            dom_fragment += process_function(member)
+            with profiler.stage("process_function", member=member.path):
+                dom_fragment += process_function(member, slug_registry=slug_registry)
         # process classes and nested methods
         elif isinstance(member, Class):
-            dom_fragment += process_class(member)
-    astro: str = ""
-    if not yapper_config["intro_template"]:
-        for line in yapper_config["intro_template"].split("\n"):
-            astro += f"{line.strip()}\n"
-    astro += dom_fragment.render().strip()  # type: ignore
-    if not yapper_config["outro_template"]:
-        astro += "\n"
-        for line in yapper_config["outro_template"].split("\n"):
-            astro += f"{line.strip()}\n"
-
-    return astro
+            with profiler.stage("process_class", member=member.path):
+                dom_fragment += process_class(member, slug_registry=slug_registry)
+    return dom_fragment.render(pretty=not compact)  # type: ignore
+
+
+def render_module_stream(module_content: Module, compact: bool = False) -> str:
+    """Render a python module by writing markup directly to a buffer, optionally as compact markup."""
+    return "".join(iter_module(module_content, "stream", compact))
+
+
+def format_template(template: str) -> str:
+    """Strip each line of an intro or outro template."""
+    return "".join(f"{line.strip()}\n" for line in template.split("\n"))
+
+
+def format_intro(yapper_config: YapperConfig) -> str:
+    """Prepare the content preceding the rendered module."""
+    if yapper_config["intro_template"]:
+        return format_template(yapper_config["intro_template"])
+    return ""
+
+
+def format_outro(yapper_config: YapperConfig) -> str:
+    """Prepare the content following the rendered module."""
+    if yapper_config["outro_template"]:
+        return "\n" + format_template(yapper_config["outro_template"])
+    return ""
+
+
+def parse(module_content: Module, yapper_config: YapperConfig) -> str:
+    """Parse a python module."""
+    logger.info(f"Parsing module: {module_content.canonical_path}")
+    diagnostics.module = module_content.canonical_path
+    search_collector.module = module_content.canonical_path
+    if yapper_config["render_backend"] == "stream":
+        rendered = render_module_stream(module_content, yapper_config["compact_output"])
+    else:
+        rendered = render_module_dom(module_content, yapper_config["compact_output"])
+
+    return format_intro(yapper_config) + rendered.strip() + format_outro(yapper_config)
+
+
+def iter_parse(module_content: Module, yapper_config: YapperConfig) -> Iterator[str]:
+    """
+    Parse a python module, yielding the intro, the markup for each top-level member, and the outro as produced.
+
+    The joined chunks are identical to the output of `parse`, while only one top-level member is held in memory.
+    """
+    logger.info(f"Parsing module: {module_content.canonical_path}")
+    diagnostics.module = module_content.canonical_path
+    search_collector.module = module_content.canonical_path
+    yield format_intro(yapper_config)
+    yield from iter_module(module_content, yapper_config["render_backend"], yapper_config["compact_output"])
+    yield format_outro(yapper_config)
+
+
+def shard_path(astro_key: str, shard_name: str) -> str:
+    """Return the astro path for a shard page, within a directory named after the module's index page."""
+    stem, suffix = os.path.splitext(astro_key)
+    return f"{stem}/{shard_name}{suffix}"
+
+
+def plan_shards(members: list[tuple[Object | Alias, str, str]], yapper_config: YapperConfig) -> list[list[int]]:
+    """
+    Group the rendered members of a module, as (member, anchor, markup) tuples, into shards per the "shard_by" policy.
+
+    Returns the member indices for each shard. With the "class" policy, each class has its own shard while functions
+    remain on the index page. No shards are returned if the module doesn't exceed the policy's limit.
+    """
+    shard_by = yapper_config["shard_by"]
+    if shard_by == "class":
+        return [[idx] for idx, (member, _anchor, _markup) in enumerate(members) if isinstance(member, Class)]
+    if shard_by == "members":
+        max_members = yapper_config["shard_max_members"]
+        if len(members) <= max_members:
+            return []
+        return [
+            list(range(start, min(start + max_members, len(members)))) for start in range(0, len(members), max_members)
+        ]
+    max_bytes = yapper_config["shard_max_kb"] * 1024
+    sizes = [len(markup.encode("utf-8")) for _member, _anchor, markup in members]
+    if sum(sizes) <= max_bytes:
+        return []
+    shards: list[list[int]] = [[]]
+    shard_size = 0
+    for idx, size in enumerate(sizes):
+        # members larger than the limit are given a shard of their own
+        if shards[-1] and shard_size + size > max_bytes:
+            shards.append([])
+            shard_size = 0
+        shards[-1].append(idx)
+        shard_size += size
+    return shards
+
+
+def link_across_pages(markup: str, page_key: str, anchor_pages: dict[str, str]) -> str:
+    """Rewrite links to anchors on other pages of a sharded module to point to those pages."""
+
+    def rewrite(match: re.Match) -> str:
+        anchor_page = anchor_pages.get(match.group(1), page_key)
+        if anchor_page == page_key:
+            return match.group(0)
+        return f'href="{page_url(anchor_page)}#{match.group(1)}"'
+
+    return HREF_PATTERN.sub(rewrite, markup)
+
+
+def assemble_page(chunks: list[str], yapper_config: YapperConfig) -> str:
+    """Wrap the markup for a page's blocks, rendered within the module's container, as a complete astro page."""
+    emitter = HtmlEmitter(compact=yapper_config["compact_output"])
+    emitter.open("div", {"class": "yap module"})
+    if emitter.compact:
+        emitter.template(LINK_ICON_SYMBOL_TEMPLATE, {})
+    for chunk in chunks:
+        emitter.blocks(chunk)
+    emitter.close()
+    return format_intro(yapper_config) + emitter.getvalue().strip() + format_outro(yapper_config)
+
+
+def parse_pages(module_content: Module, yapper_config: YapperConfig, astro_key: str) -> dict[str, str]:
+    """
+    Parse a python module to an index page and shard pages, per the config's "shard_by" policy.
+
+    Returns the astro content keyed by the astro path of each page, starting with the module's index page. The index
+    page contains the module's heading and docstring and a list of the module's members, linking to their pages.
+    Anchors are unique across the module's pages, and links to anchors on other pages are rewritten to point to those
+    pages. Modules which don't exceed the policy's limit are rendered to a single page, per `parse`.
+    """
+    logger.info(f"Parsing module: {module_content.canonical_path}")
+    diagnostics.module = module_content.canonical_path
+    search_collector.module = module_content.canonical_path
+    slug_registry = SlugRegistry()
+    # blocks are rendered at the depth of the module's container
+    emitter = HtmlEmitter(compact=yapper_config["compact_output"])
+    emitter.stack = [["div", False]]
+    emit_module_header(emitter, module_content, slug_registry)
+    header = emitter.flush()
+    # each member's anchors start with its heading's anchor
+    members: list[tuple[Object | Alias, str, str]] = []
+    anchor_starts: list[int] = []
+    for member in module_content.members.values():
+        n_anchors = len(slug_registry.anchors)
+        if emit_member(emitter, member, yapper_config["render_backend"], slug_registry):
+            members.append((member, list(slug_registry.anchors)[n_anchors], emitter.flush()))
+            anchor_starts.append(n_anchors)
+    shards = plan_shards(members, yapper_config)
+    if not shards:
+        return {astro_key: assemble_page([header] + [markup for _member, _anchor, markup in members], yapper_config)}
+    # assign each member to a page, where members which aren't in a shard remain on the index page
+    member_pages = [astro_key] * len(members)
+    for shard_idx, shard in enumerate(shards):
+        if yapper_config["shard_by"] == "class":
+            shard_name = members[shard[0]][1]
+        else:
+            shard_name = str(shard_idx + 1)
+        for member_idx in shard:
+            member_pages[member_idx] = shard_path(astro_key, shard_name)
+    # map each anchor to its page
+    anchors = list(slug_registry.anchors)
+    anchor_pages = {anchor: astro_key for anchor in anchors}
+    for member_idx, start in enumerate(anchor_starts):
+        end = anchor_starts[member_idx + 1] if member_idx + 1 < len(anchor_starts) else len(anchors)
+        for anchor in anchors[start:end]:
+            anchor_pages[anchor] = member_pages[member_idx]
+    # the index page lists the module's members
+    emitter.open("ul", {"class": "yap module-contents"})
+    for member, anchor, _markup in members:
+        emitter.open("li")
+        emitter.element("a", member.name, {"href": f"#{anchor}"})
+        emitter.close()
+    emitter.close()
+    page_chunks: dict[str, list[str]] = {astro_key: [header, emitter.flush()]}
+    for (_member, _anchor, markup), page_key in zip(members, member_pages):
+        if page_key not in page_chunks:
+            # shard pages link back to the module's heading on the index page
+            emitter.open("p", {"class": "yap module-shard"})
+            emitter.text("From")
+            emitter.element("a", module_content.canonical_path, {"href": f"#{anchors[0]}"})
+            emitter.text(".")
+            emitter.close()
+            page_chunks[page_key] = [emitter.flush()]
+        page_chunks[page_key].append(markup)
+    search_collector.assign_pages(module_content.canonical_path, astro_key, anchor_pages)
+    pages: dict[str, str] = {}
+    for page_key, chunks in page_chunks.items():
+        chunks = [link_across_pages(chunk, page_key, anchor_pages) for chunk in chunks]
+        pages[page_key] = assemble_page(chunks, yapper_config)
+    return pages
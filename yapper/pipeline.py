@@ -0,0 +1,134 @@
+"""
+Bounded background stages, e.g. so that modules are loaded, and pages written, off the rendering thread.
+
+Each stage runs on a background thread and exchanges items with the rendering thread through a queue of limited size,
+which bounds the number of loaded modules or rendered pages held in memory ahead of the slower stage.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from types import TracebackType
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+# seconds between checks of whether a blocked producer should stop
+STOP_POLL_INTERVAL = 0.1
+# marks the end of a queue's items
+_DONE = object()
+
+
+def prefetch(items: Iterable[T], max_size: int) -> Iterator[T]:
+    """
+    Iterate items on a background thread, yielding them in order while buffering at most `max_size` ahead.
+
+    Errors raised while producing the items are raised when the consumer reaches them. If the consumer stops early,
+    the producer stops once it finishes its current item.
+    """
+    buffer: queue.Queue[tuple[Any, BaseException | None]] = queue.Queue(maxsize=max_size)
+    stop = threading.Event()
+
+    def put(entry: tuple[Any, BaseException | None]) -> bool:
+        """Add an entry to the buffer, waiting while it is full, returning whether it was added before stopping."""
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=STOP_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        """Buffer the items, followed by the end marker and any error."""
+        error = None
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except BaseException as err:  # pylint: disable=broad-except
+            error = err
+        put((_DONE, error))
+
+    thread = threading.Thread(target=produce, name="yapper-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+class Consumer:
+    """
+    Consumes items on a background thread, e.g. writing pages while the next pages are rendered.
+
+    Adding an item waits while `max_size` items are already waiting to be consumed. With a `max_size` of 0, items are
+    consumed immediately on the calling thread instead. Once consuming an item fails, the remaining items are skipped
+    and the error is raised on the calling thread when adding the next item or when closing.
+    """
+
+    def __init__(self, consume: Callable[[T], None], max_size: int, name: str = "yapper-consumer"):
+        """Start consuming items on a background thread, unless `max_size` is 0."""
+        self.consume = consume
+        self.error: BaseException | None = None
+        self.buffer: queue.Queue[Any] | None = None
+        self.thread: threading.Thread | None = None
+        if max_size > 0:
+            self.buffer = queue.Queue(maxsize=max_size)
+            self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+            self.thread.start()
+
+    def _run(self) -> None:
+        """Consume the queued items until the end marker."""
+        while True:
+            item = self.buffer.get()  # type: ignore
+            if item is _DONE:
+                return
+            if self.error is None:
+                try:
+                    self.consume(item)
+                except BaseException as err:  # pylint: disable=broad-except
+                    self.error = err
+
+    def put(self, item: T) -> None:
+        """Add an item to be consumed."""
+        if self.error is not None:
+            raise self.error
+        if self.buffer is None:
+            self.consume(item)
+        else:
+            self.buffer.put(item)
+
+    def close(self) -> None:
+        """Wait for the queued items to be consumed, raising the error if consuming an item failed."""
+        if self.thread is not None:
+            self.buffer.put(_DONE)  # type: ignore
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self) -> Consumer:
+        """Return the consumer, which is closed on exiting the context."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the consumer, or if the caller raised an error, stop consuming without raising a consumer error."""
+        # an error raised by the caller takes precedence over an error consuming the items
+        if exc_type is None:
+            self.close()
+        elif self.thread is not None:
+            self.buffer.put(_DONE)  # type: ignore
+            self.thread.join()
+            self.thread = None
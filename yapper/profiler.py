@@ -0,0 +1,144 @@
+"""
+Optional per-stage profiling of wall time and allocated memory.
+
+Stages are only timed and traced while profiling is enabled. Otherwise, entering a stage returns a shared no-op context.
+"""
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, ContextManager, Iterator
+
+# number of entries per table in the human-readable summary
+PROFILE_TOP_N = 10
+_NULL_STAGE = nullcontext()
+
+
+class Profiler:
+    """
+    Records wall time and allocated memory per stage, attributed to module map entries and module members.
+
+    Stages can be nested, in which case each record's self time and self allocation exclude those of its nested stages.
+    Records without an explicit module are attributed to the module of the enclosing stage.
+    """
+
+    def __init__(self):
+        """Prepare a disabled profiler."""
+        self.enabled = False
+        self.records: list[dict[str, Any]] = []
+        # open stages, each as [module, nested wall time, nested allocation]
+        self.stack: list[list[Any]] = []
+        self.started_tracing = False
+
+    def start(self) -> None:
+        """Enable profiling and start tracing memory allocations."""
+        self.enabled = True
+        self.records = []
+        self.stack = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self) -> None:
+        """Disable profiling, keeping the records."""
+        self.enabled = False
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def stage(self, stage: str, module: str | None = None, member: str | None = None) -> ContextManager[Any]:
+        """Return a context recording a stage, or a no-op context if profiling is disabled."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._record(stage, module, member)
+
+    @contextmanager
+    def _record(self, stage: str, module: str | None, member: str | None) -> Iterator[None]:
+        """Record the wall time and net allocated memory of a stage."""
+        if module is None and self.stack:
+            module = self.stack[-1][0]
+        frame = [module, 0.0, 0]
+        self.stack.append(frame)
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            allocated = tracemalloc.get_traced_memory()[0] - start_memory
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1][1] += wall
+                self.stack[-1][2] += allocated
+            self.records.append(
+                {
+                    "stage": stage,
+                    "module": module,
+                    "member": member,
+                    "wall": wall,
+                    "self_wall": wall - frame[1],
+                    "allocated": allocated,
+                    "self_allocated": allocated - frame[2],
+                }
+            )
+
+    def add_records(self, records: list[dict[str, Any]]) -> None:
+        """Add records collected elsewhere, e.g. by worker processes."""
+        self.records.extend(records)
+
+    def report(self) -> dict[str, Any]:
+        """Aggregate the records per stage, per module, and per member."""
+        stages: dict[str, dict[str, Any]] = {}
+        modules: dict[str, dict[str, Any]] = {}
+        members: list[dict[str, Any]] = []
+        for record in self.records:
+            stage_totals = stages.setdefault(record["stage"], {"count": 0, "self_wall": 0.0, "self_allocated": 0})
+            stage_totals["count"] += 1
+            stage_totals["self_wall"] += record["self_wall"]
+            stage_totals["self_allocated"] += record["self_allocated"]
+            module_key = record["module"] if record["module"] is not None else "<none>"
+            module_totals = modules.setdefault(module_key, {"self_wall": 0.0, "self_allocated": 0})
+            module_totals["self_wall"] += record["self_wall"]
+            module_totals["self_allocated"] += record["self_allocated"]
+            if record["member"] is not None:
+                members.append(record)
+        return {
+            "stages": stages,
+            "modules": modules,
+            "members": sorted(members, key=lambda record: record["wall"], reverse=True),
+            "records": self.records,
+        }
+
+    def write_report(self, out_path: Path) -> None:
+        """Write the aggregated report as JSON."""
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_path, mode="w") as out_file:
+            json.dump(self.report(), out_file, indent=2)
+
+    def summary(self, top_n: int = PROFILE_TOP_N) -> str:
+        """Summarise the slowest stages, modules, and members."""
+        report = self.report()
+        lines = ["Profile summary (self times exclude nested stages):", "Stages:"]
+        stages = sorted(report["stages"].items(), key=lambda item: item[1]["self_wall"], reverse=True)
+        for stage, totals in stages[:top_n]:
+            lines.append(
+                f"  {stage:<18} {totals['self_wall']:>9.4f}s {totals['self_allocated'] / 1024:>10.1f} KiB "
+                f"x{totals['count']}"
+            )
+        lines.append("Modules:")
+        modules = sorted(report["modules"].items(), key=lambda item: item[1]["self_wall"], reverse=True)
+        for module, totals in modules[:top_n]:
+            lines.append(f"  {module:<40} {totals['self_wall']:>9.4f}s {totals['self_allocated'] / 1024:>10.1f} KiB")
+        lines.append("Members (including nested stages):")
+        for record in report["members"][:top_n]:
+            lines.append(
+                f"  {record['member']:<40} {record['wall']:>9.4f}s {record['allocated'] / 1024:>10.1f} KiB "
+                f"({record['stage']})"
+            )
+        return "\n".join(lines)
+
+
+profiler = Profiler()
@@ -0,0 +1,212 @@
+"""
+Prebuilt search index for the rendered pages.
+
+Modules, classes, and functions are collected as search documents while their pages are rendered, each pointing to its
+page and heading anchor. The documents are written to a compact JSON inverted index:
+
+- `pages`: the URL for each page, including the shard pages of sharded modules;
+- `docs`: a `[page, anchor, title, kind]` array for each document, where `page` indexes `pages`;
+- `tokens`: the sorted tokens, so that prefixes can be looked up with a binary search;
+- `postings`: for each token, the ascending document indices, delta encoded.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from bisect import bisect_left
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+ENTRIES_NAME = "search.json"
+# document kinds, abbreviated in the index
+KINDS = {"module": "m", "class": "c", "function": "f"}
+# tokens shorter than this are not indexed
+MIN_TOKEN_LENGTH = 2
+STOP_WORDS = frozenset(
+    "an and are as at be by for from if in into is it its of on or that the this to was were which with".split()
+)
+WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+# splits identifiers on underscores, case changes, and digits
+PART_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into unique lowercase tokens.
+
+    Identifiers are indexed whole as well as split into their parts, e.g. "SlugRegistry" is indexed as "slugregistry",
+    "slug", and "registry".
+    """
+    tokens: dict[str, None] = {}
+    for word in WORD_PATTERN.findall(text):
+        candidates = [word.strip("_").lower()]
+        candidates += [part.lower() for part in PART_PATTERN.findall(word)]
+        for token in candidates:
+            if len(token) >= MIN_TOKEN_LENGTH and token not in STOP_WORDS:
+                tokens[token] = None
+    return list(tokens)
+
+
+def page_url(astro_path: str) -> str:
+    """
+    Derive a page's URL from its astro file path, per Astro's file based routing.
+
+    Paths within a "pages" directory are routed relative to that directory, with "index" pages routed to their
+    directory. Other paths are used as is, without the file extension.
+    """
+    parts = [part for part in PurePosixPath(astro_path).with_suffix("").parts if part not in (".", "/")]
+    if "pages" in parts:
+        parts = parts[len(parts) - parts[::-1].index("pages") :]
+    if parts and parts[-1] == "index":
+        return "/" + "".join(f"{part}/" for part in parts[:-1])
+    return "/" + "/".join(parts)
+
+
+class SearchCollector:
+    """Collects search documents per module while modules are rendered."""
+
+    def __init__(self):
+        """Prepare a disabled collector."""
+        self.enabled = False
+        self.module: str | None = None
+        self.entries: dict[str, list[list[Any]]] = {}
+
+    def add(self, kind: str, member: Any, title: str, anchor: str) -> None:
+        """
+        Add a document for a griffe object's heading on the current module's page, if enabled.
+
+        The document's tokens are taken from the heading's title, the object's docstring, and its parameter names.
+        """
+        if not self.enabled or self.module is None:
+            return
+        text = title
+        if getattr(member, "docstring", None) is not None:
+            text += f" {member.docstring.value}"
+        for param in getattr(member, "parameters", []):
+            if param.name != "self":
+                text += f" {param.name}"
+        self.entries.setdefault(self.module, []).append([anchor, title, KINDS[kind], tokenize(text)])
+
+    def assign_pages(self, module_name: str, astro_key: str, anchor_pages: dict[str, str]) -> None:
+        """Record the astro page of each of a sharded module's documents which aren't on the module's index page."""
+        for doc in self.entries.get(module_name, []):
+            page_key = anchor_pages.get(doc[0], astro_key)
+            if page_key != astro_key:
+                doc.append(page_key)
+
+    def pop(self, module_name: str) -> list[list[Any]]:
+        """Remove and return the documents collected for a module."""
+        return self.entries.pop(module_name, [])
+
+    def clear(self) -> None:
+        """Remove all collected documents."""
+        self.entries = {}
+        self.module = None
+
+
+class SearchEntries:
+    """Persistent record of the search documents for each astro page, so that skipped pages remain searchable."""
+
+    def __init__(self, cache_dir: Path):
+        """Load the documents from the cache directory, if present."""
+        self.cache_dir = cache_dir
+        self.entries_path = cache_dir / ENTRIES_NAME
+        self.pages: dict[str, list[list[Any]]] = {}
+        if self.entries_path.exists():
+            try:
+                with open(self.entries_path) as entries_file:
+                    entries = json.load(entries_file)
+                if entries["version"] == INDEX_VERSION:
+                    self.pages = entries["pages"]
+            except (ValueError, KeyError):
+                logger.warning(f"Ignoring unreadable search entries at {self.entries_path}")
+
+    def record(self, astro_key: str, docs: list[list[Any]]) -> None:
+        """Record the documents for an astro page."""
+        self.pages[astro_key] = docs
+
+    def prune(self, astro_keys: list[str]) -> None:
+        """Drop pages which are no longer in the module map."""
+        keep = set(astro_keys)
+        self.pages = {k: v for k, v in self.pages.items() if k in keep}
+
+    def save(self) -> None:
+        """Atomically write the documents to the cache directory."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.entries_path.with_suffix(".tmp")
+        with open(temp_path, mode="w") as entries_file:
+            json.dump({"version": INDEX_VERSION, "pages": self.pages}, entries_file, separators=(",", ":"))
+        os.replace(temp_path, self.entries_path)
+
+
+def build_index(pages: dict[str, list[list[Any]]]) -> dict[str, Any]:
+    """
+    Build the compact inverted index from the documents for each astro page, in the order provided.
+
+    Documents on the shard pages of sharded modules are indexed with their shard page.
+    """
+    page_indices: dict[str, int] = {}
+    docs: list[list[Any]] = []
+    token_docs: dict[str, list[int]] = {}
+    for astro_key, page_docs in pages.items():
+        page_indices.setdefault(astro_key, len(page_indices))
+        for anchor, title, kind, tokens, *shard_key in page_docs:
+            page_key = shard_key[0] if shard_key else astro_key
+            for token in tokens:
+                token_docs.setdefault(token, []).append(len(docs))
+            docs.append([page_indices.setdefault(page_key, len(page_indices)), anchor, title, kind])
+    page_urls = [page_url(astro_key) for astro_key in page_indices]
+    tokens = sorted(token_docs)
+    postings = []
+    for token in tokens:
+        doc_ids = token_docs[token]
+        postings.append([doc_ids[0]] + [doc_id - prev_id for prev_id, doc_id in zip(doc_ids, doc_ids[1:])])
+    return {"version": INDEX_VERSION, "pages": page_urls, "docs": docs, "tokens": tokens, "postings": postings}
+
+
+def dumps_index(index: dict[str, Any]) -> str:
+    """Serialise an index as compact JSON."""
+    return json.dumps(index, separators=(",", ":"), ensure_ascii=False)
+
+
+def lookup(index: dict[str, Any], prefix: str) -> set[int]:
+    """Return the indices of the documents with a token starting with the prefix."""
+    tokens: list[str] = index["tokens"]
+    doc_ids: set[int] = set()
+    token_idx = bisect_left(tokens, prefix)
+    while token_idx < len(tokens) and tokens[token_idx].startswith(prefix):
+        doc_id = 0
+        for delta in index["postings"][token_idx]:
+            doc_id += delta
+            doc_ids.add(doc_id)
+        token_idx += 1
+    return doc_ids
+
+
+def search(index: dict[str, Any], query: str, limit: int = 20) -> list[dict[str, str]]:
+    """
+    Find the documents matching each of the query's tokens as a prefix, e.g. as a reference for client-side search.
+
+    Documents whose titles match more of the query's tokens are ranked first.
+    """
+    query_tokens = tokenize(query)
+    if not query_tokens:
+        return []
+    matches = set.intersection(*[lookup(index, token) for token in query_tokens])
+    results = []
+    for doc_id in matches:
+        page_idx, anchor, title, kind = index["docs"][doc_id]
+        title_tokens = tokenize(title)
+        title_matches = sum(any(t.startswith(token) for t in title_tokens) for token in query_tokens)
+        result = {"url": f"{index['pages'][page_idx]}#{anchor}", "title": title, "kind": kind}
+        results.append((-title_matches, doc_id, result))
+    results.sort(key=lambda result: result[:2])
+    return [result[2] for result in results[:limit]]
+
+
+search_collector = SearchCollector()
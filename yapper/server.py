@@ -0,0 +1,306 @@
+"""
+Long-lived build daemon which keeps the configuration, loaded modules, and render caches warm between rebuilds.
+
+Rebuild requests are accepted as JSON over HTTP, on a localhost port or on a Unix domain socket:
+
+- `POST /rebuild` with an optional body of `{"modules": [...], "paths": [...], "force": false}`;
+- `GET /status`;
+- `POST /shutdown`.
+
+Requests are handled one at a time.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from yapper import ModuleMap, YapperConfig, handler, watcher
+from yapper.client import DEFAULT_HOST, DEFAULT_PORT
+from yapper.diagnostics import diagnostics
+from yapper.output import OutputWriter
+
+if TYPE_CHECKING:
+    from griffe.loader import GriffeLoader
+
+logger = logging.getLogger(__name__)
+
+
+class BuildDaemon:
+    """Rebuilds module map entries on request, reusing the loaded modules and caches between rebuilds."""
+
+    def __init__(
+        self,
+        yapper_config: YapperConfig,
+        plan: handler.BuildPlan | None = None,
+        griffe_loader: GriffeLoader | None = None,
+    ):
+        """
+        Prepare the build plan and the caches, and load the modules.
+
+        The build plan and griffe loader of an initial build, per `handler.main`, are reused if provided, in which case
+        only the modules which weren't loaded by the initial build are loaded.
+        """
+        if plan is None:
+            plan = handler.BuildPlan(yapper_config)
+            plan.configure()
+        self.plan = plan
+        self.yapper_config = plan.yapper_config
+        self.griffe_loader = griffe_loader if griffe_loader is not None else handler.create_loader(self.yapper_config)
+        # modification times of the loaded source files, so that only changed files are re-visited
+        self.mtimes: dict[Path, int] = {}
+        watcher.track_files(self.mtimes, watcher.entry_sources(self.griffe_loader, self.yapper_config["module_map"]))
+        self.started = time.time()
+        self.rebuilds = 0
+
+    def select(
+        self, modules: list[str] | None, paths: list[str] | None, sources: dict[str, list[Path]]
+    ) -> tuple[list[ModuleMap], list[str]]:
+        """
+        Select the module map entries for module names or source paths, or all entries if neither are provided.
+
+        Source paths select the entries which depend on the path, given the source files of each entry per
+        `watcher.entry_sources`. Returns the selected entries and any module names or source paths which do not belong
+        to the module map.
+        """
+        module_map = self.yapper_config["module_map"]
+        if not modules and not paths:
+            return list(module_map), []
+        module_names = set(modules or [])
+        source_paths = {Path(path).resolve() for path in paths or []}
+        selected: list[ModuleMap] = []
+        known_paths: set[Path] = set()
+        for module_info in module_map:
+            entry_paths = {source_file.resolve() for source_file in sources.get(module_info["astro"], [])}
+            known_paths.update(entry_paths)
+            if module_info["module"] in module_names or entry_paths & source_paths:
+                selected.append(module_info)
+        known_modules = {module_info["module"] for module_info in module_map}
+        unknown = [name for name in sorted(module_names) if name not in known_modules]
+        unknown += [str(path) for path in sorted(source_paths) if path not in known_paths]
+        return selected, unknown
+
+    def rebuild(
+        self, modules: list[str] | None = None, paths: list[str] | None = None, force: bool = False
+    ) -> dict[str, Any]:
+        """
+        Rebuild the selected entries whose inputs have changed since they were last built, or all if `force` is set.
+
+        Source files which changed since they were loaded, or which are requested by path, are re-visited per
+        `watcher.reload_files` while the remainder of the loaded modules are reused. Returns the astro files which were
+        written, unchanged, or skipped, together with any errors.
+        """
+        start = time.perf_counter()
+        module_map = self.yapper_config["module_map"]
+        changed_files = watcher.poll_files(self.mtimes)
+        requested_paths = {Path(path).resolve() for path in paths or []}
+        changed_files += [
+            source_file
+            for source_file in self.mtimes
+            if source_file.resolve() in requested_paths and source_file not in changed_files
+        ]
+        errors: list[dict[str, Any]] = []
+        if changed_files:
+            try:
+                watcher.reload_files(self.griffe_loader, changed_files)
+            except Exception as err:  # pylint: disable=broad-except
+                logger.error(f"Failed to reload {len(changed_files)} changed source files: {err}")
+                errors.append({"paths": [str(source_file) for source_file in changed_files], "error": str(err)})
+        sources = watcher.entry_sources(self.griffe_loader, module_map)
+        watcher.track_files(self.mtimes, sources)
+        selected, unknown = self.select(modules, paths, sources)
+        result: dict[str, Any] = {"written": [], "unchanged": [], "skipped": [], "errors": errors, "unknown": unknown}
+        output_writer = OutputWriter()
+        diagnostics.clear()
+        file_digests: dict[Path, str] = {}
+        for module_info in selected:
+            entry_files = sources[module_info["astro"]]
+            digest = self.plan.digest(module_info, entry_files, file_digests)
+            out_path = Path(self.plan.package_path / module_info["astro"])
+            if not force and self.plan.manifest.is_current(module_info["astro"], digest, out_path):
+                result["skipped"].append(module_info["astro"])
+                continue
+            try:
+                module_content = handler.load_module(self.griffe_loader, module_info["module"])
+                astro = handler.parse_entry(module_content, module_info, self.yapper_config)
+                written = self.plan.store(output_writer, (module_info, entry_files, astro, None))
+            except Exception as err:  # pylint: disable=broad-except
+                logger.error(f"Failed to rebuild {module_info['module']}: {err}")
+                result["errors"].append({"module": module_info["module"], "error": str(err)})
+                continue
+            if written:
+                result["written"].append(module_info["astro"])
+            else:
+                result["unchanged"].append(module_info["astro"])
+        self.plan.finish(output_writer)
+        diagnostics.log_summary(logger)
+        self.rebuilds += 1
+        result["diagnostics"] = len(diagnostics.records)
+        result["duration"] = time.perf_counter() - start
+        logger.info(
+            f"Rebuilt {len(selected)} entries in {result['duration']:.3f}s, {output_writer.written} written and "
+            f"{output_writer.unchanged} unchanged."
+        )
+        return result
+
+    def status(self) -> dict[str, Any]:
+        """Return the daemon's uptime, number of rebuilds, and markdown cache counts."""
+        from yapper import parser
+
+        return {
+            "modules": [module_info["module"] for module_info in self.yapper_config["module_map"]],
+            "uptime": time.time() - self.started,
+            "rebuilds": self.rebuilds,
+            "markdown_cache": parser.markdown_cache.stats(),
+        }
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Handles JSON requests for a build daemon."""
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Handle status requests."""
+        if self.path == "/status":
+            self.respond(200, self.server.build_daemon.status())  # type: ignore
+        else:
+            self.respond(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Handle rebuild and shutdown requests."""
+        if self.path == "/rebuild":
+            try:
+                payload = self.read_json()
+                modules = payload.get("modules")
+                paths = payload.get("paths")
+                force = payload.get("force", False)
+                for key, value in [("modules", modules), ("paths", paths)]:
+                    if value is not None and (
+                        not isinstance(value, list) or not all(isinstance(item, str) for item in value)
+                    ):
+                        raise ValueError(f'The "{key}" key should be a list of strings.')
+                if not isinstance(force, bool):
+                    raise ValueError('The "force" key should be a boolean.')
+            except ValueError as err:
+                self.respond(400, {"error": str(err)})
+                return
+            self.respond(200, self.server.build_daemon.rebuild(modules, paths, force))  # type: ignore
+        elif self.path == "/shutdown":
+            self.respond(200, {"stopping": True})
+            # shutdown blocks until the serving loop exits, so it is called from another thread
+            threading.Thread(target=self.server.shutdown).start()
+        else:
+            self.respond(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def read_json(self) -> dict[str, Any]:
+        """Read the request's JSON body."""
+        content_length = int(self.headers.get("Content-Length") or 0)
+        if not content_length:
+            return {}
+        payload = json.loads(self.rfile.read(content_length))
+        if not isinstance(payload, dict):
+            raise ValueError("The request body should be a JSON object.")
+        return payload
+
+    def respond(self, status_code: int, payload: dict[str, Any]) -> None:
+        """Send a JSON response."""
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        """Return the client address, which is empty for Unix domain sockets."""
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+        return "unix socket"
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        """Log requests at debug level."""
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+class TCPBuildServer(HTTPServer):
+    """HTTP server for a build daemon on a localhost port."""
+
+    allow_reuse_address = True
+
+    def __init__(self, build_daemon: BuildDaemon, host: str, port: int):
+        """Bind the server to the host and port."""
+        self.build_daemon = build_daemon
+        super().__init__((host, port), RequestHandler)
+
+
+class UnixBuildServer(socketserver.TCPServer):
+    """
+    HTTP server for a build daemon on a Unix domain socket, per `socketserver.UnixStreamServer`.
+
+    The server is defined on every platform, but raises a ValueError where Unix domain sockets are not supported.
+    """
+
+    address_family = getattr(socket, "AF_UNIX", socket.AF_INET)
+
+    def __init__(self, build_daemon: BuildDaemon, socket_path: str):
+        """Bind the server to the socket path, replacing the socket file if left over from a previous daemon."""
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Unix domain sockets are not supported on this platform, use a port instead.")
+        self.build_daemon = build_daemon
+        if Path(socket_path).exists():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)  # pylint: disable=no-member
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                Path(socket_path).unlink()
+            else:
+                raise RuntimeError(f"A yapper daemon is already listening on {socket_path}")
+            finally:
+                probe.close()
+        super().__init__(socket_path, RequestHandler)  # type: ignore
+
+
+def make_server(
+    build_daemon: BuildDaemon, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str | None = None
+) -> socketserver.BaseServer:
+    """Prepare a server on the Unix domain socket path if provided, else on the localhost port."""
+    if socket_path is not None:
+        return UnixBuildServer(build_daemon, socket_path)
+    return TCPBuildServer(build_daemon, host, port)
+
+
+def serve(
+    yapper_config: YapperConfig,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: str | None = None,
+    force: bool = False,
+    clean: bool = False,
+    jobs: int | None = None,
+) -> None:
+    """
+    Run a build daemon until interrupted or asked to shut down.
+
+    An initial build is run per `handler.main`, after which its build plan and loaded modules are kept in memory for
+    serving rebuilds.
+    """
+    griffe_loader = handler.create_loader(yapper_config)
+    plan = handler.main(yapper_config, force=force, clean=clean, jobs=jobs, griffe_loader=griffe_loader)
+    build_daemon = BuildDaemon(yapper_config, plan, griffe_loader)
+    server = make_server(build_daemon, host=host, port=port, socket_path=socket_path)
+    address = socket_path if socket_path is not None else f"http://{host}:{port}"
+    logger.info(f"Serving rebuild requests on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and Path(socket_path).exists():
+            Path(socket_path).unlink()
+        logger.info("Stopped serving.")
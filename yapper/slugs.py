@@ -0,0 +1,50 @@
+"""
+Memoized slug generation and per-page anchor registries.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+from slugify import slugify
+
+# slugs memoized by cached_slugify, bounded since long-lived watch and daemon processes reuse the cache between rebuilds
+SLUG_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def cached_slugify(text: str) -> str:
+    """Slugify text, memoized for the most recently used names across pages."""
+    return slugify(text)
+
+
+class SlugRegistry:
+    """
+    Assigns unique heading anchors within a page.
+
+    Names which slugify to an anchor already used on the page receive a numbered suffix, e.g. "name-1", in the order
+    that headings are generated. Links resolve to the anchor of the first heading generated for a name.
+    """
+
+    def __init__(self):
+        """Prepare an empty registry."""
+        # assigned anchors, in the order that headings are generated
+        self.anchors: dict[str, None] = {}
+        self.name_anchors: dict[str, str] = {}
+        self.suffix_counts: dict[str, int] = {}
+
+    def anchor(self, name: str) -> str:
+        """Assign a unique anchor for a heading."""
+        base_slug = cached_slugify(name)
+        anchor = base_slug
+        while anchor in self.anchors:
+            self.suffix_counts[base_slug] = self.suffix_counts.get(base_slug, 0) + 1
+            anchor = f"{base_slug}-{self.suffix_counts[base_slug]}"
+        self.anchors[anchor] = None
+        self.name_anchors.setdefault(name, anchor)
+        return anchor
+
+    def link(self, name: str) -> str:
+        """Return the anchor for linking to a heading name."""
+        if name in self.name_anchors:
+            return self.name_anchors[name]
+        return cached_slugify(name)
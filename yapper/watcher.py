@@ -0,0 +1,227 @@
+"""
+Watch mode, which rebuilds module map entries in place as their source files change.
+
+Loaded modules are kept in memory between rebuilds, and only the modules of changed source files are re-visited.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from yapper import ModuleMap, YapperConfig, cache, handler
+from yapper.diagnostics import diagnostics
+from yapper.output import OutputWriter
+
+if TYPE_CHECKING:
+    from griffe.dataclasses import Alias, Module, Object
+    from griffe.loader import GriffeLoader
+
+logger = logging.getLogger(__name__)
+
+# seconds between polls of the watched source files
+WATCH_POLL_INTERVAL = 0.2
+
+
+def reload_module(griffe_loader: GriffeLoader, module_name: str) -> Module:
+    """
+    Re-visit a module's source file in place, keeping the remainder of the loaded package tree.
+
+    Submodules of a reloaded package are carried over from the previously loaded package.
+    """
+    from griffe.agents.visitor import visit
+    from griffe.dataclasses import Module
+
+    try:
+        old_module: Module = griffe_loader.modules_collection[module_name]
+    except KeyError:
+        return griffe_loader.load_module(module_name)
+    if not isinstance(old_module.filepath, Path):
+        return griffe_loader.load_module(module_name)
+    code = old_module.filepath.read_text(encoding="utf8")
+    griffe_loader.lines_collection[old_module.filepath] = code.splitlines(keepends=False)
+    new_module = visit(
+        old_module.name,
+        filepath=old_module.filepath,
+        code=code,
+        extensions=griffe_loader.extensions,
+        parent=old_module.parent,  # type: ignore
+        docstring_parser=griffe_loader.docstring_parser,
+        docstring_options=griffe_loader.docstring_options,
+        lines_collection=griffe_loader.lines_collection,
+        modules_collection=griffe_loader.modules_collection,
+    )
+    for member_name, member in old_module.members.items():
+        if isinstance(member, Module) and member_name not in new_module.members:
+            new_module[member_name] = member
+    if old_module.parent is None:
+        griffe_loader.modules_collection[old_module.path] = new_module
+    else:
+        old_module.parent[old_module.name] = new_module  # type: ignore
+    return new_module
+
+
+def _iter_members(griffe_object: Object) -> Iterator[Object | Alias]:
+    """Iterate an object's members recursively, without following aliases."""
+    for member in griffe_object.members.values():
+        yield member
+        if not member.is_alias:
+            yield from _iter_members(member)  # type: ignore
+
+
+def reload_files(griffe_loader: GriffeLoader, source_files: Iterable[Path]) -> list[str]:
+    """
+    Re-visit the loaded modules for changed source files per `reload_module`, returning the reloaded module names.
+
+    Packages are reloaded before their submodules. Aliases elsewhere in the loaded packages, e.g. re-exported members,
+    which point into a reloaded module are resolved again so that they target the reloaded members.
+    """
+    from griffe.dataclasses import Module
+    from griffe.exceptions import AliasResolutionError, CyclicAliasError
+
+    changed_files = {Path(source_file).resolve() for source_file in source_files}
+    packages = list(griffe_loader.modules_collection.members.values())
+    module_names = [
+        member.path
+        for package in packages
+        for member in [package, *_iter_members(package)]
+        if isinstance(member, Module)
+        and isinstance(member.filepath, Path)
+        and member.filepath.resolve() in changed_files
+    ]
+    module_names.sort(key=lambda module_name: module_name.count("."))
+    for module_name in module_names:
+        reload_module(griffe_loader, module_name)
+    for package in griffe_loader.modules_collection.members.values():
+        for member in _iter_members(package):
+            if member.is_alias and any(
+                member.target_path == module_name or member.target_path.startswith(f"{module_name}.")  # type: ignore
+                for module_name in module_names
+            ):
+                try:
+                    member.resolve_target()  # type: ignore
+                except (AliasResolutionError, CyclicAliasError):
+                    continue
+    return module_names
+
+
+def entry_sources(griffe_loader: GriffeLoader, module_map: list[ModuleMap]) -> dict[str, list[Path]]:
+    """
+    Map the astro keys of module map entries to the source files of their loaded modules, per `cache.module_sources`.
+
+    Modules which aren't yet loaded are loaded per `handler.load_module`.
+    """
+    return {
+        module_info["astro"]: cache.module_sources(handler.load_module(griffe_loader, module_info["module"]))
+        for module_info in module_map
+    }
+
+
+def dependent_entries(
+    module_map: list[ModuleMap], sources: dict[str, list[Path]], source_files: Iterable[Path]
+) -> list[ModuleMap]:
+    """
+    Select the module map entries which depend on any of the source files, given the sources of each entry.
+
+    An entry depends on its module's own file, its parent packages, and the modules defining its classes' bases and its
+    aliases' targets, per `cache.module_sources`.
+    """
+    changed_files = {Path(source_file).resolve() for source_file in source_files}
+    return [
+        module_info
+        for module_info in module_map
+        if any(source_file.resolve() in changed_files for source_file in sources.get(module_info["astro"], []))
+    ]
+
+
+def track_files(mtimes: dict[Path, int], sources: dict[str, list[Path]]) -> None:
+    """Add the modification times of entries' source files, per `entry_sources`, which aren't yet tracked."""
+    for entry_files in sources.values():
+        for source_file in entry_files:
+            if source_file not in mtimes:
+                mtimes[source_file] = source_file.stat().st_mtime_ns
+
+
+def poll_files(mtimes: dict[Path, int]) -> list[Path]:
+    """Return the tracked files whose modification times have changed, updating their tracked times."""
+    changed_files: list[Path] = []
+    for source_file, mtime in mtimes.items():
+        try:
+            next_mtime = source_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            continue
+        if next_mtime != mtime:
+            mtimes[source_file] = next_mtime
+            changed_files.append(source_file)
+    return changed_files
+
+
+def watch(
+    yapper_config: YapperConfig,
+    force: bool = False,
+    clean: bool = False,
+    jobs: int | None = None,
+    profile: str | None = None,
+    diagnostics_json: str | None = None,
+    poll_interval: float = WATCH_POLL_INTERVAL,
+    max_polls: int | None = None,
+) -> None:
+    """
+    Rebuild the astro files for module map entries whose source files change.
+
+    An initial build is run per `handler.main`, after which the source files are polled for changes. The modules
+    loaded by the initial build are kept in memory between rebuilds, and only the modules with changed source files are
+    re-visited. Each change only rebuilds the entries which depend on the changed files, before or after the change,
+    per `dependent_entries`, e.g. those of subclasses defined in other modules. The `profile` path only applies to the
+    initial build, whereas the diagnostics are summarised, and written to the `diagnostics_json` path, for each rebuild.
+    """
+    griffe_loader = handler.create_loader(yapper_config)
+    plan = handler.main(yapper_config, force, clean, jobs, profile, diagnostics_json, griffe_loader)
+    module_map = plan.yapper_config["module_map"]
+    # modules parsed by worker processes, or skipped as unchanged, are loaded once
+    sources = entry_sources(griffe_loader, module_map)
+    mtimes: dict[Path, int] = {}
+    track_files(mtimes, sources)
+    logger.info(f"Watching {len(mtimes)} source files for changes.")
+    polls = 0
+    try:
+        while max_polls is None or polls < max_polls:
+            polls += 1
+            time.sleep(poll_interval)
+            changed_files = poll_files(mtimes)
+            if not changed_files:
+                continue
+            start = time.perf_counter()
+            diagnostics.clear()
+            output_writer = OutputWriter()
+            reload_files(griffe_loader, changed_files)
+            # entries depending on the changed files before the change, or after it, e.g. via a new base class
+            rebuild_astro = {
+                module_info["astro"] for module_info in dependent_entries(module_map, sources, changed_files)
+            }
+            sources = entry_sources(griffe_loader, module_map)
+            rebuild_astro.update(
+                module_info["astro"] for module_info in dependent_entries(module_map, sources, changed_files)
+            )
+            rebuild_entries = [module_info for module_info in module_map if module_info["astro"] in rebuild_astro]
+            track_files(mtimes, sources)
+            for module_info in rebuild_entries:
+                try:
+                    module_content = handler.load_module(griffe_loader, module_info["module"])
+                    astro = handler.parse_entry(module_content, module_info, plan.yapper_config)
+                except Exception as err:  # pylint: disable=broad-except
+                    logger.error(f"Failed to rebuild {module_info['module']}: {err}")
+                    continue
+                plan.store(output_writer, (module_info, sources[module_info["astro"]], astro, None))
+            plan.finish(output_writer)
+            diagnostics.log_summary(logger)
+            if diagnostics_json is not None:
+                diagnostics.write_json(Path(diagnostics_json))
+            logger.info(
+                f"Rebuilt {len(rebuild_entries)} entries for {len(changed_files)} changed source files in "
+                f"{time.perf_counter() - start:.3f}s, {output_writer.written} written and "
+                f"{output_writer.unchanged} unchanged."
+            )
+    except KeyboardInterrupt:
+        logger.info("Stopped watching.")